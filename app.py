@@ -1,69 +1,129 @@
 # In file: app.py
 
-from flask import Flask, render_template, jsonify, request
-from hardware_controller import HardwareController
 import time
-import json
+STARTED = time.perf_counter()  # import-time budget: see /api/ready and benchmark.py startup
+
+from flask import Flask, Response, render_template, jsonify, request
+from jobs import JobRunner, JobCancelled
+from status_hub import StatusHub
+from machine_state import MachineState, MotionLock
+from config_store import ConfigError, ConfigStore, Field
+from lazy import ComponentError, LazyComponent, warm_up
+from stations import current_station
+import math
 import os
 
 app = Flask(__name__)
-hw = HardwareController()
+
+# --- ADDED: The table this process drives (set by supervisor.py; default: the single table) ---
+station = current_station()
+
+# --- ADDED: Append-only binary journal of every cycle position (see journal.py) ---
+JOURNAL_FILE = os.path.abspath(station.journal)  # components are built later, maybe after a chdir
 
 # --- MODIFIED: Application State ---
-app_state = {
-    "current_angle": 0,
-    "is_running": False,
-    "is_homed": False, # Added homing status
-    "system_message": "Machine needs to be homed.",
-    "hall_status": False,
-    "inductive_status": False,
-    # --- ADDED: Slider limit switch states ---
-    "slider_min": False,
-    "slider_max": False
+# One shared, versioned snapshot: /api/status reads it and /api/status/stream pushes its changes
+app_state = StatusHub(MachineState(
+    current_angle=0,
+    is_running=False,
+    is_homed=False, # Added homing status
+    system_message="Machine needs to be homed.",
+))
+
+# --- ADDED: Motion ownership; is_running mirrors whether any axis is claimed ---
+motion = MotionLock(on_change=lambda busy: app_state.update({"is_running": busy}))
+
+# --- ADDED: Push sensor edges and job transitions into the status snapshot ---
+SENSOR_STATUS_FIELDS = {
+    "hall": "hall_status",
+    "inductive": "inductive_status",
+    "slider_min": "slider_min",
+    "slider_max": "slider_max",
 }
 
-# --- ADDED: Runtime configuration with JSON persistence ---
-CONFIG_FILE = "config.json"
-
-def load_config():
-    """Load configuration from JSON file, create default if not exists."""
-    default_config = {
-        "step_degrees": 36.0,
-        "pause_seconds": 1.0,       # time to hold at position (seconds)
-        "slider_in_speed": 50,      # 0-100 speed scale (0=stopped, 100=fastest)
-        "slider_out_speed": 50,     # 0-100 speed scale (0=stopped, 100=fastest)
-        "rotary_speed": 50,         # 0-100 speed scale for rotary motor
-        "rotary_accel_steps": 100,  # steps for acceleration ramp-up
-        "rotary_decel_steps": 100,  # steps for deceleration ramp-down
-        "cycles": 10                # default cycle count
-    }
-    
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                loaded_config = json.load(f)
-                # Merge with defaults to handle missing keys
-                default_config.update(loaded_config)
-                return default_config
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Warning: Could not load config file: {e}. Using defaults.")
-    
-    # Save default config if file doesn't exist
-    save_config(default_config)
-    return default_config
+def publish_sensor(channel):
+    field = SENSOR_STATUS_FIELDS.get(channel.name)
+    if field:
+        app_state[field] = channel.active
 
-def save_config(config_dict):
-    """Save configuration to JSON file."""
-    try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config_dict, f, indent=2)
-        return True
-    except IOError as e:
-        print(f"Error saving config: {e}")
-        return False
+def publish_job(job):
+    if job.id == app_state["job_id"]:
+        app_state["job_status"] = job.status
+
+runner = JobRunner(on_update=publish_job)
+
+# --- MODIFIED: Runtime configuration (schema, versioned cache, atomic debounced writes) ---
+CONFIG_FILE = os.path.abspath(station.config)
+
+def apply_hw_config(controller, cfg):
+    """Push the config values the HardwareController uses directly."""
+    controller.SLIDER_ADAPTIVE = bool(cfg['slider_adaptive'])
+    controller.SLIDER_CRUISE_DELAY = float(cfg['slider_cruise_delay'])
+    controller.SLIDER_APPROACH_PULSES = int(cfg['slider_approach_pulses'])
+    controller.set_driver_idle_timeout(cfg['driver_idle_timeout'])
+    controller.HOMING_MEASURE_WIDTH = bool(cfg['homing_measure_width'])
+
+def plan_step_move(controller, cfg):
+    """Plan the cycle's step move once per change of its settings, not on the next move."""
+    exact = abs(cfg['step_degrees']) / 360.0 * controller.PULSES_PER_REV
+    for steps in {math.floor(exact), math.ceil(exact)}:  # carried remainders round either way
+        controller.plan_rotary(steps, cfg['rotary_speed'], cfg['rotary_accel_steps'],
+                               cfg['rotary_decel_steps'], cfg['rotary_s_curve'])
 
-# Load initial config
-config = load_config()
+def apply_realtime(controller, cfg):
+    """Switch realtime scheduling of the motion thread (applied on its next move)."""
+    controller.set_realtime(cfg['realtime_mode'], cpu=cfg['realtime_cpu'], priority=cfg['realtime_priority'])
+
+# Applied when the hardware is built, and again whenever one of the keys changes
+HW_CONFIG = (
+    (apply_hw_config, ("slider_adaptive", "slider_cruise_delay", "slider_approach_pulses",
+                       "driver_idle_timeout", "homing_measure_width")),
+    (apply_realtime, ("realtime_mode", "realtime_cpu", "realtime_priority")),
+    (plan_step_move, ("step_degrees", "rotary_speed", "rotary_accel_steps",
+                      "rotary_decel_steps", "rotary_s_curve")),
+)
+
+def hw_listener(apply):
+    def listener(cfg, changed):
+        apply(hw.instance(), cfg)  # waits for (or starts) the hardware build
+    listener.__name__ = apply.__name__
+    return listener
+
+# --- ADDED: Lazy components (see lazy.py): built on first use or by warm_up() in serve() ---
+def build_config():
+    store = ConfigStore(CONFIG_FILE).load()  # may rewrite config.json
+    for apply, keys in HW_CONFIG:
+        store.subscribe(hw_listener(apply), keys)
+    return store
+
+def build_hardware():
+    from hardware_controller import HardwareController
+    controller = HardwareController(station.pulse_engine, gpio=station.gpio, pins=station.pins,
+                                    pulses_per_rev=station.pulses_per_rev)
+    for apply, _ in HW_CONFIG:
+        apply(controller, config)
+    controller.sensors.listeners.append(publish_sensor)
+    app_state.update({field: controller.sensors.is_active(name) for name, field in SENSOR_STATUS_FIELDS.items()})
+    return controller
+
+def build_journal():
+    from journal import RunJournal
+    return RunJournal(JOURNAL_FILE)
+
+def build_pico():
+    from pico_link import create_pico_link
+    return create_pico_link(station.pico)  # serial link to the Pico (env KEY_LOADER_PICO picks the device)
+
+config = LazyComponent("config", build_config)
+hw = LazyComponent("hardware", build_hardware)
+journal = LazyComponent("journal", build_journal)
+pico = LazyComponent("pico", build_pico)
+COMPONENTS = {"config": config, "hardware": hw, "journal": journal, "pico": pico}  # warm-up order
+IMPORT_SECONDS = time.perf_counter() - STARTED
+
+@app.errorhandler(ComponentError)
+def component_unavailable(e):
+    return jsonify({"success": False, "error": str(e)}), 503
 
 def speed_to_delay(speed):
     """Convert 0-100 speed to delay in seconds. 0=stopped, 100=fastest."""
@@ -73,12 +133,12 @@ def speed_to_delay(speed):
     return max(0.0001, 0.01 / (speed / 100.0))
 
 def send_pico_command(command):
-    """Send command to Raspberry Pico. TODO: Implement actual communication."""
-    # Placeholder for Pico communication
-    # This could be serial, USB, I2C, or other communication method
-    print(f"📡 Sending to Pico: {command}")
-    # TODO: Implement actual Pico communication here
-    # Example: ser.write(f"{command}\n".encode()) for serial communication
+    """Queue a command for the Raspberry Pico and return without waiting.
+
+    The link thread frames and sends it and waits for the ACK (see pico_link.py);
+    the returned PicoCommand can be waited on if the caller needs the ACK.
+    """
+    return pico.send(command)
 
 @app.route('/')
 def index():
@@ -92,44 +152,77 @@ def config_page():
 # --- ADDED: Config endpoints ---
 @app.route('/api/config', methods=['GET'])
 def api_get_config():
-    return jsonify(config)
+    return jsonify(config.snapshot())
+
+@app.route('/api/config/schema', methods=['GET'])
+def api_config_schema():
+    return jsonify({"version": config.version, "fields": config.schema()})
 
 @app.route('/api/config', methods=['POST'])
 def api_set_config():
     data = request.get_json(silent=True) or {}
     try:
-        if 'step_degrees' in data:
-            config['step_degrees'] = float(data['step_degrees'])
-        if 'pause_seconds' in data:
-            config['pause_seconds'] = float(data['pause_seconds'])
-        if 'slider_in_speed' in data:
-            config['slider_in_speed'] = max(0, min(100, int(data['slider_in_speed'])))  # clamp 0-100
-        if 'slider_out_speed' in data:
-            config['slider_out_speed'] = max(0, min(100, int(data['slider_out_speed'])))  # clamp 0-100
-        if 'rotary_speed' in data:
-            config['rotary_speed'] = max(0, min(100, int(data['rotary_speed'])))  # clamp 0-100
-        if 'rotary_accel_steps' in data:
-            config['rotary_accel_steps'] = max(1, int(data['rotary_accel_steps']))  # minimum 1 step
-        if 'rotary_decel_steps' in data:
-            config['rotary_decel_steps'] = max(1, int(data['rotary_decel_steps']))  # minimum 1 step
-        if 'cycles' in data:
-            config['cycles'] = int(data['cycles'])
-        
-        # Save to file
-        if not save_config(config):
-            return jsonify({"success": False, "message": "Failed to save config file"}), 500
-            
-    except (TypeError, ValueError):
-        return jsonify({"success": False, "message": "Invalid config"}), 400
-    return jsonify({"success": True, **config})
+        changed = config.update(data)  # validated and clamped; written to disk in the background
+    except ConfigError as e:
+        return jsonify({"success": False, "message": f"Invalid config: {e}"}), 400
+    return jsonify({"success": True, "version": config.version, "changed": sorted(changed),
+                    **config.snapshot()})
 
-# --- ADDED: Homing Route ---
-@app.route('/api/home', methods=['POST'])
-def home_machine():
-    if app_state["is_running"]:
-        return jsonify({"error": "Cannot home while cycle is running."}), 400
+# --- ADDED: Background motion jobs ---
+def submit_motion_job(kind, func, *args, axes=("rotary", "slider"), claim=None):
+    """Claim axes and run func(job, *args) on the motion thread.
+
+    Returns the Job, or None if another job owns any of the axes. A claim
+    the caller already holds can be handed over instead.
+    """
+    if claim is None:
+        claim = motion.acquire(kind, axes)
+    if claim is None:
+        return None
+
+    def run(job):
+        try:
+            return func(job, *args)
+        except JobCancelled:
+            app_state["system_message"] = f"{kind.capitalize()} cancelled."
+            raise
+        finally:
+            job.message = app_state["system_message"]
+
+    # Released by the runner, also when the job is cancelled before it starts
+    job = runner.submit(kind, run, on_done=lambda job: motion.release(claim))
+    app_state.update({"job_id": job.id, "job_status": job.status})
+    return job
 
-    app_state["is_running"] = True
+@app.route('/api/jobs')
+def api_list_jobs():
+    return jsonify([job.to_dict() for job in runner.jobs()])
+
+@app.route('/api/jobs/<job_id>')
+def api_get_job(job_id):
+    job = runner.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/<action>', methods=['POST'])
+def api_job_action(job_id, action):
+    job = runner.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "Unknown job"}), 404
+    if action not in ("cancel", "pause", "resume"):
+        return jsonify({"success": False, "message": f"Unknown action: {action}"}), 400
+    if job.done:
+        return jsonify({"success": False, "message": f"Job already {job.status}"}), 400
+    getattr(job, action)()
+    if action == "pause":
+        app_state["system_message"] = "Pausing after the current step..."
+    elif action == "resume":
+        app_state["system_message"] = "Resuming..."
+    return jsonify({"success": True, **job.to_dict()})
+
+# --- ADDED: Homing Route ---
+def run_home_job(job):
     app_state["system_message"] = "Homing in progress..."
     
     success = hw.home_table()
@@ -141,10 +234,26 @@ def home_machine():
     else:
         app_state["is_homed"] = False
         app_state["system_message"] = "ERROR: Homing failed. Check switch and wiring."
+    return {"success": success, "homing": hw.last_homing}
+
+@app.route('/api/home', methods=['POST'])
+def home_machine():
+    job = submit_motion_job("home", run_home_job)
+    if job is None:
+        return jsonify({"error": "Cannot home while cycle is running."}), 400
+    return jsonify({"success": True, "job_id": job.id}), 202
 
-    app_state["is_running"] = False
-    return jsonify({"success": success})
 
+def run_cycle_job(job, total_cycles):
+    # Phases are overlapped by the CycleScheduler (see cycle_scheduler.py)
+    from cycle_scheduler import CycleScheduler
+    scheduler = CycleScheduler(hw.instance(), config.instance(), app_state, send_pico_command,
+                               journal=journal.instance())
+    return scheduler.run(
+        job, total_cycles,
+        in_delay=speed_to_delay(config['slider_in_speed']),
+        out_delay=speed_to_delay(config['slider_out_speed'])
+    )
 
 @app.route('/api/start', methods=['POST'])
 def start_cycle():
@@ -152,129 +261,142 @@ def start_cycle():
     if not app_state["is_homed"]:
         return jsonify({"error": "Machine must be homed before starting a cycle."}), 400
     
-    if app_state["is_running"]:
-        return jsonify({"error": "Cycle is already running."}), 400
-    
     # Allow overriding cycles in request
     data = request.get_json(silent=True) or {}
-    total_cycles = int(data.get('cycles', config.get('cycles', 10)))
+    try:
+        total_cycles = int(data.get('cycles', config.get('cycles', 10)))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid cycles"}), 400
 
-    app_state["is_running"] = True
-    app_state["current_angle"] = 0
+    # The cycle runs on the motion thread; poll /api/jobs/<job_id> or /api/status
+    job = submit_motion_job("cycle", run_cycle_job, total_cycles)
+    if job is None:
+        return jsonify({"error": "Cycle is already running."}), 400
+    return jsonify({"message": "Cycle started.", "job_id": job.id}), 202
 
-    for i in range(1, total_cycles + 1):
-        target_angle = (i * config['step_degrees']) % 360
-        app_state["system_message"] = f"Moving to position {i} ({target_angle}°)..."
-        
-        move_success = hw.move_degrees(
-            config['step_degrees'], 
-            speed=config['rotary_speed'],
-            accel_steps=config['rotary_accel_steps'],
-            decel_steps=config['rotary_decel_steps']
-        )
-        if not move_success:
-            app_state["system_message"] = "ERROR: Motor stalled during movement!"
-            break 
-        
-        app_state["current_angle"] = target_angle
-        time.sleep(0.2)
-
-        is_hall_active = hw.read_hall_sensor()
-        if not is_hall_active:
-            app_state["system_message"] = f"ERROR: Position mismatch at {target_angle}°!"
-            break
-
-        if hw.read_inductive_sensor():
-            app_state["system_message"] = f"✅ Key detected at {target_angle}°. Triggering."
-            
-            # Send command to Pico to start poles timer
-            # TODO: Implement actual Pico communication (serial/USB)
-            send_pico_command("trigger_function")
-            
-            # Start slider movement sequence: IN → OUT
-            out_delay = speed_to_delay(config['slider_out_speed'])
-            in_delay = speed_to_delay(config['slider_in_speed'])
-            
-            # Move slider to IN limit switch first
-            app_state["system_message"] = f"Key detected. Moving slider to IN position..."
-            in_ok = hw.slider_move_to_min(in_delay)
-            
-            if not in_ok:
-                app_state["system_message"] = "ERROR: Slider failed to reach IN limit switch."
-                break
-            
-            # Move slider to OUT limit switch
-            app_state["system_message"] = f"Slider at IN. Moving to OUT position..."
-            out_ok = hw.slider_move_to_max(out_delay)
-            
-            if not out_ok:
-                app_state["system_message"] = "ERROR: Slider failed to reach OUT limit switch."
-                break
-            
-            # Wait for pause timer to complete
-            pause_time = max(config['pause_seconds'], 0)
-            app_state["system_message"] = f"Slider at OUT. Waiting {pause_time:.1f}s for poles timer..."
-            time.sleep(pause_time)
-            
-            app_state["system_message"] = f"Poles timer complete. Ready for next position."
-        else:
-            app_state["system_message"] = f"No key at {target_angle}°. Moving on."
+# --- ADDED: Batch programs (see program.py) ---
+def run_program_job(job, plan):
+    from program import run_program
+    return run_program(job, plan, hw.instance(), app_state, send_pico_command)
 
-    if app_state["is_running"]:
-        app_state["system_message"] = "Cycle complete. Ready."
-        
-    app_state["is_running"] = False
-    return jsonify({"message": "Cycle finished."})
+@app.route('/api/program', methods=['POST'])
+def api_run_program():
+    from program import ProgramError, compile_program
+    data = request.get_json(silent=True)
+    # Claim first: the plan follows the current position, so nothing may move it until the job runs
+    claim = motion.acquire("program")
+    if claim is None:
+        return jsonify({"success": False, "message": "Busy"}), 400
+    job = None
+    try:
+        plan = compile_program(data, hw.instance(), config.instance(), speed_to_delay)
+        if plan.absolute and not app_state["is_homed"]:
+            raise ProgramError("Machine must be homed for absolute moves.")
+        job = submit_motion_job("program", run_program_job, plan, claim=claim)
+    except ProgramError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    finally:
+        if job is None:  # any error, including hardware unavailable (503)
+            motion.release(claim)
+    return jsonify({"success": True, "job_id": job.id, "plan": plan.summary()}), 202
 
 @app.route('/api/status')
 def get_status():
-    app_state["hall_status"] = hw.read_hall_sensor()
-    app_state["inductive_status"] = hw.read_inductive_sensor()
-    # --- ADDED: slider switches ---
+    # Cached snapshot: sensor fields are kept current by edge callbacks, no pins are read here
+    state, _ = app_state.snapshot()
+    state["axes"] = motion.owners()
+    state["station"] = station.name
+    return jsonify(state)
+
+# --- ADDED: Station definition (pin map, motor resolution, files) ---
+@app.route('/api/station')
+def api_station():
+    return jsonify({**station.to_dict(), "pin_map": hw.pin_map(), "pulses_per_rev": hw.PULSES_PER_REV,
+                    "pulse_engine": hw.pulse_engine.name, "pid": os.getpid()})
+
+# --- ADDED: Motion telemetry (Prometheus text, or ?format=json for a summary) ---
+@app.route('/api/metrics')
+def api_metrics():
+    if request.args.get('format') == 'json':
+        return jsonify({**hw.telemetry.summary(), "realtime": hw.realtime.status()})
+    return Response(hw.telemetry.prometheus(), mimetype='text/plain; version=0.0.4')
+
+# --- ADDED: Run journal summary and latest positions ---
+@app.route('/api/journal')
+def api_journal():
     try:
-        app_state["slider_min"] = hw.read_slider_min()
-        app_state["slider_max"] = hw.read_slider_max()
-    except AttributeError:
-        # Backward compatibility if methods not present
-        app_state["slider_min"] = False
-        app_state["slider_max"] = False
-    return jsonify(app_state)
+        since = float(request.args['since']) if 'since' in request.args else None
+        until = float(request.args['until']) if 'until' in request.args else None
+        last = max(0, min(1000, int(request.args.get('last', 20))))
+    except ValueError:
+        return jsonify({"error": "since/until must be Unix timestamps, last an integer"}), 400
+    from journal import JournalReader
+    written = journal.written  # builds the writer, which creates the file, before it is read
+    with JournalReader(JOURNAL_FILE) as reader:
+        return jsonify({
+            "summary": reader.aggregate(since, until),
+            "last": [r._asdict() for r in reader.last(last)],
+            "written": written,
+        })
+
+# --- ADDED: Readiness of the lazily built components (200 when all are up, else 503) ---
+@app.route('/api/ready')
+def api_ready():
+    components = {name: component.readiness() for name, component in COMPONENTS.items()}
+    ready = all(c["ready"] for c in components.values())
+    return jsonify({
+        "ready": ready,
+        "components": components,
+        "import_seconds": round(IMPORT_SECONDS, 4),
+        "uptime_s": round(time.perf_counter() - STARTED, 3),
+    }), 200 if ready else 503
+
+# --- ADDED: Pico link health and round-trip latency ---
+@app.route('/api/pico')
+def api_pico_status():
+    return jsonify(pico.stats())
+
+# --- ADDED: Server-Sent Events status stream (full snapshot, then changed fields only) ---
+@app.route('/api/status/stream')
+def status_stream():
+    return Response(app_state.stream(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # --- ADDED: Rotary controls for config page ---
-@app.route('/api/rotary/home', methods=['POST'])
-def api_rotary_home():
-    if app_state["is_running"]:
-        return jsonify({"success": False, "message": "Busy"}), 400
-    app_state["is_running"] = True
+def run_rotary_home_job(job):
     app_state["system_message"] = "Rotary homing..."
     ok = hw.home_table()
     app_state["is_homed"] = bool(ok)
     app_state["current_angle"] = 0 if ok else app_state["current_angle"]
     app_state["system_message"] = "Rotary homed" if ok else "Rotary homing failed"
-    app_state["is_running"] = False
-    return jsonify({"success": ok, "message": app_state["system_message"]})
+    report = hw.last_homing or {}
+    if ok and "hall_width_deg" in report:
+        app_state["system_message"] += f" (hall width {report['hall_width_deg']}°, offset {report['offset_deg']}°)"
+    elif ok and "offset_deg" in report:
+        app_state["system_message"] += f" (offset {report['offset_deg']}°)"
+    return {"success": ok, "message": app_state["system_message"], "homing": report}
 
-@app.route('/api/rotary/move', methods=['POST'])
-def api_rotary_move():
-    if app_state["is_running"]:
+@app.route('/api/rotary/home', methods=['POST'])
+def api_rotary_home():
+    job = submit_motion_job("rotary_home", run_rotary_home_job, axes=("rotary",))
+    if job is None:
         return jsonify({"success": False, "message": "Busy"}), 400
-    data = request.get_json(silent=True) or {}
-    try:
-        degrees = float(data.get("degrees", 0))
-    except (TypeError, ValueError):
-        return jsonify({"success": False, "message": "Invalid degrees"}), 400
-    app_state["is_running"] = True
+    return jsonify({"success": True, "job_id": job.id, "message": "Rotary homing..."}), 202
+
+def run_rotary_move_job(job, degrees):
     app_state["system_message"] = f"Moving {degrees}°..."
     ok = hw.move_degrees(
         degrees,
         speed=config['rotary_speed'],
         accel_steps=config['rotary_accel_steps'],
-        decel_steps=config['rotary_decel_steps']
+        decel_steps=config['rotary_decel_steps'],
+        s_curve=config['rotary_s_curve']
     )
+    # Angle from the absolute step counter, so fractional steps do not accumulate
+    app_state["current_angle"] = round(hw.position_degrees % 360, 3)
     if ok:
-        app_state["current_angle"] = (app_state["current_angle"] + degrees) % 360
-        # Verification: if we expect to be at 0° (within numeric wrap), hall should be active
-        at_zero = abs(app_state["current_angle"]) < 1e-6 or abs(app_state["current_angle"] - 360) < 1e-6
+        # Verification: if we expect to be at 0° (whole revolutions), hall should be active
+        at_zero = hw.position_steps % hw.PULSES_PER_REV == 0
         if at_zero:
             if not hw.read_hall_sensor():
                 ok = False
@@ -285,27 +407,41 @@ def api_rotary_move():
             app_state["system_message"] = f"Moved {degrees}°"
     else:
         app_state["system_message"] = "Move failed"
-    app_state["is_running"] = False
-    return jsonify({"success": ok, "message": app_state["system_message"], "current_angle": app_state["current_angle"]})
+    return {"success": ok, "message": app_state["system_message"], "current_angle": app_state["current_angle"]}
+
+@app.route('/api/rotary/move', methods=['POST'])
+def api_rotary_move():
+    data = request.get_json(silent=True) or {}
+    try:
+        degrees = float(data.get("degrees", 0))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Invalid degrees"}), 400
+    job = submit_motion_job("rotary_move", run_rotary_move_job, degrees, axes=("rotary",))
+    if job is None:
+        return jsonify({"success": False, "message": "Busy"}), 400
+    return jsonify({"success": True, "job_id": job.id, "message": f"Moving {degrees}°..."}), 202
 
 # --- ADDED: Set current position as zero ---
 @app.route('/api/rotary/set_zero', methods=['POST'])
 def api_rotary_set_zero():
-    if app_state["is_running"]:
+    # Hold the rotary axis so no move can start while the zero is being set
+    claim = motion.acquire("set_zero", ("rotary",))
+    if claim is None:
         return jsonify({"success": False, "message": "Busy"}), 400
-    # Trust the operator: set current as absolute zero
-    app_state["current_angle"] = 0
-    app_state["is_homed"] = True
-    app_state["system_message"] = "Current position set as 0°."
+    try:
+        # Trust the operator: set current as absolute zero
+        hw.set_zero()
+        app_state.update({
+            "current_angle": 0,
+            "is_homed": True,
+            "system_message": "Current position set as 0°.",
+        })
+    finally:
+        motion.release(claim)
     return jsonify({"success": True, "message": app_state["system_message"], "current_angle": app_state["current_angle"]})
 
 # --- ADDED: Slider test cycle ---
-@app.route('/api/slider/test_cycle', methods=['POST'])
-def api_slider_test_cycle():
-    if app_state["is_running"]:
-        return jsonify({"success": False, "message": "Busy"}), 400
-    
-    app_state["is_running"] = True
+def run_slider_test_job(job):
     app_state["system_message"] = "Starting slider test cycle..."
     
     try:
@@ -319,36 +455,101 @@ def api_slider_test_cycle():
         
         if not min_success:
             app_state["system_message"] = "ERROR: Failed to reach MIN limit switch"
-            return jsonify({"success": False, "message": app_state["system_message"]})
+            return {"success": False, "message": app_state["system_message"]}
         
         # Step 2: Move to MAX limit switch
+        job.checkpoint()
         app_state["system_message"] = "Moving slider to MAX position..."
         max_success = hw.slider_move_to_max(out_delay)
         
         if not max_success:
             app_state["system_message"] = "ERROR: Failed to reach MAX limit switch"
-            return jsonify({"success": False, "message": app_state["system_message"]})
+            return {"success": False, "message": app_state["system_message"]}
         
         # Step 3: Return to MIN limit switch
+        job.checkpoint()
         app_state["system_message"] = "Returning slider to MIN position..."
         return_success = hw.slider_move_to_min(in_delay)
         
         if not return_success:
             app_state["system_message"] = "ERROR: Failed to return to MIN limit switch"
-            return jsonify({"success": False, "message": app_state["system_message"]})
+            return {"success": False, "message": app_state["system_message"]}
         
         app_state["system_message"] = "Slider test cycle completed successfully"
-        return jsonify({"success": True, "message": app_state["system_message"]})
+        return {"success": True, "message": app_state["system_message"],
+                "slider_travel": hw.slider_travel, "last_stroke": hw.last_slider_stroke}
         
+    except JobCancelled:
+        raise
     except Exception as e:
         app_state["system_message"] = f"Slider test error: {str(e)}"
-        return jsonify({"success": False, "message": app_state["system_message"]})
+        return {"success": False, "message": app_state["system_message"]}
+
+@app.route('/api/slider/test_cycle', methods=['POST'])
+def api_slider_test_cycle():
+    job = submit_motion_job("slider_test", run_slider_test_job, axes=("slider",))
+    if job is None:
+        return jsonify({"success": False, "message": "Busy"}), 400
+    return jsonify({"success": True, "job_id": job.id, "message": "Starting slider test cycle..."}), 202
+
+# --- ADDED: Speed / acceleration calibration (see calibration.py) ---
+def run_calibration_job(job, axes, options, apply):
+    from calibration import Calibrator
+    app_state["system_message"] = "Calibrating..."
+    calibrator = Calibrator(hw.instance(), config.instance(), speed_to_delay, job,
+                            status=lambda message: app_state.update({"system_message": message}), **options)
+    try:
+        report = calibrator.run(axes, apply)
     finally:
-        app_state["is_running"] = False
+        if "rotary" in axes:
+            # Every passed trial ends on a hall-verified 0°; a failed one leaves the position unknown
+            app_state.update({"is_homed": calibrator.zeroed, "current_angle": 0 if calibrator.zeroed
+                              else round(hw.position_degrees % 360, 3)})
+    failed = [axis for axis in axes if "error" in report[axis]]
+    if failed:
+        app_state["system_message"] = f"Calibration failed for {', '.join(failed)}: " + \
+            "; ".join(report[axis]["error"] for axis in failed)
+    else:
+        app_state["system_message"] = "Calibration complete" + (" (settings saved)" if report["applied"] else "")
+    return {"success": not failed, "message": app_state["system_message"], **report}
+
+@app.route('/api/calibrate', methods=['POST'])
+def api_calibrate():
+    data = request.get_json(silent=True) or {}
+    axes = data.get("axes", ["rotary", "slider"])
+    if not isinstance(axes, list) or not axes or any(axis not in ("rotary", "slider") for axis in axes):
+        return jsonify({"success": False, "message": "axes must be a list of 'rotary' and 'slider'"}), 400
+    try:
+        options = {name: config.fields[f"calibration_{name}"].coerce(data.get(name, config[f"calibration_{name}"]))
+                   for name in ("moves", "strokes", "margin")}
+        apply = Field("apply", bool, True).coerce(data.get("apply", True))  # "false" must not apply
+    except ConfigError as e:
+        return jsonify({"success": False, "message": f"Invalid option: {e}"}), 400
+    axes = [axis for axis in ("rotary", "slider") if axis in axes]
+    job = submit_motion_job("calibrate", run_calibration_job, axes, options, apply,
+                            axes=tuple(axes))
+    if job is None:
+        return jsonify({"success": False, "message": "Busy"}), 400
+    return jsonify({"success": True, "job_id": job.id, "axes": axes, **options}), 202
 
 
-if __name__ == '__main__':
+def serve(host='0.0.0.0', port=5000):
+    """Run the web server until it stops, then release the hardware."""
+    warm_up(COMPONENTS.values())  # the UI answers at once; /api/ready reports when the hardware is up
     try:
-        app.run(host='0.0.0.0', port=5000)
+        # Motion ownership goes through MotionLock, so requests can be served concurrently
+        app.run(host=host, port=port, threaded=True)
     finally:
-        hw.cleanup()
+        # Only what was built: shutting down must not build hardware just to release it
+        if pico.built:
+            pico.close()
+        if config.built:
+            config.close()
+        if journal.built:
+            journal.close()
+        if hw.built:
+            hw.cleanup()
+
+
+if __name__ == '__main__':
+    serve()
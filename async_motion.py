@@ -0,0 +1,150 @@
+# In file: async_motion.py
+"""
+asyncio facade for the HardwareController.
+
+Every controller method blocks its caller until the move is over. The
+only way to wait for "hall OR alarm" was a thread per wait. AsyncMotion
+gives coroutines awaitables instead:
+
+- move_degrees() and slider_stroke() run the blocking move on a worker
+  thread per axis (one shared worker when the pulse engine cannot drive
+  two pins at once). The worker completes the future when the pulse train
+  ends. Cancelling the awaiting task, directly or through
+  asyncio.wait_for(), stops the train at its next stop check: the next
+  pulse with the sleep engine, the next poll with pigpio. The task resumes
+  only once the controller has counted the pulses that were sent.
+- wait_for() needs no thread at all. Its future is resolved from the
+  sensor edge callback with loop.call_soon_threadsafe(), so any number of
+  waits can share one event loop.
+
+    moved = asyncio.create_task(hw.move_degrees_async(36, speed=80))
+    hall = asyncio.create_task(hw.wait_for("hall", "active", timeout=5))
+    await asyncio.wait({moved, hall}, return_when=asyncio.FIRST_COMPLETED)
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+EDGES = ("active", "inactive", "change")
+POLL_SECONDS = 0.001  # re-read interval for inputs without edge interrupts
+
+
+def _resolve(future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+class AsyncMotion:
+    """Awaitable moves and sensor waits on top of one HardwareController."""
+
+    def __init__(self, hw):
+        self.hw = hw
+        if getattr(hw.pulse_engine, "concurrent", False):
+            self._workers = {axis: ThreadPoolExecutor(1, thread_name_prefix=f"motion-async-{axis}")
+                             for axis in ("rotary", "slider")}
+        else:
+            shared = ThreadPoolExecutor(1, thread_name_prefix="motion-async")
+            self._workers = {"rotary": shared, "slider": shared}
+        self._waiters = {name: set() for name in hw.sensors.channels}  # sensor -> {(edge, loop, future)}
+        self._lock = threading.Lock()
+        hw.sensors.listeners.append(self._on_change)
+
+    # --- Moves (worker threads) ---
+    async def _run(self, axis, func, *args, **kwargs):
+        """Run func(..., stop=...) on the axis worker; cancelling the awaiting task stops the move."""
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+        call = functools.partial(func, *args, stop=cancel.is_set, **kwargs)
+        future = loop.run_in_executor(self._workers[axis], call)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel.set()
+            try:
+                await future  # let the worker stop and count the pulses it sent
+            except Exception:
+                pass
+            raise
+
+    async def move_degrees(self, degrees, speed=50, accel_steps=100, decel_steps=100, s_curve=False):
+        """Awaitable HardwareController.move_degrees(); True when the move completed."""
+        return await self._run("rotary", self.hw.move_degrees, degrees, speed, accel_steps,
+                               decel_steps, s_curve)
+
+    async def slider_stroke(self, direction, speed_delay, max_pulses=20000):
+        """Awaitable slider stroke to the MAX ("out") or MIN ("in") switch; True when it was reached."""
+        if direction not in ("out", "in"):
+            raise ValueError(f"direction must be 'out' or 'in', not {direction!r}")
+        move = self.hw.slider_move_to_max if direction == "out" else self.hw.slider_move_to_min
+        return await self._run("slider", move, speed_delay, max_pulses)
+
+    # --- Sensor waits (edge callbacks, no threads) ---
+    def _satisfied(self, sensor, edge):
+        return edge != "change" and self.hw.sensors.is_active(sensor) == (edge == "active")
+
+    async def wait_for(self, sensor, edge="active", timeout=None):
+        """Wait until a sensor becomes active / inactive, or for its next change.
+
+        "active" and "inactive" return at once if the sensor already is in
+        that state (like SensorEvents.wait_for). Returns False on timeout.
+        """
+        if edge not in EDGES:
+            raise ValueError(f"edge must be one of {', '.join(EDGES)}")
+        channel = self.hw.sensors.channels[sensor]
+        if self._satisfied(sensor, edge):
+            return True
+        if not channel.interrupts:
+            return await self._poll(sensor, edge, timeout)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (edge, loop, future)
+        with self._lock:
+            self._waiters[sensor].add(waiter)
+        try:
+            if self._satisfied(sensor, edge):  # changed before the waiter was registered
+                return True
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters[sensor].discard(waiter)
+
+    async def _poll(self, sensor, edge, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        before = self.hw.sensors.is_active(sensor)
+        while True:
+            active = self.hw.sensors.refresh(sensor)
+            if (active != before) if edge == "change" else active == (edge == "active"):
+                return True
+            if deadline is not None and loop.time() >= deadline:
+                return False
+            await asyncio.sleep(POLL_SECONDS)
+
+    def _on_change(self, channel):
+        """Sensor listener (GPIO callback thread): resolve the matching waiters."""
+        edge = "active" if channel.active else "inactive"
+        with self._lock:
+            waiters = self._waiters.get(channel.name)
+            if not waiters:
+                return
+            fired = {w for w in waiters if w[0] in (edge, "change")}
+            waiters -= fired
+        for _, loop, future in fired:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, True)
+            except RuntimeError:
+                pass  # the waiter's loop has been closed
+
+    def pending(self):
+        """Number of sensor waits currently registered."""
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+    def close(self):
+        for worker in set(self._workers.values()):
+            worker.shutdown(wait=False)
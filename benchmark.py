@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Hardware-free benchmark suite for the Key Loader.
+
+Runs against the simulated GPIO backend (gpio_backend.SimulatedGPIO), so it
+works on any Linux box or CI runner. Measures:
+
+  pulse   - achieved step pulse rate and timing jitter of the pulse engine
+  move    - move_degrees wall time against its planned profile duration
+  homing  - home_table time (two-speed and single-speed)
+  cycle   - full /api/start loop throughput through the Flask test client
+  jitter  - pulse timing under GC and CPU load, normal vs realtime mode
+  async   - sensor-edge fan-out to many awaiting coroutines, move cancel latency
+  startup - cold import of app.py, first page / status request, time to ready
+
+Usage:
+  python benchmark.py                     # run everything
+  python benchmark.py pulse homing        # run selected benchmarks
+  python benchmark.py --json out.json     # save results
+  python benchmark.py --baseline out.json # fail (exit 1) on regressions
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("KEY_LOADER_GPIO", "sim")
+os.environ.setdefault("KEY_LOADER_PICO", "loopback")  # "auto" would wait for a real Pico
+
+from gpio_backend import SimulatedGPIO, SimulatedMachine
+from hardware_controller import HardwareController
+from pulse_engine import SimulatedPulseEngine, SleepPulseEngine
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def metric(value, unit, better):
+    return {"value": round(value, 6), "unit": unit, "better": better}
+
+
+def make_controller(trace=False, **machine_args):
+    gpio = SimulatedGPIO(SimulatedMachine(**machine_args), trace=trace)
+    return HardwareController(pulse_engine=SleepPulseEngine(gpio), gpio=gpio)
+
+
+def bench_pulse(pulses=2000):
+    """Achieved rate and jitter of a constant-rate train at SPEED_DELAY."""
+    print(f"\n⏱️  Pulse engine: {pulses} pulses...")
+    hw = make_controller(trace=True)
+    hw.enable_rotary_motor(True)
+    delay = hw.SPEED_DELAY
+    hw.gpio.trace.clear()
+    started = time.perf_counter()
+    hw.pulse_engine.send(hw.STEP_PIN, [delay] * pulses)
+    elapsed = time.perf_counter() - started
+
+    rising = [t for t, pin, level in hw.gpio.trace if pin == hw.STEP_PIN and level]
+    periods = [b - a for a, b in zip(rising, rising[1:])]
+    errors_us = [abs(p - 2 * delay) * 1e6 for p in periods]
+    return {
+        "pulse_rate_commanded": metric(1.0 / (2 * delay), "pulses/s", "higher"),
+        "pulse_rate_achieved": metric(pulses / elapsed, "pulses/s", "higher"),
+        "pulse_jitter_p50": metric(percentile(errors_us, 50), "us", "lower"),
+        "pulse_jitter_p99": metric(percentile(errors_us, 99), "us", "lower"),
+        "pulse_jitter_max": metric(max(errors_us), "us", "lower"),
+    }
+
+
+def bench_move(degrees=36.0, speed=100, accel_steps=100, decel_steps=100):
+    """Wall time of move_degrees against the planned profile duration."""
+    from motion_profile import plan_move
+    print(f"\n⏱️  move_degrees({degrees}) at speed {speed}...")
+    hw = make_controller()
+    hw.move_degrees(degrees, speed=speed, accel_steps=accel_steps, decel_steps=decel_steps)  # enable + warm cache
+    steps = int(abs(degrees) / 360.0 * hw.PULSES_PER_REV)
+    planned = plan_move(steps, hw._speed_to_delay(speed), accel_steps, decel_steps).duration
+    started = time.perf_counter()
+    hw.move_degrees(degrees, speed=speed, accel_steps=accel_steps, decel_steps=decel_steps)
+    elapsed = time.perf_counter() - started
+    return {
+        "move_planned": metric(planned, "s", "lower"),
+        "move_actual": metric(elapsed, "s", "lower"),
+        "move_overrun": metric(elapsed / planned - 1.0, "ratio", "lower"),
+    }
+
+
+def bench_homing(start_angle=200.0):
+    """home_table time from the same start angle in both homing modes."""
+    results = {}
+    for label, two_speed in (("two_speed", True), ("single", False)):
+        print(f"\n⏱️  Homing ({label}) from {start_angle}°...")
+        hw = make_controller(start_angle=start_angle)
+        started = time.perf_counter()
+        ok = hw.home_table(two_speed=two_speed)
+        elapsed = time.perf_counter() - started
+        if not ok:
+            raise RuntimeError(f"{label} homing failed in simulation")
+        results[f"homing_{label}"] = metric(elapsed, "s", "lower")
+    return results
+
+
+def bench_cycle(cycles=20, key_every=2):
+    """Run the /api/start loop on the simulated machine and time it.
+
+    Motion uses the simulated pulse engine (virtual clock), so the wall
+    time is the software + settle/pause overhead of the loop; the
+    simulated motion time is reported separately.
+    """
+    print(f"\n⏱️  /api/start loop: {cycles} positions...")
+    workdir = tempfile.mkdtemp(prefix="keyloader-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)  # keep config.json out of the repo
+    try:
+        import app
+        hw = app.hw.instance()
+        hw.pulse_engine = SimulatedPulseEngine(gpio=hw.gpio)
+        hw.gpio.machine.set_keys([i * 36.0 for i in range(0, 10, key_every)])
+        hw.gpio.refresh()
+        app.config.update({"pause_seconds": 0})
+        client = app.app.test_client()
+
+        client.post('/api/home')
+        _wait_idle(app)
+        if not app.app_state["is_homed"]:
+            raise RuntimeError("Homing failed in simulation")
+
+        hw.pulse_engine.clear()
+        motion_before = hw.pulse_engine._clock
+        started = time.perf_counter()
+        response = client.post('/api/start', json={"cycles": cycles})
+        accepted = time.perf_counter() - started
+        _wait_idle(app)
+        elapsed = time.perf_counter() - started
+        motion = hw.pulse_engine._clock - motion_before
+        job = response.get_json()
+        result = app.runner.get(job["job_id"]).result or {}
+        if not result.get("success"):
+            raise RuntimeError(f"Cycle failed in simulation: {app.app_state['system_message']}")
+    finally:
+        os.chdir(cwd)
+    return {
+        "cycle_start_latency": metric(accepted * 1000, "ms", "lower"),
+        "cycle_loop_overhead": metric(elapsed / cycles, "s/position", "lower"),
+        "cycle_motion_time": metric(motion / cycles, "s/position", "lower"),
+        "cycle_throughput": metric(cycles / (elapsed + motion) * 60, "positions/min", "higher"),
+    }
+
+
+def bench_coordinated(degrees=36.0, slider_pulses=300, speed=100):
+    """Combined rotary + slider move against the same moves back to back.
+
+    Uses the simulated pulse engine, so durations are the planned motion
+    time; the recorded edges are checked for the right pulse counts.
+    """
+    from motion_profile import plan_move
+    print(f"\n⏱️  Coordinated move: {degrees}° + {slider_pulses} slider pulses...")
+    hw = make_controller()
+    engine = hw.pulse_engine = SimulatedPulseEngine(gpio=hw.gpio)
+    if not hw.move_coordinated(degrees, slider_pulses, slider_out=False, speed=speed):
+        raise RuntimeError("Coordinated move failed in simulation")
+    combined = engine._clock
+    rotary = len(engine.rising_edges(hw.STEP_PIN))
+    slider = len(engine.rising_edges(hw.SLIDER_STEP_PIN))
+    steps = int(degrees / 360.0 * hw.PULSES_PER_REV)
+    if rotary != steps or slider != slider_pulses:
+        raise RuntimeError(f"Coordinated move sent {rotary}/{slider} pulses, expected {steps}/{slider_pulses}")
+
+    profile = plan_move(steps, hw._speed_to_delay(speed), 100, 100)
+    sequential = profile.duration + 2.0 * slider_pulses * hw.SPEED_DELAY
+    return {
+        "coordinated_duration": metric(combined, "s", "lower"),
+        "coordinated_vs_sequential": metric(100.0 * combined / sequential, "%", "lower"),
+    }
+
+
+def bench_pico(commands=500):
+    """Round-trip latency of framed, ACKed commands to the pty Pico emulator."""
+    from pico_link import create_pico_link
+    print(f"\n⏱️  Pico link: {commands} commands over a pty...")
+    link = create_pico_link("pty")
+    try:
+        enqueue = []
+        for i in range(commands):
+            started = time.perf_counter()
+            cmd = link.send(f"trigger_function {i}")
+            enqueue.append(time.perf_counter() - started)
+            if not cmd.wait(2.0):
+                raise RuntimeError(f"Pico command {i} failed: {cmd.error}")
+        rtts = list(link.rtts)
+    finally:
+        link.close()
+    return {
+        "pico_enqueue_p99": metric(percentile(enqueue, 99) * 1e6, "us", "lower"),
+        "pico_rtt_p50": metric(percentile(rtts, 50) * 1000, "ms", "lower"),
+        "pico_rtt_p99": metric(percentile(rtts, 99) * 1000, "ms", "lower"),
+    }
+
+
+def bench_jitter(pulses=2000, delay=0.0005):
+    """Pulse period error under load, with and without realtime mode.
+
+    A background thread churns cyclic garbage (GC pauses, GIL contention)
+    while the train is sent from a "motion" thread, as in the app.
+    """
+    import threading
+    print(f"\n⏱️  Jitter under load: {pulses} pulses at {1 / (2 * delay):.0f} pulses/s...")
+    results = {}
+    for mode in ("normal", "realtime"):
+        hw = make_controller(trace=True)
+        hw.enable_rotary_motor(True)
+        hw.set_realtime(mode == "realtime")
+        stop = threading.Event()
+
+        def churn():
+            while not stop.is_set():
+                nodes = [[] for _ in range(200)]
+                for a, b in zip(nodes, nodes[1:]):
+                    a.append(b)
+                    b.append(a)  # reference cycles: only the cyclic GC frees them
+
+        load = threading.Thread(target=churn, daemon=True)
+        load.start()
+        hw.gpio.trace.clear()
+        worker = threading.Thread(target=hw._send, args=("rotary", hw.STEP_PIN, [delay] * pulses), name="motion")
+        worker.start()
+        worker.join()
+        stop.set()
+        load.join()
+        hw.set_realtime(False)  # restores the process-wide GIL switch interval
+        rising = [t for t, pin, level in hw.gpio.trace if pin == hw.STEP_PIN and level]
+        errors_us = [abs(b - a - 2 * delay) * 1e6 for a, b in zip(rising, rising[1:])]
+        results[f"jitter_{mode}_p50"] = metric(percentile(errors_us, 50), "us", "lower")
+        results[f"jitter_{mode}_p99"] = metric(percentile(errors_us, 99), "us", "lower")
+        results[f"jitter_{mode}_max"] = metric(max(errors_us), "us", "lower")
+        if hw.realtime.errors:
+            print(f"   (realtime partly unavailable: {'; '.join(hw.realtime.errors)})")
+    return results
+
+
+def bench_async(waiters=1000, degrees=36.0):
+    """asyncio facade: many wait_for() coroutines woken by one sensor edge, and cancel latency."""
+    import asyncio
+    import threading
+    print(f"\n⏱️  Async facade: {waiters} hall waiters, move cancel...")
+    hw = make_controller()
+
+    async def run():
+        woken = []
+
+        async def waiter():
+            if await hw.wait_for("hall", "change", timeout=30):
+                woken.append(time.perf_counter())
+
+        edges = []
+        hw.sensors.listeners.append(lambda channel: channel.name == "hall" and edges.append(time.perf_counter()))
+        tasks = [asyncio.create_task(waiter()) for _ in range(waiters)]
+        await asyncio.sleep(0)
+        threads = threading.active_count()
+        await hw.move_degrees_async(degrees, speed=100)
+        await asyncio.gather(*tasks)
+        if len(woken) != waiters:
+            raise RuntimeError(f"Only {len(woken)} of {waiters} waiters woke up")
+        fanout = max(woken) - edges[0]  # all woken by the first hall edge
+
+        move = asyncio.create_task(hw.move_degrees_async(360, speed=100))
+        await asyncio.sleep(0.2)
+        cancelled_at = time.perf_counter()
+        move.cancel()
+        try:
+            await move
+        except asyncio.CancelledError:
+            pass
+        return fanout, time.perf_counter() - cancelled_at, threads
+
+    try:
+        fanout, cancel, threads = asyncio.run(run())
+    finally:
+        hw.cleanup()
+    return {
+        "async_fanout": metric(fanout * 1000, "ms", "lower"),
+        "async_cancel_latency": metric(cancel * 1000, "ms", "lower"),
+        "async_wait_threads": metric(threads, "threads", "lower"),
+    }
+
+
+STARTUP_BUDGET = 1.0  # seconds from process start to the first page being served
+
+STARTUP_PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+assert client.get('/').status_code == 200
+page = time.perf_counter()
+served = time.time()
+assert client.get('/api/status').status_code == 200
+status = time.perf_counter()
+for component in app.COMPONENTS.values():
+    component.instance()
+ready = time.perf_counter()
+print(json.dumps({"import": imported - started, "page": page - imported, "status": status - page,
+                  "ready": ready - status, "served": served}))
+"""
+
+
+def bench_startup(runs=5):
+    """Cold start of app.py in a fresh interpreter: import, first requests, lazy components.
+
+    Each run is a new process in an empty directory (no config.json yet).
+    Medians are reported.
+    """
+    import subprocess
+    print(f"\n⏱️  Cold start: {runs} fresh interpreters...")
+    repo = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=repo, KEY_LOADER_GPIO="sim", KEY_LOADER_PICO="loopback")
+    env.pop("KEY_LOADER_STATION", None)
+    samples = []
+    for _ in range(runs):
+        workdir = tempfile.mkdtemp(prefix="keyloader-start-")
+        launched = time.time()
+        out = subprocess.run([sys.executable, "-c", STARTUP_PROBE], cwd=workdir, env=env,
+                             capture_output=True, text=True, timeout=60)
+        if out.returncode != 0:
+            raise RuntimeError(f"Startup probe failed: {out.stderr.strip()[-500:]}")
+        sample = json.loads(out.stdout.strip().splitlines()[-1])
+        sample["to_ui"] = sample["served"] - launched
+        samples.append(sample)
+    median = {key: percentile([s[key] for s in samples], 50) for key in ("import", "page", "status", "ready", "to_ui")}
+    if median["to_ui"] > STARTUP_BUDGET:
+        print(f"   ⚠️ {median['to_ui']:.2f} s to the first page, over the {STARTUP_BUDGET:.1f} s budget")
+    return {
+        "startup_import": metric(median["import"] * 1000, "ms", "lower"),
+        "startup_first_page": metric(median["page"] * 1000, "ms", "lower"),
+        "startup_first_status": metric(median["status"] * 1000, "ms", "lower"),
+        "startup_components": metric(median["ready"] * 1000, "ms", "lower"),
+        "startup_to_ui": metric(median["to_ui"] * 1000, "ms", "lower"),
+    }
+
+
+def _wait_idle(app, timeout=600):
+    deadline = time.time() + timeout
+    time.sleep(0.05)
+    while app.app_state["is_running"]:
+        if time.time() > deadline:
+            raise RuntimeError("Timed out waiting for the motion job")
+        time.sleep(0.01)
+
+
+BENCHMARKS = {
+    "pulse": bench_pulse,
+    "move": bench_move,
+    "homing": bench_homing,
+    "cycle": bench_cycle,
+    "coordinated": bench_coordinated,
+    "pico": bench_pico,
+    "jitter": bench_jitter,
+    "async": bench_async,
+    "startup": bench_startup,
+}
+
+
+def compare(results, baseline, tolerance):
+    """Return the names of metrics that regressed by more than tolerance."""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference["value"]:
+            continue
+        ratio = current["value"] / reference["value"]
+        worse = ratio < 1 - tolerance if current["better"] == "higher" else ratio > 1 + tolerance
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Key Loader benchmark suite (simulated hardware)")
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression ratio (default 0.25)")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = {}
+    for name in args.benchmarks or list(BENCHMARKS):
+        results.update(BENCHMARKS[name]())
+
+    print("\n📊 Results:")
+    for name, m in results.items():
+        print(f"  {name:<24} {m['value']:>14.4f} {m['unit']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+# In file: calibration.py
+"""
+Speed and acceleration calibration using the stall feedback.
+
+Most tables run at the conservative config defaults (speed 50, 100-step
+ramps) because nobody knows how far the motors can be pushed. Calibrator
+finds out with trials on the table itself:
+
+- Rotary: a trial homes the table (unless the previous trial ended on a
+  verified 0°), makes `moves` indexed moves of step_degrees and returns
+  to the next whole revolution. It fails on a driver alarm (ALM) or when
+  the hall is not active at 0°. The cruise speed is bisected upwards at
+  the current ramp, then the ramp (accel = decel) downwards at that speed.
+- Slider: a trial makes `strokes` strokes in one direction at constant
+  speed (adaptive cruise off). It fails when the switch is not reached or
+  the stroke takes more pulses than the reference travel, i.e. steps were
+  lost. The OUT and IN speeds are searched separately. The return
+  strokes run at the current, known-good speeds.
+
+The limits found are backed off by `margin` and checked with one more
+trial, backing off again if it fails. The settings are then written to
+the config, and run() returns a report with every trial.
+"""
+
+import math
+import time
+
+SLIDER_TOLERANCE_PULSES = 2  # pulse count jitter allowed per stroke (or 1 % of the travel)
+
+
+class CalibrationError(RuntimeError):
+    """Calibration of an axis cannot go on (homing failed, alarm stuck...)."""
+
+
+class Calibrator:
+    """Searches the fastest reliable rotary and slider settings of one table."""
+
+    RESOLUTION = 0.05   # bisection stops when the bracket is within 5 % (and 1 unit)
+    MAX_BACKOFFS = 3    # extra margin steps when the backed-off setting fails
+
+    def __init__(self, hw, config, speed_to_delay, job=None, moves=10, strokes=4, margin=0.2, status=print):
+        self.hw = hw
+        self.config = config
+        self.speed_to_delay = speed_to_delay  # the slider speed scale of app.py
+        self.job = job
+        self.moves = moves
+        self.strokes = strokes
+        self.margin = margin
+        self.status = status
+        self.trials = []
+        self.zeroed = False           # rotary known to be at a hall-verified 0°
+        self.travel = None            # reference slider travel (pulses)
+
+    def _checkpoint(self):
+        if self.job is not None:
+            self.job.checkpoint()
+
+    def _progress(self, **progress):
+        if self.job is not None:
+            self.job.progress = dict(progress, trials=len(self.trials))
+
+    def _limit(self, key):
+        return self.config.fields[key].maximum
+
+    def _record(self, trial, reason, started):
+        trial.update(passed=reason is None, reason=reason,
+                     seconds=round(time.perf_counter() - started, 3))
+        self.trials.append(trial)
+        print(f"{'✅' if reason is None else '❌'} Calibration trial {trial}")
+        return reason is None
+
+    def _boundary(self, passes, safe, limit):
+        """The value closest to limit that passes, given that safe passes (bisection)."""
+        if safe == limit or passes(limit):
+            return limit
+        failed = limit
+        while abs(failed - safe) > max(1, int(abs(safe) * self.RESOLUTION)):
+            middle = (safe + failed) // 2
+            if passes(middle):
+                safe = middle
+            else:
+                failed = middle
+        return safe
+
+    def _back_off(self, passes, values, shrink):
+        """Apply the margin with shrink(values), then again while the check trial fails."""
+        for _ in range(1 + self.MAX_BACKOFFS):
+            values = shrink(values)
+            if passes(*values):
+                return values
+        return None
+
+    # --- Rotary ---
+    def _rezero(self):
+        if self.zeroed:
+            return
+        if not self.hw.home_table():
+            raise CalibrationError("homing failed")
+        self.zeroed = True
+
+    def _rotary_moves(self, speed, ramp, moves):
+        """Run one trial's moves; None if it passed, else the reason."""
+        hw = self.hw
+        s_curve = self.config['rotary_s_curve']
+        degrees = self.config['step_degrees']
+        for move in range(1, moves + 1):
+            self._checkpoint()
+            if not hw.move_degrees(degrees, speed, ramp, ramp, s_curve):
+                return f"stall on move {move}"
+            if hw.position_steps % hw.PULSES_PER_REV == 0 and not hw.read_hall_sensor():
+                return f"hall not found at 0° after move {move}"
+        # End on 0°: steps lost without an alarm show up as a missing hall here
+        rest = hw.position_steps % hw.PULSES_PER_REV
+        if rest:
+            rest = hw.PULSES_PER_REV - rest if degrees > 0 else -rest
+            if not hw.move_degrees(rest * 360.0 / hw.PULSES_PER_REV, speed, ramp, ramp, s_curve):
+                return "stall on the return to 0°"
+        if not hw.read_hall_sensor():
+            return "hall not found at 0°"
+        return None
+
+    def _rotary_trial(self, speed, ramp, phase, moves=None):
+        self._checkpoint()
+        self._progress(axis="rotary", phase=phase, speed=speed, ramp=ramp)
+        self.status(f"Calibrating rotary ({phase}): speed {speed}, ramp {ramp} steps...")
+        started = time.perf_counter()
+        self._rezero()
+        reason = self._rotary_moves(speed, ramp, moves or self.moves)
+        if reason is not None:
+            self.zeroed = False
+            if self.hw.sensors.is_active("alarm") and not self.hw.reset_driver():
+                raise CalibrationError("driver alarm did not clear")
+        return self._record({"axis": "rotary", "phase": phase, "speed": speed, "ramp": ramp}, reason, started)
+
+    def calibrate_rotary(self):
+        """Search rotary_speed and the ramps; returns (settings or None, report)."""
+        if not self.config['step_degrees']:
+            raise CalibrationError("step_degrees is 0")
+        speed = self.config['rotary_speed']
+        ramp = max(self.config['rotary_accel_steps'], self.config['rotary_decel_steps'])
+        report = {"start": {"speed": speed, "ramp": ramp}}
+
+        # The current setting is the safe end of the search; halve the speed if it is not safe
+        while not self._rotary_trial(speed, ramp, "baseline"):
+            if speed <= 1:
+                report["error"] = "no reliable speed at the current ramp"
+                return None, report
+            speed = max(1, speed // 2)
+
+        speed = self._boundary(lambda v: self._rotary_trial(v, ramp, "speed"), speed, self._limit("rotary_speed"))
+        ramp = self._boundary(lambda r: self._rotary_trial(speed, r, "ramp"), ramp, 1)
+        report["limit"] = {"speed": speed, "ramp": ramp}
+
+        found = self._back_off(
+            lambda v, r: self._rotary_trial(v, r, "verify", moves=2 * self.moves), (speed, ramp),
+            lambda values: (max(1, int(values[0] * (1 - self.margin))), math.ceil(values[1] * (1 + self.margin))))
+        if found is None:
+            report["error"] = "backed-off setting failed verification"
+            return None, report
+        report["result"] = {"speed": found[0], "ramp": found[1]}
+        return {"rotary_speed": found[0], "rotary_accel_steps": found[1], "rotary_decel_steps": found[1]}, report
+
+    # --- Slider ---
+    def _stroke(self, direction, delay, max_pulses):
+        move = self.hw.slider_move_to_max if direction == "out" else self.hw.slider_move_to_min
+        return move(delay, max_pulses)
+
+    def _measure_travel(self):
+        """Reference travel from MIN -> MAX -> MIN at the current speeds."""
+        delays = self._safe_delays()
+        if not self._stroke("in", delays["in"], 20000):
+            raise CalibrationError("slider MIN switch not reached")
+        counts = []
+        for direction in ("out", "in"):
+            if not self._stroke(direction, delays[direction], 20000):
+                raise CalibrationError(f"slider {direction.upper()} stroke did not reach its switch")
+            counts.append(self.hw.last_slider_stroke["pulses"])
+        if abs(counts[0] - counts[1]) > self._tolerance(max(counts)):
+            raise CalibrationError(f"slider travel differs between OUT and IN at the current speeds: {counts}")
+        self.travel = min(counts)
+
+    def _safe_delays(self):
+        return {"out": self.speed_to_delay(self.config['slider_out_speed']),
+                "in": self.speed_to_delay(self.config['slider_in_speed'])}
+
+    @staticmethod
+    def _tolerance(travel):
+        return max(SLIDER_TOLERANCE_PULSES, travel // 100)
+
+    def _slider_strokes(self, direction, speed, strokes):
+        back = "in" if direction == "out" else "out"
+        safe = self._safe_delays()
+        delay = self.speed_to_delay(speed)
+        max_pulses = self.travel + max(50, self.travel // 2)
+        for stroke in range(1, strokes + 1):
+            self._checkpoint()
+            self.hw.slider_travel = self.travel  # trials must not teach a wrong travel
+            if not self._stroke(back, safe[back], 20000):
+                raise CalibrationError(f"slider {back.upper()} stroke at the current speed failed")
+            if not self._stroke(direction, delay, max_pulses):
+                return f"switch not reached on stroke {stroke}"
+            pulses = self.hw.last_slider_stroke["pulses"]
+            if pulses - self.travel > self._tolerance(self.travel):
+                return f"{pulses} pulses for a {self.travel}-pulse stroke {stroke} (lost steps)"
+        return None
+
+    def _slider_trial(self, direction, speed, phase, strokes=None):
+        self._checkpoint()
+        self._progress(axis="slider", direction=direction, phase=phase, speed=speed)
+        self.status(f"Calibrating slider {direction.upper()} ({phase}): speed {speed}...")
+        started = time.perf_counter()
+        reason = self._slider_strokes(direction, speed, strokes or self.strokes)
+        return self._record({"axis": "slider", "direction": direction, "phase": phase, "speed": speed},
+                            reason, started)
+
+    def calibrate_slider(self):
+        """Search slider_out_speed and slider_in_speed; returns (settings or None, report)."""
+        hw = self.hw
+        adaptive, travel = hw.SLIDER_ADAPTIVE, hw.slider_travel
+        hw.SLIDER_ADAPTIVE = False  # constant-speed strokes: the speed under test covers the whole travel
+        try:
+            self._measure_travel()
+            report = {"travel": self.travel}
+            settings = {}
+            for direction in ("out", "in"):
+                key = f"slider_{direction}_speed"
+                speed = self._boundary(lambda v: self._slider_trial(direction, v, "speed"),
+                                       self.config[key], self._limit(key))
+                found = self._back_off(
+                    lambda v: self._slider_trial(direction, v, "verify", strokes=2 * self.strokes), (speed,),
+                    lambda values: (max(1, int(values[0] * (1 - self.margin))),))
+                report[direction] = {"start": self.config[key], "limit": speed,
+                                     "result": found[0] if found else None}
+                if found is None:
+                    report["error"] = f"backed-off {direction.upper()} speed failed verification"
+                    return None, report
+                settings[key] = found[0]
+            return settings, report
+        finally:
+            hw.SLIDER_ADAPTIVE = adaptive
+            hw.slider_travel = self.travel or travel
+
+    # --- Both ---
+    def run(self, axes=("rotary", "slider"), apply=True):
+        """Calibrate the given axes; writes the results to the config if apply. Returns the report."""
+        started = time.perf_counter()
+        keys = ("rotary_speed", "rotary_accel_steps", "rotary_decel_steps", "slider_out_speed", "slider_in_speed")
+        report = {"before": {key: self.config[key] for key in keys}, "moves": self.moves,
+                  "strokes": self.strokes, "margin": self.margin}
+        settings = {}
+        for axis in axes:
+            search = self.calibrate_rotary if axis == "rotary" else self.calibrate_slider
+            try:
+                found, report[axis] = search()
+            except CalibrationError as e:
+                found, report[axis] = None, {"error": str(e)}
+            if found is None:
+                print(f"⚠️ {axis.capitalize()} calibration failed: {report[axis]['error']}")
+            else:
+                settings.update(found)
+
+        report["settings"] = settings
+        report["applied"] = bool(apply and settings)
+        if report["applied"]:
+            self.config.update(settings)
+        report["after"] = {key: self.config[key] for key in keys}
+        report["trials"] = self.trials
+        report["duration_s"] = round(time.perf_counter() - started, 3)
+        return report
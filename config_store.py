@@ -0,0 +1,248 @@
+# In file: config_store.py
+"""
+Runtime configuration: schema, versioned cache and atomic persistence.
+
+Every setting is declared once in SCHEMA with its type, default and range.
+ConfigStore.update() validates a batch of changes against it and clamps
+them to their ranges, exactly as the old per-key if-chains did. It then
+swaps in a new immutable snapshot with a higher version. Readers index the
+store (config['rotary_speed']) or take snapshot(), without a lock.
+
+Writes to config.json happen on a background "config-writer" thread. They
+are debounced, so a burst of changes from the config page is written only
+once. The file is written to a temp file, fsynced and renamed over
+config.json, so a crash mid-write never leaves a half-written file.
+
+Listeners subscribed with subscribe(func, keys) are called once per
+update that changes one of their keys. app.py uses them to push slider
+settings into the HardwareController and to re-plan the rotary step move.
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+from types import MappingProxyType
+
+
+class ConfigError(ValueError):
+    """Invalid config value; the message names the key."""
+
+
+class Field:
+    """One setting: type, default and optional [minimum, maximum] clamp."""
+
+    def __init__(self, name, kind, default, minimum=None, maximum=None, help=""):
+        self.name = name
+        self.kind = kind          # float, int or bool
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.help = help
+
+    def coerce(self, value):
+        """Convert and clamp value; raises ConfigError."""
+        try:
+            if self.kind is bool:
+                if isinstance(value, str):
+                    value = value.strip().lower() in ("1", "true", "yes", "on")
+                return bool(value)
+            value = self.kind(float(value)) if self.kind is int else self.kind(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ConfigError(f"'{self.name}' must be {self.kind.__name__}")
+        if not math.isfinite(value):  # nan / inf would reach sleeps and waits on the motion thread
+            raise ConfigError(f"'{self.name}' must be a finite number")
+        if self.minimum is not None:
+            value = max(self.minimum, value)
+        if self.maximum is not None:
+            value = min(self.maximum, value)
+        return value
+
+    def to_dict(self):
+        return {"name": self.name, "type": self.kind.__name__, "default": self.default,
+                "min": self.minimum, "max": self.maximum, "help": self.help}
+
+
+SCHEMA = (
+    Field("step_degrees", float, 36.0, -360.0, 360.0, "Rotary movement per step"),
+    Field("pause_seconds", float, 1.0, 0.0, 3600.0, "Time to hold at each position"),
+    Field("slider_in_speed", int, 50, 0, 100, "Slider IN speed (0=stopped, 100=fastest)"),
+    Field("slider_out_speed", int, 50, 0, 100, "Slider OUT speed (0=stopped, 100=fastest)"),
+    Field("rotary_speed", int, 50, 0, 100, "Rotary cruise speed (0-100)"),
+    Field("rotary_accel_steps", int, 100, 1, None, "Steps to ramp up to cruise speed"),
+    Field("rotary_decel_steps", int, 100, 1, None, "Steps to ramp down from cruise speed"),
+    Field("rotary_s_curve", bool, False, help="Jerk-limited S-curve ramps instead of trapezoidal"),
+    Field("pipeline_enabled", bool, True, help="Overlap independent cycle phases"),
+    Field("settle_seconds", float, 0.2, 0.0, 60.0, "Settle time after each rotary move"),
+    Field("sensor_stable_seconds", float, 0.05, 0.0, 60.0, "Empty positions with stable sensors skip the settle"),
+    Field("slider_overlap", bool, False, help="Finish the slider OUT stroke while the table indexes"),
+    Field("slider_clear_pulses", int, 200, 1, None, "OUT pulses until the slider clears the table"),
+    Field("homing_measure_width", bool, False, help="Measure the hall width when homing (slower)"),
+    Field("drift_correction", bool, True, help="Re-find the hall edge once per revolution / when missed"),
+    Field("slider_adaptive", bool, True, help="Cruise over the learned slider travel, slow near the switch"),
+    Field("slider_cruise_delay", float, 0.0002, 0.00005, 0.01, "Slider cruise half period (s)"),
+    Field("slider_approach_pulses", int, 80, 1, None, "Slow pulses before the expected switch point"),
+    Field("scan_mode", bool, False, help="Scan one revolution for keys, then visit only occupied positions"),
+    Field("scan_delay", float, 0.0005, 0.00005, 0.01, "Half period (s) of the key scan revolution"),
+    Field("driver_idle_timeout", float, 0.0, 0.0, 86400.0, "Switch idle drivers off after this many seconds (0 = never)"),
+    Field("stall_retries", int, 2, 0, 100, "Stall recoveries allowed per run before it stops"),
+    Field("realtime_mode", bool, False, help="Pin the motion thread, SCHED_FIFO, GC hold-off during moves"),
+    Field("realtime_cpu", int, -1, -1, 1023, "Core for the motion thread (-1 = isolated or last core)"),
+    Field("realtime_priority", int, 50, 1, 99, "SCHED_FIFO priority of the motion thread"),
+    Field("calibration_moves", int, 10, 1, 1000, "Indexed moves per rotary calibration trial"),
+    Field("calibration_strokes", int, 4, 1, 100, "Strokes per slider calibration trial"),
+    Field("calibration_margin", float, 0.2, 0.0, 0.9, "Safety margin taken off the calibrated limits"),
+    Field("cycles", int, 10, 1, None, "Default number of cycles"),
+)
+
+
+class ConfigStore:
+    """Validated, versioned config backed by a JSON file."""
+
+    def __init__(self, path, schema=SCHEMA, debounce=0.5):
+        self.path = path
+        self.fields = {field.name: field for field in schema}
+        self.debounce = debounce
+        self.version = 0
+        self.writes = 0
+        self.last_error = None
+        self._config = MappingProxyType({name: f.default for name, f in self.fields.items()})
+        self._listeners = []          # (func, keys or None)
+        self._lock = threading.Lock()  # serialises updates
+        self._dirty = threading.Condition()
+        self._pending = False
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="config-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)  # don't lose a debounced write at exit
+
+    # --- Reading (lock-free) ---
+    def __getitem__(self, key):
+        return self._config[key]
+
+    def __contains__(self, key):
+        return key in self._config
+
+    def get(self, key, default=None):
+        return self._config.get(key, default)
+
+    def snapshot(self):
+        """Plain dict copy of the current config."""
+        return dict(self._config)
+
+    def schema(self):
+        return [field.to_dict() for field in self.fields.values()]
+
+    # --- Loading and updating ---
+    def load(self):
+        """Read the file (defaults for missing or invalid keys); create it if missing."""
+        loaded = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    loaded = json.load(f)
+                if not isinstance(loaded, dict):
+                    raise ValueError("not a JSON object")
+            except (ValueError, IOError) as e:
+                print(f"Warning: Could not load config file: {e}. Using defaults.")
+                loaded = {}
+        config = {name: f.default for name, f in self.fields.items()}
+        for name, value in loaded.items():
+            if name not in self.fields:
+                continue
+            try:
+                config[name] = self.fields[name].coerce(value)
+            except ConfigError as e:
+                print(f"Warning: {e} in {self.path}; using default {self.fields[name].default!r}")
+        with self._lock:
+            self._config = MappingProxyType(config)
+            self.version += 1
+        if loaded != config:
+            self._schedule_write()
+        return self
+
+    def update(self, changes):
+        """Validate and apply {key: value}; returns the set of keys that changed.
+
+        Unknown keys are ignored. Nothing is applied if any value is invalid
+        (raises ConfigError).
+        """
+        coerced = {name: self.fields[name].coerce(value)
+                   for name, value in changes.items() if name in self.fields}
+        with self._lock:
+            current = self._config
+            changed = {name for name, value in coerced.items() if current[name] != value}
+            if not changed:
+                return changed
+            self._config = MappingProxyType({**current, **coerced})
+            self.version += 1
+        self._schedule_write()
+        self._notify(changed)
+        return changed
+
+    # --- Change notification ---
+    def subscribe(self, listener, keys=None):
+        """Call listener(config, changed_keys) after updates touching keys (None = any)."""
+        self._listeners.append((listener, frozenset(keys) if keys is not None else None))
+
+    def _notify(self, changed):
+        for listener, keys in list(self._listeners):
+            if keys is None or keys & changed:
+                try:
+                    listener(self, changed)
+                except Exception as e:
+                    print(f"⚠️ Config listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+    # --- Persistence (config-writer thread) ---
+    def _schedule_write(self):
+        with self._dirty:
+            self._pending = True
+            self._dirty.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._dirty:
+                while not self._pending and not self._closed:
+                    self._dirty.wait()
+                if not self._pending:
+                    return
+                # Debounce: keep waiting while more changes arrive
+                while not self._closed:
+                    self._pending = False
+                    self._dirty.wait(self.debounce)
+                    if not self._pending:
+                        break
+                self._pending = False
+            self._write(self.snapshot())
+
+    def _write(self, config):
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(config, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self.writes += 1
+            self.last_error = None
+        except OSError as e:
+            self.last_error = str(e)
+            print(f"Error saving config: {e}")
+
+    def flush(self):
+        """Write the current config now (blocking)."""
+        with self._dirty:
+            self._pending = False
+        self._write(self.snapshot())
+        return self.last_error is None
+
+    def close(self):
+        """Stop the writer, writing any pending change first."""
+        with self._dirty:
+            pending = self._pending
+            self._closed = True
+            self._dirty.notify()
+        self._writer.join(timeout=2)
+        if pending:
+            self.flush()
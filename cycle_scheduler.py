@@ -0,0 +1,433 @@
+# In file: cycle_scheduler.py
+"""
+Pipelined production cycle for /api/start.
+
+The serial cycle runs every phase back to back: rotate, settle, check
+hall and inductive, slider IN, slider OUT, pause, next rotation. The
+CycleScheduler overlaps the phases that do not depend on each other:
+
+- the next move is planned and the driver enabled during the pause
+- the settle wait is skipped at empty positions whose hall and inductive
+  sensors have been quiet for sensor_stable_seconds. Otherwise it is
+  settle_seconds counted from the last sensor change, taken once when the
+  move ends: quiet time before that counts towards it, but a change during
+  the wait does not extend it
+- with slider_overlap on, the slider's OUT stroke finishes in the
+  background while the table indexes, once the slider has travelled
+  slider_clear_pulses away from IN (the mechanical interlock)
+
+With drift_correction on, the table re-finds the hall edge once per
+revolution (and whenever the hall is missed at a position) and corrects
+hw.position_steps, instead of stopping with a position mismatch.
+
+A stalled move no longer ends the run while the stall_retries budget
+lasts (a move that fails without recording a stall still ends it). hw.recover_from_stall() resets the driver and brings the table to
+the failed position (re-sync to the hall, or re-home), and the cycle
+carries on with that position.
+
+Time saved by each overlap is added up and reported with the cycle result;
+the duration of every phase goes to hw.telemetry (see telemetry.py).
+If a RunJournal is given, every position is appended to it with its
+phase durations, sensor bits and result (see journal.py).
+With scan_mode on, the cycle starts with one revolution at scan_delay that
+samples the inductive sensor against the step count (hw.scan_revolution).
+The result is a key map of the step_degrees slots. After that the table
+indexes only to occupied slots, in the order with the least travel (see
+visit_order), instead of stopping and settling at every empty slot.
+
+With pipeline_enabled off the cycle runs exactly as the serial loop did.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from jobs import JobCancelled
+from journal import SENSORS, sensor_bits
+
+
+def occupied_slots(intervals, slots, ppr, tolerance=0.25):
+    """Slots (0..slots-1, slot k at k * ppr / slots steps) with an inductive interval nearby.
+
+    intervals are (first, last) absolute steps where the sensor was active;
+    a slot counts if one comes within tolerance of a slot pitch.
+    """
+    pitch = ppr / slots
+    reach = pitch * tolerance
+    found = set()
+    for first, last in intervals:
+        first, last = first % ppr, first % ppr + (last - first)
+        for k in range(slots):
+            centre = k * pitch
+            # Distance from the slot to the interval on the circle
+            for offset in (-ppr, 0, ppr):
+                a, b = first + offset - centre, last + offset - centre
+                if (a <= 0 <= b) or min(abs(a), abs(b)) <= reach:
+                    found.add(k)
+                    break
+    return sorted(found)
+
+
+def visit_order(current, targets, slots):
+    """Order the target slots to visit from slot current with the least travel.
+
+    Either sweeps one way, or goes one way and turns back, whichever is
+    shorter. Returns [(slot, signed slots to move)] (positive = CW).
+    """
+    order = []
+    targets = set(targets)
+    if current in targets:
+        order.append((current, 0))
+        targets.discard(current)
+    cw = sorted(targets, key=lambda k: (k - current) % slots)
+    dist = [(k - current) % slots for k in cw]
+    m = len(cw)
+    best = None
+    for split in range(m + 1):  # cw[:split] are visited turning CW, the rest turning CCW
+        reach_cw = dist[split - 1] if split else 0
+        reach_ccw = slots - dist[split] if split < m else 0
+        for cw_first in (True, False):
+            cost = (2 * reach_cw + reach_ccw) if cw_first else (2 * reach_ccw + reach_cw)
+            if best is None or cost < best[0]:
+                best = (cost, split, cw_first)
+    if best is None:
+        return order
+    _, split, cw_first = best
+    legs = [[(k, 1) for k in cw[:split]], [(k, -1) for k in reversed(cw[split:])]]
+    if not cw_first:
+        legs.reverse()
+    position = current
+    for slot, direction in legs[0] + legs[1]:
+        step = (slot - position) % slots if direction > 0 else -((position - slot) % slots)
+        order.append((slot, step))
+        position = slot
+    return order
+
+
+class CycleScheduler:
+    """Runs the multi-position cycle for one job."""
+
+    def __init__(self, hw, config, status, trigger, journal=None):
+        self.hw = hw
+        self.config = config
+        self.status = status      # app_state
+        self.trigger = trigger    # send_pico_command
+        self.journal = journal    # RunJournal, or None
+        self.telemetry = hw.telemetry
+        self._run_id = 0
+        self._position = None     # (cycle, angle) of the current position
+        self._durations = {}
+        self._sensor_bits = 0
+        self.recoveries = []      # stall recovery reports of this run
+        self._retries_used = 0
+        self.saved = {"settle": 0.0, "enable": 0.0, "slider_overlap": 0.0}
+        self._slider_thread = None
+        self._slider_result = None
+        self._slider_time = 0.0
+        self._checked_revolution = hw.position_steps // hw.PULSES_PER_REV
+
+    # --- Helpers ---
+    def _message(self, text):
+        self.status["system_message"] = text
+
+    @contextmanager
+    def _phase(self, name):
+        """Time a phase for telemetry and the journal record of this position."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self.telemetry.record_phase(name, seconds)
+            self._durations[name] = self._durations.get(name, 0.0) + seconds
+
+    def _start_position(self, cycle, angle):
+        self._position = (cycle, angle)
+        self._durations = {}
+        self._sample_sensors()
+
+    def _sample_sensors(self):
+        sensors = self.hw.sensors
+        self._sensor_bits = sensor_bits({name: sensors.is_active(name) for name in SENSORS})
+
+    def _log(self, result, keep=False):
+        """Append the current position to the journal (keep: the position goes on)."""
+        if self.journal is None or self._position is None:
+            return
+        cycle, angle = self._position
+        self.journal.record(self._run_id, cycle, angle, self._sensor_bits, result, self._durations)
+        if not keep:
+            self._position = None
+
+    def _recover_stall(self, job, cycle):
+        """Recover a stalled move within the run's retry budget; True if the table is at the position."""
+        budget = max(int(self.config.get('stall_retries', 2)), 0)
+        if self._retries_used >= budget:
+            return False
+        self._retries_used += 1
+        job.checkpoint()
+        self._message(f"⚠️ Motor stalled at position {cycle}. Recovering ({self._retries_used}/{budget})...")
+        with self.telemetry.phase("stall_recovery"):
+            report = self.hw.recover_from_stall()
+        if report is None:
+            return False
+        self.recoveries.append({"cycle": cycle, **report})
+        return True
+
+    def _move_args(self):
+        return dict(
+            speed=self.config['rotary_speed'],
+            accel_steps=self.config['rotary_accel_steps'],
+            decel_steps=self.config['rotary_decel_steps'],
+            s_curve=self.config['rotary_s_curve'],
+        )
+
+    def _settle(self, job, pipelined):
+        """Wait for the table to settle after a move; return the time waited.
+
+        The wait is fixed once the move ends (see the module docstring); it
+        is not re-checked against sensor changes during the wait.
+        """
+        settle = max(self.config.get('settle_seconds', 0.2), 0)
+        if not pipelined:
+            job.sleep(settle)
+            return settle
+
+        sensors = self.hw.sensors.channels
+        stable_for = max(self.config.get('sensor_stable_seconds', 0.05), 0)
+        last_change = max(sensors["hall"].changed_at, sensors["inductive"].changed_at)
+        quiet = time.perf_counter() - last_change
+        if quiet >= stable_for and not self.hw.read_inductive_sensor():
+            # Empty position and nothing has flickered: no need to settle
+            wait = 0.0
+        else:
+            wait = max(0.0, settle - quiet)
+        job.sleep(wait)
+        self.saved["settle"] += settle - wait
+        return wait
+
+    def _correct_drift(self):
+        """Align to the hall edge once per revolution, or now if the hall is missing."""
+        hw = self.hw
+        if not self.config.get('drift_correction', True):
+            return
+        revolution = hw.position_steps // hw.PULSES_PER_REV
+        if hw.read_hall_sensor() and revolution == self._checked_revolution:
+            return
+        self._checked_revolution = revolution
+        index = self.config['step_degrees'] / 360.0 * hw.PULSES_PER_REV
+        expected = int(round(round(hw.position_steps / index) * index))
+        with self.telemetry.phase("drift_check"):
+            hw.align_to_hall(expected)
+
+    def _slider_out(self, out_delay, overlap):
+        """Start the OUT stroke; with overlap, return once the slider is clear of the table."""
+        if not overlap:
+            return self.hw.slider_move_to_max(out_delay)
+
+        clear_pulses = max(int(self.config.get('slider_clear_pulses', 200)), 1)
+        if self.hw.slider_move_to_max(out_delay, max_pulses=clear_pulses):
+            return True  # reached OUT before the clearance point
+
+        def finish():
+            started = time.perf_counter()
+            self._slider_result = self.hw.slider_move_to_max(out_delay)
+            self._slider_time = time.perf_counter() - started
+
+        self._slider_result = None
+        self._slider_thread = threading.Thread(target=finish, name="slider-out", daemon=True)
+        self._slider_thread.start()
+        return True
+
+    def _join_slider(self):
+        """Wait for a background OUT stroke; return False if it failed."""
+        if self._slider_thread is None:
+            return True
+        waited = time.perf_counter()
+        self._slider_thread.join()
+        waited = time.perf_counter() - waited
+        self._slider_thread = None
+        # Only the part of the stroke that ran alongside other work was saved
+        self.saved["slider_overlap"] += max(0.0, self._slider_time - waited)
+        return bool(self._slider_result)
+
+    # --- Cycle ---
+    def run(self, job, total_cycles, in_delay, out_delay):
+        config = self.config
+        pipelined = bool(config.get('pipeline_enabled', True))
+        overlap = pipelined and bool(config.get('slider_overlap', False))
+        if overlap and not getattr(self.hw.pulse_engine, "concurrent", False):
+            print(f"Slider overlap disabled: {self.hw.pulse_engine.name} engine drives one axis at a time")
+            overlap = False
+
+        started = time.perf_counter()
+        self._run_id = self.journal.new_run() if self.journal is not None else 0
+        self.status["current_angle"] = 0
+        key_map = None
+        try:
+            step = config['step_degrees']
+            visits = [(i, (i * step) % 360, step) for i in range(1, total_cycles + 1)]
+            if config.get('scan_mode', False):
+                key_map, visits = self._scan_visits(job, total_cycles)
+            if visits is None:
+                result = {"success": False}
+            else:
+                result = self._run_positions(job, visits, in_delay, out_delay, pipelined, overlap)
+            if result["success"] and not self._join_slider():
+                self._message("ERROR: Slider failed to reach OUT limit switch.")
+                self._position = (total_cycles, self.status["current_angle"])
+                self._log("slider_out_failed")
+                result = {"success": False}
+        except JobCancelled:
+            self._log("cancelled")
+            raise
+        finally:
+            if self._slider_thread is not None:
+                self._slider_thread.join()
+                self._slider_thread = None
+
+        if key_map is not None:
+            result["key_map"] = key_map
+        result["run"] = self._run_id  # journal run number
+        result["stall_recoveries"] = self.recoveries
+        result["position_steps"] = self.hw.position_steps
+        result["drift"] = self.hw.last_drift
+        elapsed = time.perf_counter() - started
+        saved = sum(self.saved.values())
+        result["timing"] = {
+            "elapsed_s": round(elapsed, 3),
+            "saved_s": {k: round(v, 3) for k, v in self.saved.items()},
+            "serial_estimate_s": round(elapsed + saved, 3),
+            "gain_pct": round(100.0 * saved / (elapsed + saved), 1) if elapsed + saved > 0 else 0.0,
+        }
+        if result["success"]:
+            if pipelined:
+                self._message(f"Cycle complete. Ready. (pipelining saved {saved:.1f}s, {result['timing']['gain_pct']}%)")
+            else:
+                self._message("Cycle complete. Ready.")
+        return result
+
+    def _scan_visits(self, job, total_cycles):
+        """Scan one revolution; return (key map, visits to occupied slots) or (map, None) on failure."""
+        hw = self.hw
+        step = self.config['step_degrees']
+        slots = int(round(360.0 / abs(step))) if step else 0
+        if slots < 1 or abs(slots * abs(step) - 360.0) > 1e-6:
+            self._message("Scan mode needs step_degrees to divide 360; running every position.")
+            return None, [(i, (i * step) % 360, step) for i in range(1, total_cycles + 1)]
+
+        self._message("Scanning for keys (one revolution)...")
+        job.checkpoint()
+        with self._phase("scan"):
+            intervals = hw.scan_revolution(float(self.config.get('scan_delay', 0.0005)))
+        if intervals is None:
+            self._message("ERROR: Motor stalled during the key scan!")
+            return None, None
+        ppr = hw.PULSES_PER_REV
+        occupied = occupied_slots(intervals, slots, ppr)
+        key_map = {"slots": slots, "occupied_deg": [round(k * 360.0 / slots, 3) for k in occupied]}
+
+        # The positions a normal run would visit, one revolution per pass, keeping only occupied slots
+        direction = 1 if step > 0 else -1
+        current = int(round(hw.position_steps * slots / ppr)) % slots
+        visits = []
+        for first in range(1, total_cycles + 1, slots):
+            wanted = {(direction * i) % slots for i in range(first, min(first + slots, total_cycles + 1))}
+            number = {(direction * i) % slots: i for i in range(first, min(first + slots, total_cycles + 1))}
+            for slot, moves in visit_order(current, wanted & set(occupied), slots):
+                visits.append((number[slot], round(slot * 360.0 / slots, 3), moves * 360.0 / slots))
+                current = slot
+        self._message(f"Scan: keys at {len(occupied)} of {slots} positions; "
+                      f"visiting {len(visits)} of {total_cycles}.")
+        return key_map, visits
+
+    def _run_positions(self, job, visits, in_delay, out_delay, pipelined, overlap):
+        """Process visits [(cycle number, target angle, degrees to move there)]."""
+        config = self.config
+        hw = self.hw
+        phase = self._phase
+        total = len(visits)
+
+        for number, (i, target_angle, degrees) in enumerate(visits, 1):
+            job.checkpoint()
+            job.progress = {"cycle": i, "visit": number, "total": total}
+            self._start_position(i, target_angle)
+            self._message(f"Moving to position {i} ({target_angle}°)...")
+
+            stall_before = hw.last_stall
+            with phase("move"):
+                moved = hw.move_degrees(degrees, **self._move_args())
+            if not moved:
+                self._sample_sensors()
+                if hw.last_stall is stall_before:
+                    # Failed without recording a stall (e.g. a GPIO error): nothing to recover
+                    self._log("move_failed")
+                    self._message("ERROR: Rotary move failed!")
+                    return {"success": False, "failed_at": i}
+                if not self._recover_stall(job, i):
+                    self._log("stall")
+                    self._message("ERROR: Motor stalled during movement!")
+                    return {"success": False, "failed_at": i}
+                self._log("stall_recovered", keep=True)
+
+            self.status["current_angle"] = target_angle
+            with phase("settle"):
+                self._settle(job, pipelined)
+            self._correct_drift()
+            self._sample_sensors()
+
+            if not hw.read_hall_sensor():
+                self._log("position_mismatch")
+                self._message(f"ERROR: Position mismatch at {target_angle}°!")
+                return {"success": False}
+
+            if not hw.read_inductive_sensor():
+                self._log("empty")
+                self._message(f"No key at {target_angle}°. Moving on.")
+                continue
+
+            self._message(f"✅ Key detected at {target_angle}°. Triggering.")
+
+            # Send command to Pico to start poles timer
+            self.trigger("trigger_function")
+
+            # The previous OUT stroke must be finished before the next IN stroke
+            if not self._join_slider():
+                self._log("slider_out_failed")
+                self._message("ERROR: Slider failed to reach OUT limit switch.")
+                return {"success": False}
+
+            # Move slider to IN limit switch first
+            self._message("Key detected. Moving slider to IN position...")
+            with phase("slider_in"):
+                reached = hw.slider_move_to_min(in_delay)
+            if not reached:
+                self._log("slider_in_failed")
+                self._message("ERROR: Slider failed to reach IN limit switch.")
+                return {"success": False}
+
+            # Move slider to OUT (with overlap: only until it is clear of the table)
+            self._message("Slider at IN. Moving to OUT position...")
+            with phase("slider_out"):
+                reached = self._slider_out(out_delay, overlap)
+            if not reached:
+                self._log("slider_out_failed")
+                self._message("ERROR: Slider failed to reach OUT limit switch.")
+                return {"success": False}
+
+            # Wait for pause timer to complete; plan and enable the next move meanwhile
+            pause_time = max(config['pause_seconds'], 0)
+            self._message(f"Slider at OUT. Waiting {pause_time:.1f}s for poles timer...")
+            with phase("pause"):
+                pause_started = time.perf_counter()
+                if pipelined and number < total:
+                    # Only settle time still ahead of the next move is saved; none if the driver stayed on
+                    settle = hw.rotary_driver.remaining()
+                    hw.prepare_move(visits[number][2], **self._move_args())
+                    self.saved["enable"] += min(settle, pause_time)
+                job.sleep(pause_time - (time.perf_counter() - pause_started))
+
+            self._log("key")
+            self._message("Poles timer complete. Ready for next position.")
+
+        return {"success": True}
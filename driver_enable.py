@@ -0,0 +1,127 @@
+# In file: driver_enable.py
+"""
+Stepper driver enable lines with state tracking and an idle policy.
+
+Every motion method used to enable its driver and sleep 0.1 s to let it
+settle, even when the driver was already enabled from the previous move.
+A DriverEnable remembers whether its line is on and when it was switched
+on. ensure() only waits for what is left of the settle time: nothing for
+a driver that has been on for a while, the full settle time right after
+switching on.
+
+With an idle timeout set, a driver that has not pulsed for that long is
+switched off (thermal policy; the next move re-enables it and waits the
+settle time). Waits, skipped waits and idle disables go to telemetry.
+"""
+
+import threading
+import time
+
+
+class DriverEnable:
+    """One driver's enable line (LOW = enabled on most drivers)."""
+
+    def __init__(self, name, gpio, pin, settle=0.1, telemetry=None, active_low=True):
+        self.name = name
+        self.gpio = gpio
+        self.pin = pin
+        self.settle = settle            # seconds from enable until the driver accepts steps
+        self.telemetry = telemetry
+        self.active_low = active_low
+        self.idle_timeout = 0.0         # > 0: switch off after this long without pulses
+        self.enabled = False
+        self.enabled_at = None
+        self.settle_credited = True     # this enable's settle saving is already in telemetry
+        self.last_used = time.perf_counter()
+        self.busy = 0                   # pulse trains in progress (never idle-disabled)
+        self._lock = threading.Lock()
+
+    def _write(self, enabled):
+        on, off = (self.gpio.LOW, self.gpio.HIGH) if self.active_low else (self.gpio.HIGH, self.gpio.LOW)
+        self.gpio.output(self.pin, on if enabled else off)
+
+    def set(self, enabled):
+        """Switch the line; re-enabling an enabled driver keeps its settle timing."""
+        with self._lock:
+            if enabled and self.enabled:
+                return False
+            self._switch(enabled)
+        self._report(enabled)
+        return True
+
+    def _switch(self, enabled):
+        self._write(enabled)
+        self.enabled = enabled
+        self.enabled_at = time.perf_counter() if enabled else None
+        self.settle_credited = not enabled
+        self.last_used = time.perf_counter()
+
+    def _report(self, enabled):
+        print(f"{self.name.capitalize()} motor {'enabled' if enabled else 'disabled'}")
+
+    def remaining(self):
+        """Settle time still to wait before the driver accepts steps."""
+        if not self.enabled:
+            return self.settle
+        return max(0.0, self.enabled_at + self.settle - time.perf_counter())
+
+    def settle_saving(self, switched_on):
+        """Settle saving to credit once per enable event: max(0, settle - time since enable)."""
+        if switched_on or self.settle_credited or not self.enabled:
+            return 0.0
+        self.settle_credited = True
+        return max(0.0, self.settle - (time.perf_counter() - self.enabled_at))
+
+    def touch(self):
+        self.last_used = time.perf_counter()
+
+    def check_idle(self, now):
+        """Switch off if idle for longer than idle_timeout; returns True if it did."""
+        with self._lock:  # a move touches last_used before enabling, so it can't be switched off under it
+            if self.idle_timeout <= 0 or not self.enabled or self.busy:
+                return False
+            if now - self.last_used < self.idle_timeout:
+                return False
+            self._switch(False)
+        self._report(False)
+        if self.telemetry is not None:
+            self.telemetry.record_driver_idle_off(self.name)
+        return True
+
+
+def ensure_enabled(*drivers):
+    """Enable drivers and wait only for the longest remaining settle time. Returns the time waited."""
+    switched, saved = [], []
+    for driver in drivers:
+        driver.touch()
+        switched_on = driver.set(True)
+        switched.append(switched_on)
+        saved.append(driver.settle_saving(switched_on))
+    wait = max(driver.remaining() for driver in drivers)
+    if wait > 0:
+        time.sleep(wait)
+    for driver, switched_on, saved_s in zip(drivers, switched, saved):
+        if driver.telemetry is not None:
+            driver.telemetry.record_driver_enable(driver.name, switched_on, wait, saved_s)
+    return wait
+
+
+class IdleMonitor:
+    """Background thread that applies the idle timeout of a set of drivers."""
+
+    def __init__(self, drivers, interval=0.25):
+        self.drivers = drivers
+        self.interval = interval
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="driver-idle", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            for driver in self.drivers:
+                driver.check_idle(now)
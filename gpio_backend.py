@@ -0,0 +1,303 @@
+# In file: gpio_backend.py
+"""
+Swappable GPIO backends.
+
+load_gpio() returns an object with the RPi.GPIO interface (setmode, setup,
+output, input, add_event_detect, ...). By default that is the real RPi.GPIO
+module; only with KEY_LOADER_GPIO=sim is it a SimulatedGPIO wired to a
+SimulatedMachine, a small model of the key loader:
+a rotary table with hall magnets and inductive key positions, a slider with
+MIN/MAX limit switches, and the driver alarm line.
+"""
+
+import os
+import threading
+import time
+
+
+# Default BCM pin map, matching HardwareController
+DEFAULT_PINS = {
+    "step": 20,
+    "dir": 21,
+    "enable": 22,
+    "alarm": 16,
+    "hall": 26,
+    "inductive": 19,
+    "slider_step": 23,
+    "slider_dir": 24,
+    "slider_enable": 25,
+    "slider_min": 13,
+    "slider_max": 12,
+    "home_switch": 5,
+    "end_switch": 6,
+}
+
+
+class SimulatedMachine:
+    """Mechanical model driven by the simulated step/dir/enable outputs.
+
+    Positions are in step pulses. The rotary table has a hall magnet at
+    every angle in magnet_angles (the production table has one per index
+    position) and keys at key_angles. Inputs are active low like the real
+    wiring: an active sensor reads LOW.
+    """
+
+    def __init__(self, pins=None, pulses_per_rev=3200, magnet_angles=None,
+                 hall_width_steps=30, key_angles=(), key_window_steps=40,
+                 slider_travel=800, start_angle=90.0):
+        self.pins = {role: pin for role, pin in dict(DEFAULT_PINS, **(pins or {})).items() if pin is not None}
+        self.pulses_per_rev = pulses_per_rev
+        if magnet_angles is None:
+            magnet_angles = [i * 36.0 for i in range(10)]
+        self.magnet_steps = [self._angle_to_steps(a) for a in magnet_angles]
+        self.hall_width_steps = hall_width_steps
+        self.key_steps = [self._angle_to_steps(a) for a in key_angles]
+        self.key_window_steps = key_window_steps
+        self.slider_travel = slider_travel
+
+        self.rotary_position = self._angle_to_steps(start_angle)
+        self.rotary_steps = 0        # total pulses accepted by the rotary axis
+        self.slider_position = slider_travel
+        self.slider_steps = 0
+        self.alarm = False
+        self._stall_after = None
+        self.limits = {"rotary_rate": None, "rotary_accel": None, "slider_rate": None}
+        self.lost_steps = 0          # slider pulses that did not move it (over slider_rate)
+        self._motion = {}            # axis -> (time, forward, rate) of its last step
+
+    def _angle_to_steps(self, angle):
+        return int(round(angle / 360.0 * self.pulses_per_rev)) % self.pulses_per_rev
+
+    # --- Fault injection ---
+    def inject_stall(self, after_steps=0):
+        """Raise the driver alarm after the given number of further rotary steps."""
+        self._stall_after = after_steps
+
+    def slip(self, steps):
+        """Move the table by steps without any pulses (lost or extra steps)."""
+        self.rotary_position = (self.rotary_position + steps) % self.pulses_per_rev
+
+    def set_limits(self, rotary_rate=None, rotary_accel=None, slider_rate=None):
+        """Torque model: above these the rotary driver stalls and the slider loses steps.
+
+        Rates are in pulses/s, rotary_accel in pulses/s^2; None = no limit.
+        Step times come from SimulatedGPIO.clock, so the limits apply to the
+        timing the pulse engine actually produced.
+        """
+        self.limits = {"rotary_rate": rotary_rate, "rotary_accel": rotary_accel, "slider_rate": slider_rate}
+
+    def _kinematics(self, axis, forward, t):
+        """Step rate and acceleration of this step; a step after a pause or reversal starts from rest."""
+        last = self._motion.get(axis)
+        self._motion[axis] = (t, forward, 0.0)
+        if last is None or last[1] != forward or not 0 < t - last[0] < self.REST_SECONDS:
+            return 0.0, 0.0
+        dt = t - last[0]
+        rate = 1.0 / dt
+        self._motion[axis] = (t, forward, rate)
+        return rate, (rate - last[2]) / dt if last[2] else 0.0
+
+    def _over_limit(self, axis, forward, t):
+        if t is None:
+            return False
+        rate, accel = self._kinematics(axis, forward, t)
+        if axis == "rotary":
+            max_rate, max_accel = self.limits["rotary_rate"], self.limits["rotary_accel"]
+            return bool((max_rate and rate > max_rate) or (max_accel and abs(accel) > max_accel))
+        return bool(self.limits["slider_rate"] and rate > self.limits["slider_rate"])
+
+    def clear_alarm(self):
+        self.alarm = False
+        self._stall_after = None
+
+    def set_keys(self, angles):
+        self.key_steps = [self._angle_to_steps(a) for a in angles]
+
+    # --- Sensor model ---
+    def _near(self, targets, window):
+        pos = self.rotary_position
+        rev = self.pulses_per_rev
+        for target in targets:
+            delta = (pos - target) % rev
+            if min(delta, rev - delta) <= window:
+                return True
+        return False
+
+    def input_levels(self):
+        """Active-state of every input, keyed by pin role."""
+        return {
+            "alarm": self.alarm,
+            "hall": self._near(self.magnet_steps, self.hall_width_steps // 2),
+            "inductive": self._near(self.key_steps, self.key_window_steps),
+            "slider_min": self.slider_position <= 0,
+            "slider_max": self.slider_position >= self.slider_travel,
+        }
+
+    # --- Actuator model ---
+    REST_SECONDS = 0.05  # a longer gap between steps counts as a stop
+
+    def step(self, axis, forward, enabled, t=None):
+        """One step pulse; t is the pulse time for the limits model (see set_limits)."""
+        if not enabled:
+            return
+        over = self._over_limit(axis, forward, t)
+        if axis == "rotary":
+            if self.alarm:
+                return  # a stalled closed-loop driver does not move
+            if over:
+                self.alarm = True
+                return
+            if self._stall_after is not None:
+                if self._stall_after <= 0:
+                    self.alarm = True
+                    self._stall_after = None
+                    return
+                self._stall_after -= 1
+            self.rotary_position = (self.rotary_position + (1 if forward else -1)) % self.pulses_per_rev
+            self.rotary_steps += 1
+        else:
+            self.slider_steps += 1
+            if over:
+                self.lost_steps += 1
+                return
+            self.slider_position += 1 if forward else -1
+
+    @property
+    def rotary_angle(self):
+        return self.rotary_position * 360.0 / self.pulses_per_rev
+
+
+class SimulatedGPIO:
+    """Drop-in stand-in for the RPi.GPIO module backed by a SimulatedMachine.
+
+    Edge callbacks run synchronously in the thread that changed the input
+    (unlike RPi.GPIO's event thread), which keeps simulations deterministic.
+    Set trace=True to record every output edge as (perf_counter, pin, level).
+    Step pulses are timed with clock() (perf_counter; SimulatedPulseEngine
+    substitutes its virtual clock).
+    """
+
+    simulated = True
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self, machine=None, trace=False):
+        self.machine = machine or SimulatedMachine()
+        self.trace = [] if trace else None
+        self._levels = {}
+        self._modes = {}
+        self._callbacks = {}
+        self._lock = threading.RLock()
+        self._roles = {pin: role for role, pin in self.machine.pins.items()}
+        self._inputs = {}
+        self.clock = time.perf_counter
+
+    # --- RPi.GPIO API ---
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, channel, direction, pull_up_down=None, initial=None):
+        self._modes[channel] = direction
+        if direction == self.OUT:
+            self._levels[channel] = self.LOW if initial is None else initial
+        else:
+            self._inputs = self._sample()
+
+    def output(self, channel, value):
+        value = self.HIGH if value else self.LOW
+        with self._lock:
+            previous = self._levels.get(channel, self.LOW)
+            self._levels[channel] = value
+            if self.trace is not None:
+                self.trace.append((time.perf_counter(), channel, value))
+            if value == self.HIGH and previous == self.LOW:
+                role = self._roles.get(channel)
+                if role == "step":
+                    self.machine.step("rotary", self._is_high("dir"), not self._is_high("enable"), self.clock())
+                    self._update_inputs()
+                elif role == "slider_step":
+                    self.machine.step("slider", self._is_high("slider_dir"), not self._is_high("slider_enable"),
+                                      self.clock())
+                    self._update_inputs()
+                elif role == "enable" and self.machine.alarm:
+                    # Disabling the driver clears its alarm, as on the real drive
+                    self.machine.clear_alarm()
+                    self._update_inputs()
+
+    def input(self, channel):
+        role = self._roles.get(channel)
+        if role in self._inputs:
+            return self.LOW if self._inputs[role] else self.HIGH
+        return self._levels.get(channel, self.HIGH)
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        self._callbacks[channel] = (edge, callback)
+
+    def remove_event_detect(self, channel):
+        self._callbacks.pop(channel, None)
+
+    def cleanup(self, channel=None):
+        self._callbacks.clear()
+
+    # --- Simulation helpers ---
+    def _is_high(self, role):
+        return self._levels.get(self.machine.pins[role], self.LOW) == self.HIGH
+
+    def _sample(self):
+        return self.machine.input_levels()
+
+    def _update_inputs(self):
+        """Re-sample the machine and fire callbacks for inputs that changed."""
+        new = self._sample()
+        old, self._inputs = self._inputs, new
+        for role, active in new.items():
+            if old.get(role) == active:
+                continue
+            pin = self.machine.pins[role]
+            if pin not in self._callbacks:
+                continue
+            edge, callback = self._callbacks[pin]
+            falling = active  # active low: activation is a falling edge
+            if edge == self.BOTH or (edge == self.FALLING) == falling:
+                if callback is not None:
+                    callback(pin)
+
+    def refresh(self):
+        """Push externally changed machine state (fault injection, keys) to the inputs."""
+        with self._lock:
+            self._update_inputs()
+
+
+def load_gpio(backend=None, pins=None, pulses_per_rev=3200):
+    """Return a GPIO backend: "rpi", "sim", or None for KEY_LOADER_GPIO (default "auto").
+
+    "auto" is RPi.GPIO: a broken GPIO install raises instead of running the
+    cycle on a simulated table. The simulator is only used when "sim" is
+    chosen explicitly. pins and pulses_per_rev configure the simulated
+    machine to match the controller's pin map (ignored on real hardware).
+    """
+    backend = backend or os.environ.get("KEY_LOADER_GPIO", "auto")
+    if backend == "sim":
+        return SimulatedGPIO(SimulatedMachine(pins, pulses_per_rev))
+    if backend not in ("auto", "rpi"):
+        raise ValueError(f"unknown GPIO backend {backend!r} (use 'rpi', 'sim' or 'auto')")
+    try:
+        import RPi.GPIO as GPIO
+    except (ImportError, RuntimeError) as e:
+        print(f"🛑 RPi.GPIO unavailable ({e}). Set KEY_LOADER_GPIO=sim to run on the simulator.")
+        raise
+    return GPIO
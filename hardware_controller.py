@@ -1,10 +1,44 @@
 # In file: hardware_controller.py
 
-import RPi.GPIO as GPIO
 import time
+from array import array
+from bisect import bisect_right
+
+from gpio_backend import load_gpio
+from motion_profile import plan_move, plan_stroke
+from multi_axis import Axis, merge_axes
+from pulse_engine import create_pulse_engine, cumulative_times
+from realtime import RealtimeMode
+from driver_enable import DriverEnable, IdleMonitor, ensure_enabled
+from sensor_events import SensorEvents
+from telemetry import Telemetry
+
+# --- ADDED: Pin roles (as in gpio_backend.DEFAULT_PINS) -> controller attributes ---
+PIN_ATTRIBUTES = {
+    "step": "STEP_PIN",
+    "dir": "DIR_PIN",
+    "enable": "ENABLE_PIN",
+    "alarm": "ALM_PIN",
+    "hall": "HALL_PIN",
+    "inductive": "INDUCTIVE_PIN",
+    "home_switch": "HOME_SWITCH_PIN",
+    "end_switch": "END_SWITCH_PIN",
+    "slider_step": "SLIDER_STEP_PIN",
+    "slider_dir": "SLIDER_DIR_PIN",
+    "slider_enable": "SLIDER_ENABLE_PIN",
+    "slider_min": "SLIDER_MIN_PIN",
+    "slider_max": "SLIDER_MAX_PIN",
+}
+OPTIONAL_PINS = ("home_switch", "end_switch")  # may be None (not wired)
 
 class HardwareController:
-    def __init__(self):
+    def __init__(self, pulse_engine="auto", gpio=None, pins=None, pulses_per_rev=None):
+        # GPIO backend: RPi.GPIO on the Pi, or the simulated machine (see gpio_backend.py)
+        # gpio may also be a load_gpio() backend name ("rpi", "sim")
+        if gpio is None or isinstance(gpio, str):
+            gpio = load_gpio(gpio, pins=pins, pulses_per_rev=pulses_per_rev or 3200)
+        self.gpio = gpio
+
         # --- Pin Configuration (BCM numbering) ---
         # Rotary Motor (OMC Closed-Loop Stepper)
         self.STEP_PIN = 20
@@ -30,145 +64,309 @@ class HardwareController:
         self.SLIDER_MIN_PIN = 13
         self.SLIDER_MAX_PIN = 12
 
+        # --- ADDED: Per-station pin map ({role: BCM pin}, see stations.py) ---
+        for role, pin in (pins or {}).items():
+            if pin is None and role not in OPTIONAL_PINS:
+                raise ValueError(f"Pin '{role}' is required")
+            setattr(self, PIN_ATTRIBUTES[role], pin)
+
         # --- MODIFIED: Motor Configuration for MKS SERVO42C (NEMA 17) ---
         # A common setting for this driver is 16x microstepping on a 1.8° motor.
         # 200 full steps * 16 microsteps = 3200 pulses per revolution.
         # As always, verify this with your driver's DIP switch settings!
         self.PULSES_PER_REV = 3200
+        if pulses_per_rev:
+            self.PULSES_PER_REV = int(pulses_per_rev)  # per-station override
         self.SPEED_DELAY = 0.0005 # NEMA 17 may need a slightly slower speed
 
+        # --- ADDED: Two-speed homing (fast seek, back off, slow re-approach) ---
+        self.HOMING_SEEK_DELAY = 0.0002      # cruise half period of the fast seek
+        self.HOMING_SEEK_ACCEL_STEPS = 200   # ramp-up length of the fast seek
+        self.HOMING_APPROACH_DELAY = 0.001   # half period of the slow re-approach
+        self.HOMING_BACKOFF_STEPS = 50       # extra steps past the hall release before re-approach
+        self.HOMING_SHORT_SEEK_STEPS = 200   # seeks this short keep the fast edge (0 = always re-approach)
+        self.HOMING_MEASURE_WIDTH = False    # measure the hall width (two more slow passes over the magnet)
+        self.last_homing = None              # report of the last homing run
+
+        # --- ADDED: Absolute rotary position (steps, CW positive; 0 = home hall edge) ---
+        self.position_steps = 0              # integer step count since homing / set_zero
+        self._step_remainder = 0.0           # fractional steps carried between moves
+        self.HALL_CHECK_WINDOW = self.PULSES_PER_REV // 20  # search range of align_to_hall()
+        self.last_drift = None               # report of the last align_to_hall()
+        self.drift_corrections = 0
+
+        # --- ADDED: Stall recovery ---
+        self.DRIVER_RESET_SECONDS = 0.3      # driver held disabled to clear its alarm
+        self.last_stall = None               # where the last stalled move stopped
+        self.stall_recoveries = 0
+
+        # --- ADDED: Adaptive slider strokes (learned travel, fast cruise, slow approach) ---
+        self.SLIDER_ADAPTIVE = True
+        self.SLIDER_CRUISE_DELAY = 0.0002    # half period while cruising
+        self.SLIDER_RAMP_PULSES = 100        # ramp up / down between approach and cruise speed
+        self.SLIDER_APPROACH_PULSES = 80     # slow pulses before the expected switch point
+        self.SLIDER_OVERRUN_PULSES = 80      # slow pulses past it before falling back to the search
+        self.slider_travel = None            # MIN -> MAX pulses, learned from a full stroke
+        self.slider_position = None          # pulses from MIN, None when unknown
+        self.last_slider_stroke = None
+
         # --- Setup GPIO ---
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setwarnings(False)
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setwarnings(False)
         
         # Rotary motor control pins
-        GPIO.setup(self.STEP_PIN, GPIO.OUT)
-        GPIO.setup(self.DIR_PIN, GPIO.OUT)
-        GPIO.setup(self.ENABLE_PIN, GPIO.OUT)
+        self.gpio.setup(self.STEP_PIN, self.gpio.OUT)
+        self.gpio.setup(self.DIR_PIN, self.gpio.OUT)
+        self.gpio.setup(self.ENABLE_PIN, self.gpio.OUT)
         
         # Input pins (sensors and alarms)
-        GPIO.setup(self.ALM_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(self.HALL_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(self.INDUCTIVE_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self.gpio.setup(self.ALM_PIN, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
+        self.gpio.setup(self.HALL_PIN, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
+        self.gpio.setup(self.INDUCTIVE_PIN, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
         
-        # --- ADDED: Setup limit switch pins ---
-        GPIO.setup(self.HOME_SWITCH_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(self.END_SWITCH_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        # --- ADDED: Setup limit switch pins (None = not wired) ---
+        for pin in (self.HOME_SWITCH_PIN, self.END_SWITCH_PIN):
+            if pin is not None:
+                self.gpio.setup(pin, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
 
         # --- ADDED: Setup slider switches ---
-        GPIO.setup(self.SLIDER_MIN_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(self.SLIDER_MAX_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self.gpio.setup(self.SLIDER_MIN_PIN, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
+        self.gpio.setup(self.SLIDER_MAX_PIN, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
 
         # --- ADDED: Setup slider motor control pins ---
-        GPIO.setup(self.SLIDER_STEP_PIN, GPIO.OUT)
-        GPIO.setup(self.SLIDER_DIR_PIN, GPIO.OUT)
-        GPIO.setup(self.SLIDER_ENABLE_PIN, GPIO.OUT)
+        self.gpio.setup(self.SLIDER_STEP_PIN, self.gpio.OUT)
+        self.gpio.setup(self.SLIDER_DIR_PIN, self.gpio.OUT)
+        self.gpio.setup(self.SLIDER_ENABLE_PIN, self.gpio.OUT)
         
         # Initialize enable pins (motors disabled by default)
-        GPIO.output(self.ENABLE_PIN, GPIO.HIGH)  # HIGH = disabled for most drivers
-        GPIO.output(self.SLIDER_ENABLE_PIN, GPIO.HIGH)  # HIGH = disabled for most drivers
+        self.gpio.output(self.ENABLE_PIN, self.gpio.HIGH)  # HIGH = disabled for most drivers
+        self.gpio.output(self.SLIDER_ENABLE_PIN, self.gpio.HIGH)  # HIGH = disabled for most drivers
+
+        # --- ADDED: Edge-triggered sensor cache (no self.gpio.input per step pulse) ---
+        # The simulator changes inputs faster than any real switch bounces
+        debounce = 0 if getattr(self.gpio, "simulated", False) else 0.002
+        self.sensors = SensorEvents(self.gpio, {
+            "alarm": self.ALM_PIN,
+            "hall": self.HALL_PIN,
+            "inductive": self.INDUCTIVE_PIN,
+            "slider_min": self.SLIDER_MIN_PIN,
+            "slider_max": self.SLIDER_MAX_PIN,
+        }, debounce=debounce)
+        self.sensors.start()
+
+        # --- ADDED: Pulse engine (pigpio waves, sleep loop fallback, or simulation) ---
+        if isinstance(pulse_engine, str):
+            if pulse_engine == "auto" and getattr(self.gpio, "simulated", False):
+                pulse_engine = "sleep"  # pigpio cannot drive the simulated pins
+            pulse_engine = create_pulse_engine(pulse_engine, self.gpio)
+        self.pulse_engine = pulse_engine
+        print(f"Pulse engine: {self.pulse_engine.name}")
+
+        # --- ADDED: Per-move timing and pulse interval telemetry (see telemetry.py) ---
+        self.telemetry = Telemetry()
+        if hasattr(self.pulse_engine, "telemetry"):
+            self.pulse_engine.telemetry = self.telemetry
+
+        # --- ADDED: Opt-in realtime scheduling for pulse-sending threads (see realtime.py) ---
+        self.realtime = RealtimeMode()
+
+        # --- ADDED: Driver enable state (skip redundant settle waits, idle auto-disable) ---
+        self.ENABLE_SETTLE_SECONDS = 0.1     # driver accepts steps this long after enabling
+        self.rotary_driver = DriverEnable("rotary", self.gpio, self.ENABLE_PIN,
+                                          self.ENABLE_SETTLE_SECONDS, self.telemetry)
+        self.slider_driver = DriverEnable("slider", self.gpio, self.SLIDER_ENABLE_PIN,
+                                          self.ENABLE_SETTLE_SECONDS, self.telemetry)
+        self._drivers = {"rotary": self.rotary_driver, "slider": self.slider_driver}
+        self._idle_monitor = IdleMonitor(list(self._drivers.values()))
+        self._aio = None                     # AsyncMotion, created by the aio property
         
         print("✅ Hardware Controller Initialized with Enable Pins and Limit Switches")
 
+    def pin_map(self):
+        """{role: BCM pin} as configured."""
+        return {role: getattr(self, attribute) for role, attribute in PIN_ATTRIBUTES.items()}
+
     # --- ADDED: Enable pin control methods ---
     def enable_rotary_motor(self, enabled=True):
         """Enable or disable the rotary motor."""
         # Most stepper drivers: LOW = enabled, HIGH = disabled
         # Some drivers are inverted, check your driver documentation
-        GPIO.output(self.ENABLE_PIN, GPIO.LOW if enabled else GPIO.HIGH)
-        status = "enabled" if enabled else "disabled"
-        print(f"Rotary motor {status}")
+        self.rotary_driver.set(enabled)
 
     def enable_slider_motor(self, enabled=True):
         """Enable or disable the slider motor."""
         # Most stepper drivers: LOW = enabled, HIGH = disabled
-        GPIO.output(self.SLIDER_ENABLE_PIN, GPIO.LOW if enabled else GPIO.HIGH)
-        status = "enabled" if enabled else "disabled"
-        print(f"Slider motor {status}")
+        self.slider_driver.set(enabled)
+
+    def set_driver_idle_timeout(self, seconds):
+        """Switch drivers off after this many seconds without pulses (0 = keep them enabled)."""
+        for driver in self._drivers.values():
+            driver.idle_timeout = max(0.0, float(seconds))
+        if seconds > 0:
+            self._idle_monitor.start()
 
     # --- MODIFIED: Homing Method (use hall sensor for home detection) ---
-    def home_table(self):
-        """Rotate the rotary motor until the hall sensor detects the magnet (home)."""
+    def home_table(self, two_speed=True):
+        """Rotate the rotary motor until the hall sensor detects the magnet (home).
+
+        With two_speed (default) the table seeks fast with a ramp, backs off
+        until the hall releases, then re-approaches slowly so the home edge
+        is found at low speed every time. A seek that finds the hall within
+        HOMING_SHORT_SEEK_STEPS never left its ramp, so its edge is kept and
+        the re-approach skipped. With HOMING_MEASURE_WIDTH the hall width is
+        measured too. The report (seek steps, offset between the fast and
+        slow edges, width) ends up in self.last_homing.
+        """
         print("Homing sequence (hall) started...")
+        started = time.perf_counter()
         
-        # Enable the motor before homing
-        self.enable_rotary_motor(True)
-        time.sleep(0.1)  # Allow motor to enable
+        # Enable the motor before homing (waits only if it was not already on)
+        ensure_enabled(self.rotary_driver)
         
         # Set direction for homing (e.g., counter-clockwise)
-        GPIO.output(self.DIR_PIN, GPIO.LOW)
+        self.gpio.output(self.DIR_PIN, self.gpio.LOW)
 
         # Rotate until hall is triggered (active low). Limit to ~1.5 revs to avoid loops
         max_steps = int(self.PULSES_PER_REV * 1.5)
-        for _ in range(max_steps):
-            if self.read_hall_sensor():
-                # Optional: back off a bit and re-approach slowly for better accuracy
-                print("✅ Hall detected. Homing complete.")
-                return True
+        if two_speed:
+            ok = self._home_two_speed(max_steps)
+        else:
+            delays = array('d', [self.SPEED_DELAY]) * max_steps
+            ok = self._step_until_hall(delays, active=True) < max_steps
+            self.last_homing = {"mode": "single", "success": ok}
+        self.last_homing["duration_s"] = round(time.perf_counter() - started, 3)
 
-            GPIO.output(self.STEP_PIN, GPIO.HIGH)
-            time.sleep(self.SPEED_DELAY)
-            GPIO.output(self.STEP_PIN, GPIO.LOW)
-            time.sleep(self.SPEED_DELAY)
+        if ok:
+            self.set_zero()
+            print("✅ Hall detected. Homing complete.")
+            return True
 
         print("🛑 ERROR: Homing failed! Hall not detected within expected travel.")
         # Disable motor on failure
         self.enable_rotary_motor(False)
         return False
 
-    def move_degrees(self, degrees, speed=50, accel_steps=100, decel_steps=100):
-        """Move the rotary motor by the given degrees with acceleration/deceleration."""
-        steps_to_move = int((abs(degrees) / 360.0) * self.PULSES_PER_REV)
+    def _step_until_hall(self, delays, active):
+        """Pulse the rotary motor until the hall is (active=True) or is not active."""
+        if active:
+            hall = self.sensors.channels["hall"]
+            hall.arm()
+            stop = lambda: hall.latched or self.read_hall_sensor()
+        else:
+            stop = lambda: not self.read_hall_sensor()
+        return self._send("rotary", self.STEP_PIN, delays, stop=stop)
 
-        # Enable motor before movement
-        self.enable_rotary_motor(True)
-        time.sleep(0.1)  # Allow motor to enable
+    def _home_two_speed(self, max_steps):
+        """Fast seek / back off / slow re-approach. Positions are steps in the homing direction."""
+        report = {"mode": "two_speed", "success": False}
+        self.last_homing = report
+        slow = self.HOMING_APPROACH_DELAY
+        seek = plan_move(max_steps, self.HOMING_SEEK_DELAY, self.HOMING_SEEK_ACCEL_STEPS, 1)
 
-        # Direction based on sign
-        if degrees >= 0:
-            GPIO.output(self.DIR_PIN, GPIO.HIGH)
-        else:
-            GPIO.output(self.DIR_PIN, GPIO.LOW)
+        # 1. Fast seek with a ramp; latch the step count at the hall edge
+        fast_edge = self._step_until_hall(seek.delays, active=True)
+        if fast_edge >= max_steps:
+            return False
+        report["seek_steps"] = fast_edge
+        if 0 < fast_edge <= self.HOMING_SHORT_SEEK_STEPS:
+            # Found on the ramp: backing off and re-approaching would cost more than the seek
+            report.update({"success": True, "reapproach": False})
+            print(f"Hall found after a short seek ({fast_edge} steps), re-approach skipped")
+            return True
+
+        # 2. Back off (reverse) until the hall releases, then a little further
+        self.gpio.output(self.DIR_PIN, self.gpio.HIGH)
+        limit = self.PULSES_PER_REV // 4
+        cleared = self._step_until_hall(array('d', [self.HOMING_SEEK_DELAY * 2]) * limit, active=False)
+        if cleared >= limit:
+            return False
+        self._send("rotary", self.STEP_PIN, array('d', [self.HOMING_SEEK_DELAY * 2]) * self.HOMING_BACKOFF_STEPS)
+        position = fast_edge - cleared - self.HOMING_BACKOFF_STEPS
+
+        # 3. Slow re-approach to the same edge for repeatable accuracy
+        self.gpio.output(self.DIR_PIN, self.gpio.LOW)
+        limit = cleared + 4 * self.HOMING_BACKOFF_STEPS
+        approach = self._step_until_hall(array('d', [slow]) * limit, active=True)
+        if approach >= limit:
+            return False
+        slow_edge = position + approach
+        degrees_per_step = 360.0 / self.PULSES_PER_REV
+        offset = fast_edge - slow_edge
+        report.update({"reapproach": True, "offset_steps": offset, "offset_deg": round(offset * degrees_per_step, 3)})
+
+        # 4. Optionally measure the hall width slowly, then return to the edge
+        if self.HOMING_MEASURE_WIDTH:
+            limit = self.PULSES_PER_REV // 4
+            width = self._step_until_hall(array('d', [slow]) * limit, active=False)
+            if width >= limit:
+                return False
+            self.gpio.output(self.DIR_PIN, self.gpio.HIGH)
+            self._send("rotary", self.STEP_PIN, plan_move(width, self.HOMING_SEEK_DELAY, 20, 20).delays)
+            self.gpio.output(self.DIR_PIN, self.gpio.LOW)
+            report.update({"hall_width_steps": width, "hall_width_deg": round(width * degrees_per_step, 3)})
+            print(f"Hall width {width} steps")
+
+        report["success"] = True
+        print(f"Fast/slow edge offset {offset} steps")
+        return True
+
+    def move_degrees(self, degrees, speed=50, accel_steps=100, decel_steps=100, s_curve=False, stop=None):
+        """Move the rotary motor by the given degrees with acceleration/deceleration.
+
+        Uses a constant-acceleration (trapezoidal) profile, or a jerk-limited
+        S-curve when s_curve is True. The fractional step left over by the
+        conversion is carried into the next move, and position_steps follows
+        every pulse actually sent. stop() returning True cancels the move.
+        """
+        signed_steps = self._steps_for(degrees)
+        steps_to_move = abs(signed_steps)
+        forward = signed_steps > 0 or (signed_steps == 0 and degrees >= 0)
 
         # Convert speed (0-100) to delay
         base_delay = self._speed_to_delay(speed)
         
-        print(f"Moving {steps_to_move} steps ({'CW' if degrees >= 0 else 'CCW'}) at speed {speed}...")
-        
-        # Calculate acceleration/deceleration phases
-        accel_phase = min(accel_steps, steps_to_move // 2)
-        decel_phase = min(decel_steps, steps_to_move // 2)
-        cruise_phase = steps_to_move - accel_phase - decel_phase
+        print(f"Moving {steps_to_move} steps ({'CW' if forward else 'CCW'}) at speed {speed}...")
         
+        # Precomputed (and cached) inter-pulse timing for this move
+        profile = plan_move(steps_to_move, base_delay, accel_steps, decel_steps, s_curve)
+        return self.move_planned(forward, profile.delays, stop=stop)
+
+    def move_planned(self, forward, delays, stop=None, remainder=None):
+        """Send a precomputed rotary pulse train (one delay per step) in one direction.
+
+        remainder, if given, is the fractional step to carry after the move
+        (the planner's, see step_remainder). Returns False if the driver
+        alarm cut the train short, or if stop() cancelled it (not recorded
+        as a stall).
+        """
+        steps_to_move = len(delays)
+        start = self.position_steps
+        if remainder is not None:
+            self._step_remainder = remainder
+
+        # Enable motor before movement (no wait if it is already on, e.g. after prepare_move())
+        ensure_enabled(self.rotary_driver)
+
+        # Direction based on sign
+        if forward:
+            self.gpio.output(self.DIR_PIN, self.gpio.HIGH)
+        else:
+            self.gpio.output(self.DIR_PIN, self.gpio.LOW)
+
         try:
-            # Acceleration phase
-            for i in range(accel_phase):
-                if GPIO.input(self.ALM_PIN) == GPIO.LOW:
-                    print("🛑 ERROR: Motor Stalled!")
-                    return False
-                
-                # Gradually decrease delay (increase speed)
-                delay = base_delay * (1.0 + (accel_phase - i) / accel_phase)
-                self._step_motor(delay)
-            
-            # Cruise phase
-            for _ in range(cruise_phase):
-                if GPIO.input(self.ALM_PIN) == GPIO.LOW:
-                    print("🛑 ERROR: Motor Stalled!")
-                    return False
-                
-                self._step_motor(base_delay)
-            
-            # Deceleration phase
-            for i in range(decel_phase):
-                if GPIO.input(self.ALM_PIN) == GPIO.LOW:
-                    print("🛑 ERROR: Motor Stalled!")
-                    return False
-                
-                # Gradually increase delay (decrease speed)
-                delay = base_delay * (1.0 + (i + 1) / decel_phase)
-                self._step_motor(delay)
-            
+            alarm = self.sensors.channels["alarm"]
+            alarm.arm()
+            stalled = lambda: alarm.latched or self._alarm_active()
+            halt = stalled if stop is None else (lambda: stalled() or stop())
+            sent = self._send("rotary", self.STEP_PIN, delays, stop=halt)
+            self.position_steps += sent if forward else -sent
+            if sent < steps_to_move and not stalled():
+                print(f"⏹️ Move cancelled after {sent} of {steps_to_move} steps")
+                return False
+            if sent < steps_to_move:
+                self._record_stall(sent, start + (steps_to_move if forward else -steps_to_move))
+                print("🛑 ERROR: Motor Stalled!")
+                return False
             return True
             
         except Exception as e:
@@ -179,6 +377,293 @@ class HardwareController:
             # self.enable_rotary_motor(False)
             pass
     
+    def prepare_move(self, degrees, speed=50, accel_steps=100, decel_steps=100, s_curve=False):
+        """Plan the next move and enable the driver ahead of time (e.g. during a pause).
+
+        The following move_degrees() call then starts pulsing immediately.
+        """
+        self.plan_rotary(abs(self._steps_for(degrees, carry=False)), speed, accel_steps, decel_steps, s_curve)
+        self.rotary_driver.touch()
+        self.rotary_driver.set(True)  # settles during the pause; the move waits only for the rest
+
+    def plan_rotary(self, steps, speed=50, accel_steps=100, decel_steps=100, s_curve=False):
+        """Motion profile (cached) of a rotary move of steps at a 0-100 speed."""
+        return plan_move(steps, self._speed_to_delay(speed), accel_steps, decel_steps, s_curve)
+
+    # --- ADDED: Absolute position tracking and hall drift correction ---
+    @property
+    def step_remainder(self):
+        """Fractional step carried into the next move (-0.5 to 0.5)."""
+        return self._step_remainder
+
+    def _steps_for(self, degrees, carry=True):
+        """Signed whole steps for a move; the fractional rest is carried to the next move."""
+        exact = degrees / 360.0 * self.PULSES_PER_REV + self._step_remainder
+        steps = int(round(exact))
+        if carry:
+            self._step_remainder = exact - steps
+        return steps
+
+    @property
+    def position_degrees(self):
+        """Absolute table angle in degrees (not wrapped)."""
+        return (self.position_steps + self._step_remainder) * 360.0 / self.PULSES_PER_REV
+
+    def set_zero(self):
+        """Make the current table position the absolute zero."""
+        self.position_steps = 0
+        self._step_remainder = 0.0
+
+    def align_to_hall(self, expected_steps=None, window=None):
+        """Re-find the hall edge near the current position and correct drift.
+
+        Uses the same edge as homing (slow CCW approach), so it only costs a
+        short back-off and re-approach instead of a full home. The edge is
+        assumed to be at expected_steps (default: the nearest whole
+        revolution); position_steps is corrected to it and the drift is
+        reported in self.last_drift.
+        """
+        window = window or self.HALL_CHECK_WINDOW
+        if expected_steps is None:
+            expected_steps = round(self.position_steps / self.PULSES_PER_REV) * self.PULSES_PER_REV
+        counted = self.position_steps
+        back_off = array('d', [self.HOMING_SEEK_DELAY * 2])
+        slow = array('d', [self.HOMING_APPROACH_DELAY])
+
+        ensure_enabled(self.rotary_driver)
+
+        # 1. Get onto the magnet: if the hall is off, go back window steps and search CW
+        self.gpio.output(self.DIR_PIN, self.gpio.HIGH)
+        travelled = 0
+        if not self.read_hall_sensor():
+            self.gpio.output(self.DIR_PIN, self.gpio.LOW)
+            travelled -= self._send("rotary", self.STEP_PIN, back_off * window)
+            self.gpio.output(self.DIR_PIN, self.gpio.HIGH)
+            found = self._step_until_hall(back_off * (2 * window), active=True)
+            travelled += found
+            if found >= 2 * window:
+                self.position_steps += travelled
+                print("🛑 ERROR: Hall not found near the expected position.")
+                return False
+
+        # 2. Leave the magnet on its CW side and back off a little further
+        cleared = self._step_until_hall(back_off * window, active=False)
+        travelled += cleared + self._send("rotary", self.STEP_PIN, back_off * self.HOMING_BACKOFF_STEPS)
+
+        # 3. Slow CCW re-approach to the home edge
+        self.gpio.output(self.DIR_PIN, self.gpio.LOW)
+        limit = cleared + 4 * self.HOMING_BACKOFF_STEPS
+        approach = self._step_until_hall(slow * limit, active=True)
+        travelled -= approach
+        self.position_steps = counted + travelled
+        if cleared >= window or approach >= limit:
+            print("🛑 ERROR: Hall edge not found during drift check.")
+            return False
+
+        drift = self.position_steps - expected_steps
+        self.position_steps = expected_steps
+        self.drift_corrections += 1
+        self.last_drift = {
+            "drift_steps": drift,
+            "drift_deg": round(drift * 360.0 / self.PULSES_PER_REV, 3),
+            "at_steps": expected_steps,
+            "corrections": self.drift_corrections,
+        }
+        if drift:
+            print(f"Drift corrected: {drift} steps at {expected_steps}")
+        return True
+
+    # --- ADDED: Key presence scan (one revolution, inductive sampled against the step count) ---
+    def scan_revolution(self, delay=0.0005, ramp_steps=100):
+        """Turn one revolution CW and return where the inductive sensor was active.
+
+        Returns [(first, last)] absolute step ranges, or None if the alarm
+        stopped the scan. The sensor is sampled in the stop callback: the
+        sleep and sim engines call it before every pulse, so the call count
+        is the step. Engines that only poll it (pigpio) get the sample time
+        mapped to a step through the train's timing instead.
+        """
+        delays = plan_move(self.PULSES_PER_REV, delay, ramp_steps, ramp_steps).delays
+        per_pulse = getattr(self.pulse_engine, "stop_per_pulse", False)
+        starts = None if per_pulse else cumulative_times(delays)
+        start_steps = self.position_steps
+        alarm = self.sensors.channels["alarm"]
+        changes = []  # (step, active) whenever the sensor changes
+        state = {"calls": 0, "t0": None, "last": None}
+
+        def probe():
+            now = time.perf_counter()
+            if state["t0"] is None:
+                state["t0"] = now
+            active = self.read_inductive_sensor()
+            if active != state["last"]:
+                step = state["calls"] if per_pulse else max(0, bisect_right(starts, now - state["t0"]) - 1)
+                changes.append((step, active))
+                state["last"] = active
+            state["calls"] += 1
+            return alarm.latched or self._alarm_active()
+
+        print(f"Scanning one revolution ({len(delays)} steps)...")
+        ensure_enabled(self.rotary_driver)
+        self.gpio.output(self.DIR_PIN, self.gpio.HIGH)
+        alarm.arm()
+        sent = self._send("rotary", self.STEP_PIN, delays, stop=probe)
+        self.position_steps += sent
+        if sent < len(delays):
+            self._record_stall(sent, start_steps + len(delays))
+            print("🛑 ERROR: Motor Stalled!")
+            return None
+
+        intervals, begin = [], None
+        for step, active in changes:
+            if active:
+                begin = step
+            elif begin is not None:
+                intervals.append((start_steps + begin, start_steps + step - 1))
+                begin = None
+        if begin is not None:
+            intervals.append((start_steps + begin, start_steps + sent))
+        return intervals
+
+    # --- ADDED: Coordinated rotary + slider move ---
+    def move_coordinated(self, degrees, slider_pulses, slider_out=True, speed=50,
+                         accel_steps=100, decel_steps=100, s_curve=False, slider_delay=None):
+        """Move the table and the slider at the same time in one step stream.
+
+        With slider_delay=None the slider's pulses are spread evenly over the
+        rotary move (Bresenham), so both axes start and finish together.
+        Otherwise the slider runs its own constant-rate train from the start.
+        The caller must keep slider_pulses inside the slider's travel: the
+        limit switches are not used as stop conditions here.
+        """
+        signed_steps = self._steps_for(degrees)
+        steps_to_move = abs(signed_steps)
+        forward = signed_steps >= 0
+
+        ensure_enabled(self.rotary_driver, self.slider_driver)
+
+        self.gpio.output(self.DIR_PIN, self.gpio.HIGH if forward else self.gpio.LOW)
+        self.gpio.output(self.SLIDER_DIR_PIN, self.gpio.HIGH if slider_out else self.gpio.LOW)
+
+        profile = plan_move(steps_to_move, self._speed_to_delay(speed), accel_steps, decel_steps, s_curve)
+        rotary = Axis.from_delays(self.STEP_PIN, profile.delays)
+        if slider_delay is None:
+            slider = Axis.linked(self.SLIDER_STEP_PIN, profile.delays, slider_pulses)
+        else:
+            slider = Axis.from_delays(self.SLIDER_STEP_PIN, array('d', [slider_delay]) * int(slider_pulses))
+        stream = merge_axes([rotary, slider])
+
+        print(f"Coordinated move: {steps_to_move} rotary steps, {len(slider)} slider pulses "
+              f"({stream.duration:.3f}s)...")
+        try:
+            alarm = self.sensors.channels["alarm"]
+            alarm.arm()
+            self.rotary_driver.busy += 1
+            self.slider_driver.busy += 1
+            try:
+                with self.realtime.move():
+                    started = time.perf_counter()
+                    sent = self.pulse_engine.send_stream(stream, stop=lambda: alarm.latched or self._alarm_active())
+                    actual = time.perf_counter() - started
+            finally:
+                for driver in (self.rotary_driver, self.slider_driver):
+                    driver.busy -= 1
+                    driver.touch()
+            complete = sent == stream.counts
+            rotary_sent = sent.get(self.STEP_PIN, 0)
+            start = self.position_steps
+            self.position_steps += rotary_sent if forward else -rotary_sent
+            if self.slider_position is not None:
+                slider_sent = sent.get(self.SLIDER_STEP_PIN, 0)
+                self.slider_position += slider_sent if slider_out else -slider_sent
+            self.telemetry.record_move("coordinated", sum(sent.values()),
+                                       stream.duration if complete else None, actual, cut_short=not complete)
+            if not complete:
+                self._record_stall(rotary_sent, start + signed_steps)
+                print("🛑 ERROR: Motor Stalled!")
+                return False
+            return True
+        except Exception as e:
+            print(f"🛑 ERROR: Coordinated movement failed: {e}")
+            return False
+
+    # --- ADDED: Stall recovery (driver reset, re-sync to hall or re-home) ---
+    def _record_stall(self, sent, target_steps):
+        self.last_stall = {
+            "at_steps": self.position_steps,
+            "sent": sent,
+            "target_steps": target_steps,
+            "time": time.time(),
+        }
+
+    def recover_from_stall(self, target_steps=None):
+        """Clear a driver alarm and bring the table to target_steps (default: the stalled move's target).
+
+        The driver is disabled long enough to clear its alarm and enabled
+        again. The rest of the interrupted move is then sent at homing seek
+        speed and the table re-syncs to the hall edge at target_steps. If
+        the hall is not found there, the table is re-homed and sent to
+        target_steps from home. Returns a report, or None if the alarm does
+        not clear or the table cannot be positioned.
+        """
+        if target_steps is None:
+            if self.last_stall is None:
+                print("🛑 ERROR: No stall recorded to recover from.")
+                return None
+            target_steps = self.last_stall["target_steps"]
+        started = time.perf_counter()
+        report = {"stalled_at": self.position_steps, "target_steps": target_steps}
+
+        print("Stall recovery: resetting driver...")
+        if not self.reset_driver():
+            return None
+
+        if not self._seek_steps(target_steps - self.position_steps):
+            return None
+        if self.align_to_hall(target_steps):
+            report["method"] = "resync"
+        else:
+            print("Stall recovery: hall not found near the target, re-homing...")
+            if not self.home_table():
+                return None
+            revolution = target_steps - target_steps % self.PULSES_PER_REV
+            self.position_steps = revolution  # home edge of the target's revolution
+            if not self._seek_steps(target_steps - revolution) or not self.align_to_hall(target_steps):
+                return None
+            report["method"] = "rehome"
+
+        self.stall_recoveries += 1
+        report["drift"] = self.last_drift
+        report["duration_s"] = round(time.perf_counter() - started, 3)
+        print(f"✅ Stall recovered ({report['method']}) in {report['duration_s']}s")
+        return report
+
+    def reset_driver(self):
+        """Clear a rotary driver alarm by switching the driver off and on; False if it stays."""
+        self.enable_rotary_motor(False)
+        time.sleep(self.DRIVER_RESET_SECONDS)
+        ensure_enabled(self.rotary_driver)
+        if not self.sensors.wait_for("alarm", active=False, timeout=1.0):
+            print("🛑 ERROR: Driver alarm did not clear.")
+            return False
+        return True
+
+    def _seek_steps(self, signed_steps):
+        """Constant slow move of signed_steps; False if the alarm trips again."""
+        if not signed_steps:
+            return True
+        forward = signed_steps > 0
+        self.gpio.output(self.DIR_PIN, self.gpio.HIGH if forward else self.gpio.LOW)
+        alarm = self.sensors.channels["alarm"]
+        alarm.arm()
+        sent = self._send("rotary", self.STEP_PIN, array('d', [self.HOMING_SEEK_DELAY * 2]) * abs(signed_steps),
+                          stop=lambda: alarm.latched or self._alarm_active())
+        self.position_steps += sent if forward else -sent
+        if sent < abs(signed_steps):
+            print("🛑 ERROR: Motor stalled again during recovery.")
+            return False
+        return True
+
     def _speed_to_delay(self, speed):
         """Convert 0-100 speed to delay in seconds."""
         if speed <= 0:
@@ -186,63 +671,168 @@ class HardwareController:
         # Convert to delay: 100 = 0.0005s, 1 = 0.01s (inverse relationship)
         return max(0.0005, 0.01 / (speed / 100.0))
     
+    def set_realtime(self, enabled, cpu=None, priority=None):
+        """Switch realtime mode (CPU pinning, SCHED_FIFO, GC hold-off, hybrid timer)."""
+        self.realtime.configure(enabled=enabled, cpu=cpu, priority=priority)
+        if hasattr(self.pulse_engine, "spin"):
+            self.pulse_engine.spin = self.realtime.spin if enabled else 0.0
+
+    def _send(self, axis, pin, delays, stop=None):
+        """Send a pulse train through the engine and record its timing."""
+        driver = self._drivers[axis]
+        driver.busy += 1  # never idle-disabled while pulsing
+        try:
+            with self.realtime.move():
+                started = time.perf_counter()
+                sent = self.pulse_engine.send(pin, delays, stop=stop)
+                actual = time.perf_counter() - started
+        finally:
+            driver.busy -= 1
+            driver.touch()
+        commanded = 2.0 * sum(delays[:sent])
+        self.telemetry.record_move(axis, sent, commanded, actual, cut_short=sent < len(delays))
+        return sent
+
     def _step_motor(self, delay):
         """Single step with given delay."""
-        GPIO.output(self.STEP_PIN, GPIO.HIGH)
-        time.sleep(delay)
-        GPIO.output(self.STEP_PIN, GPIO.LOW)
-        time.sleep(delay)
+        self._send("rotary", self.STEP_PIN, (delay,))
+
+    # Sensor reads come from the edge-triggered cache, not the pins
+    def _alarm_active(self):
+        return self.sensors.is_active("alarm")
 
     def read_hall_sensor(self):
-        return GPIO.input(self.HALL_PIN) == GPIO.LOW
+        return self.sensors.is_active("hall")
 
     def read_inductive_sensor(self):
-        return GPIO.input(self.INDUCTIVE_PIN) == GPIO.LOW
+        return self.sensors.is_active("inductive")
 
     # --- ADDED: Slider limit switch reads ---
     def read_slider_min(self):
-        return GPIO.input(self.SLIDER_MIN_PIN) == GPIO.LOW
+        return self.sensors.is_active("slider_min")
 
     def read_slider_max(self):
-        return GPIO.input(self.SLIDER_MAX_PIN) == GPIO.LOW
+        return self.sensors.is_active("slider_max")
 
     # --- ADDED: Slider movement helpers ---
-    def slider_move_to_max(self, speed_delay: float, max_pulses: int = 20000) -> bool:
+    def slider_move_to_max(self, speed_delay: float, max_pulses: int = 20000, stop=None) -> bool:
         """Drive slider outward until MAX switch triggers or max_pulses reached."""
-        # Enable slider motor
-        self.enable_slider_motor(True)
-        time.sleep(0.1)
+        # Enable slider motor (no wait if it is already on)
+        ensure_enabled(self.slider_driver)
         
-        GPIO.output(self.SLIDER_DIR_PIN, GPIO.HIGH)
-        for _ in range(max_pulses):
-            if self.read_slider_max():
-                return True
-            GPIO.output(self.SLIDER_STEP_PIN, GPIO.HIGH)
-            time.sleep(speed_delay)
-            GPIO.output(self.SLIDER_STEP_PIN, GPIO.LOW)
-            time.sleep(speed_delay)
-        return False
+        self.gpio.output(self.SLIDER_DIR_PIN, self.gpio.HIGH)
+        return self._slider_stroke(True, speed_delay, max_pulses, stop)
 
-    def slider_move_to_min(self, speed_delay: float, max_pulses: int = 20000) -> bool:
+    def slider_move_to_min(self, speed_delay: float, max_pulses: int = 20000, stop=None) -> bool:
         """Drive slider inward until MIN switch triggers or max_pulses reached."""
-        # Enable slider motor
-        self.enable_slider_motor(True)
-        time.sleep(0.1)
+        # Enable slider motor (no wait if it is already on)
+        ensure_enabled(self.slider_driver)
         
-        GPIO.output(self.SLIDER_DIR_PIN, GPIO.LOW)
-        for _ in range(max_pulses):
-            if self.read_slider_min():
-                return True
-            GPIO.output(self.SLIDER_STEP_PIN, GPIO.HIGH)
-            time.sleep(speed_delay)
-            GPIO.output(self.SLIDER_STEP_PIN, GPIO.LOW)
-            time.sleep(speed_delay)
-        return False
+        self.gpio.output(self.SLIDER_DIR_PIN, self.gpio.LOW)
+        return self._slider_stroke(False, speed_delay, max_pulses, stop)
+
+    def _slider_stroke(self, to_max, speed_delay, max_pulses, stop=None):
+        """Move towards a limit switch; adaptive once the travel is known.
+
+        A stroke that starts on one switch and reaches the other teaches the
+        travel. With a known travel and position the stroke ramps up, cruises
+        at SLIDER_CRUISE_DELAY and only runs the last SLIDER_APPROACH_PULSES
+        at speed_delay. If the switch is not there by then (plus the overrun
+        allowance), the constant-speed search continues for the rest of
+        max_pulses. speed_delay is always the search / approach speed.
+        stop() returning True cancels the stroke (mode "cancelled").
+        """
+        switch = self.read_slider_max if to_max else self.read_slider_min
+        halt = switch if stop is None else (lambda: switch() or stop())
+        from_end = self.read_slider_min() if to_max else self.read_slider_max()
+        if from_end:
+            self.slider_position = 0 if to_max else self.slider_travel
+        distance = None
+        if self.slider_travel is not None and self.slider_position is not None:
+            distance = self.slider_travel - self.slider_position if to_max else self.slider_position
+
+        delays = array('d', [speed_delay]) * max_pulses
+        cruise = 0
+        if (self.SLIDER_ADAPTIVE and distance is not None and self.SLIDER_CRUISE_DELAY < speed_delay
+                and distance > self.SLIDER_APPROACH_PULSES):
+            fast = plan_stroke(distance - self.SLIDER_APPROACH_PULSES, speed_delay,
+                               self.SLIDER_CRUISE_DELAY, self.SLIDER_RAMP_PULSES).delays
+            window = array('d', [speed_delay]) * (self.SLIDER_APPROACH_PULSES + self.SLIDER_OVERRUN_PULSES)
+            cruise = len(fast)
+            delays = (fast + window)[:max_pulses]
+
+        sent = self._send("slider", self.SLIDER_STEP_PIN, delays, stop=halt)
+        reached = sent < len(delays) and switch()
+        cancelled = sent < len(delays) and not reached
+        outcome = "search"
+        if cruise:
+            outcome = "early" if reached and sent < cruise else "adaptive"
+            if not reached and not cancelled and len(delays) < max_pulses:
+                # Switch is late: fall back to the constant-speed search
+                outcome = "late"
+                rest = max_pulses - sent
+                more = self._send("slider", self.SLIDER_STEP_PIN, array('d', [speed_delay]) * rest, stop=halt)
+                sent += more
+                reached = more < rest and switch()
+                cancelled = more < rest and not reached
+        if cancelled:
+            outcome = "cancelled"
+            print(f"⏹️ Slider stroke cancelled after {sent} pulses")
+
+        if reached:
+            if to_max and self.slider_position is not None:
+                self._learn_slider_travel(self.slider_position + sent)
+            elif not to_max and from_end:
+                self._learn_slider_travel(sent)
+            self.slider_position = self.slider_travel if to_max else 0
+        elif self.slider_position is not None:
+            self.slider_position += sent if to_max else -sent
+
+        self.last_slider_stroke = {
+            "direction": "out" if to_max else "in",
+            "mode": outcome,
+            "pulses": sent,
+            "expected": distance,
+            "reached": reached,
+        }
+        return reached
+
+    def _learn_slider_travel(self, pulses):
+        if pulses <= 0:
+            return
+        if self.slider_travel != pulses:
+            print(f"Slider travel {'learned' if self.slider_travel is None else 'updated'}: {pulses} pulses")
+        self.slider_travel = pulses
+
+    # --- ADDED: asyncio facade (see async_motion.py) ---
+    @property
+    def aio(self):
+        """AsyncMotion for this controller, created on first use."""
+        if self._aio is None:
+            from async_motion import AsyncMotion  # asyncio is only imported when used
+            self._aio = AsyncMotion(self)
+        return self._aio
+
+    async def move_degrees_async(self, degrees, speed=50, accel_steps=100, decel_steps=100, s_curve=False):
+        """Awaitable move_degrees(); cancelling the task stops the move."""
+        return await self.aio.move_degrees(degrees, speed, accel_steps, decel_steps, s_curve)
+
+    async def slider_stroke_async(self, direction, speed_delay, max_pulses=20000):
+        """Awaitable stroke to the MAX ("out") or MIN ("in") switch."""
+        return await self.aio.slider_stroke(direction, speed_delay, max_pulses)
+
+    async def wait_for(self, sensor, edge="active", timeout=None):
+        """Await a sensor state ("active", "inactive") or its next "change"; False on timeout."""
+        return await self.aio.wait_for(sensor, edge, timeout)
 
     def cleanup(self):
         """Clean up GPIO and disable all motors."""
         print("Disabling all motors...")
         self.enable_rotary_motor(False)
         self.enable_slider_motor(False)
-        GPIO.cleanup()
+        if self._aio is not None:
+            self._aio.close()
+        self.pulse_engine.close()
+        self.sensors.close()
+        self.gpio.cleanup()
         print("GPIO cleanup complete.")
\ No newline at end of file
@@ -0,0 +1,168 @@
+# In file: jobs.py
+"""
+Background job runner for motion work.
+
+Routes submit a job and return its id straight away; a single dedicated
+motion thread runs jobs one at a time, so GPIO motion never happens on a
+Flask request thread. Jobs cooperate with pause/cancel by calling
+job.checkpoint() between phases and job.sleep() instead of time.sleep().
+"""
+
+import itertools
+import queue
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled."""
+
+
+class Job:
+    """One unit of motion work and its progress."""
+
+    def __init__(self, job_id, kind, func, args, notify=None, on_done=None):
+        self.id = job_id
+        self.kind = kind
+        self.func = func
+        self.args = args
+        self.status = "queued"  # queued, running, paused, completed, failed, cancelled
+        self.message = ""
+        self.progress = {}
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._notify = notify
+        self._on_done = on_done  # called once when the job ends, even if it never ran
+
+    def _set_status(self, status):
+        self.status = status
+        if self._notify is not None:
+            self._notify(self)
+
+    @property
+    def done(self):
+        return self.status in ("completed", "failed", "cancelled")
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        self._resume.set()  # wake a paused job so it can exit
+
+    def pause(self):
+        if not self.done:
+            self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def checkpoint(self):
+        """Block while paused; raise JobCancelled if the job was cancelled."""
+        if not self._resume.is_set():
+            self._set_status("paused")
+            self._resume.wait()
+            if not self._cancel.is_set():
+                self._set_status("running")
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def sleep(self, seconds):
+        """Sleep that wakes up early on cancel and honours pause."""
+        if self._cancel.wait(max(seconds, 0)):
+            raise JobCancelled()
+        self.checkpoint()
+
+    def _finish(self, status):
+        self.finished_at = time.time()
+        try:
+            if self._on_done is not None:
+                self._on_done(self)
+        finally:
+            self._set_status(status)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "message": self.message,
+            "progress": self.progress,
+            "result": self.result,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobRunner:
+    """Runs submitted jobs on one dedicated motion thread."""
+
+    def __init__(self, history=50, on_update=None):
+        self.history = history
+        self.on_update = on_update  # called as on_update(job) on every status change
+        self._jobs = OrderedDict()
+        self._queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.current = None
+        self._thread = threading.Thread(target=self._run, name="motion", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, func, *args, on_done=None):
+        """Queue func(job, *args) and return the Job.
+
+        on_done(job) runs on the motion thread when the job ends: completed,
+        failed, or cancelled while running or still queued.
+        """
+        with self._lock:
+            job = Job(str(next(self._ids)), kind, func, args, notify=self.on_update, on_done=on_done)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs.values()))
+                if not oldest.done:
+                    break
+                self._jobs.popitem(last=False)
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    @property
+    def busy(self):
+        return self.current is not None or not self._queue.empty()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job.cancel_requested:
+                job._finish("cancelled")
+                continue
+            self.current = job
+            job.started_at = time.time()
+            job._set_status("running")
+            status = "completed"
+            try:
+                job.result = job.func(job, *job.args)
+            except JobCancelled:
+                status = "cancelled"
+                job.message = job.message or "Cancelled"
+            except Exception as e:
+                traceback.print_exc()
+                status = "failed"
+                job.message = f"Job error: {e}"
+            finally:
+                self.current = None
+                job._finish(status)
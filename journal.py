@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# In file: journal.py
+"""
+Append-only run journal: one fixed-size binary record per cycle position.
+
+The cycle only reports its outcome through system_message, and each new
+message overwrites the last. The journal keeps every position instead:
+when it ended, which run and cycle it belonged to, the angle, the sensor
+bits, how long each phase took and a result code. Records are 44 bytes,
+so a month of round-the-clock cycling is a few tens of MB.
+
+Runs are numbered by the journal itself: new_run() continues from the
+run of the last record in the file, so run numbers stay unique across
+restarts (job ids start again at 1). A record torn by a crash mid-write
+is cut off when the journal is opened again.
+
+RunJournal.record() only puts a tuple on a queue. The "journal" thread
+packs the records and appends them in batches, so the motion thread never
+waits on the SD card. JournalReader memory-maps the file. Records are
+appended in time order, so a time range is found by binary search, and
+aggregate() runs struct.iter_unpack over that slice only.
+
+Command line:
+    python journal.py summary runs.journal [--since 2026-01-01] [--until ...]
+    python journal.py export runs.journal -o runs.csv [--since ...] [--until ...]
+"""
+
+import argparse
+import atexit
+import csv
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+MAGIC = b"KLJRNL01"
+HEADER = struct.Struct("<8sHH4x")   # magic, record size, format version
+# timestamp, run, cycle, angle, sensor bits, result, 5 phase durations (s)
+RECORD = struct.Struct("<dIIfBB2x5f")
+VERSION = 1
+
+PHASES = ("move", "settle", "slider_in", "slider_out", "pause")
+SENSORS = ("hall", "inductive", "slider_min", "slider_max", "alarm")  # bit 0, 1, ...
+RESULTS = (
+    "empty",              # no key at the position
+    "key",                # key detected, slider stroked, pause done
+    "position_mismatch",  # hall not active after the move
+    "stall",              # rotary move stopped by the driver alarm
+    "slider_in_failed",
+    "slider_out_failed",
+    "cancelled",
+    "stall_recovered",    # stalled, then recovered; the position goes on (another record follows)
+    "move_failed",        # rotary move failed without a stall (no recovery attempted)
+)
+RESULT_CODES = {name: code for code, name in enumerate(RESULTS)}
+
+Record = namedtuple("Record", ("timestamp", "run", "cycle", "angle", "sensors", "result") + PHASES)
+
+
+def sensor_bits(states):
+    """Pack {sensor: bool} into the record's sensor byte."""
+    return sum(1 << bit for bit, name in enumerate(SENSORS) if states.get(name))
+
+
+def _record(raw):
+    timestamp, run, cycle, angle, bits, result = raw[:6]
+    return Record(timestamp, run, cycle, round(angle, 3),
+                  {name: bool(bits >> bit & 1) for bit, name in enumerate(SENSORS)},
+                  RESULTS[result] if result < len(RESULTS) else str(result), *raw[6:])
+
+
+class RunJournal:
+    """Batched, append-only writer (one background thread)."""
+
+    def __init__(self, path, batch=64, flush_interval=1.0):
+        self.path = path
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.last_error = None
+        self._queue = queue.Queue()
+        self.last_run = _repair(path) if os.path.exists(path) and os.path.getsize(path) else 0
+        self._run_lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(HEADER.pack(MAGIC, RECORD.size, VERSION))
+            self._file.flush()
+        self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def new_run(self):
+        """Number for the next run: one more than any run in this journal."""
+        with self._run_lock:
+            self.last_run += 1
+            return self.last_run
+
+    def record(self, run, cycle, angle, sensors, result, phases):
+        """Queue one position (called on the motion thread; does no I/O)."""
+        self._queue.put((time.time(), run, cycle, angle, sensors, RESULT_CODES[result],
+                         *(phases.get(name, 0.0) for name in PHASES)))
+
+    def _run(self):
+        buffer = bytearray()
+        pack = RECORD.pack
+        closing = False
+        while not closing:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            while item is not None:
+                if item:
+                    buffer += pack(*item)
+                if len(buffer) >= self.batch * RECORD.size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            closing = item is None
+            if buffer:
+                self._write(buffer)
+                buffer = bytearray()
+        self._file.close()
+
+    def _write(self, data):
+        try:
+            self._file.write(data)
+            self._file.flush()
+            self.written += len(data) // RECORD.size
+        except OSError as e:
+            self.last_error = str(e)
+            print(f"⚠️ Journal write failed: {e}")
+
+    def close(self):
+        """Write what is queued and close the file."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+def _check_header(path):
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+    if len(head) < HEADER.size:
+        raise ValueError(f"{path}: truncated journal header")
+    magic, size, version = HEADER.unpack(head)
+    if magic != MAGIC or size != RECORD.size:
+        raise ValueError(f"{path}: not a run journal (or an incompatible record format)")
+    return version
+
+
+def _repair(path):
+    """Check the header, cut off a torn last record; returns the run of the last record."""
+    _check_header(path)
+    size = os.path.getsize(path)
+    torn = (size - HEADER.size) % RECORD.size
+    if torn:
+        print(f"⚠️ Journal {path}: removing a torn record ({torn} bytes) left by a crash")
+        os.truncate(path, size - torn)
+        size -= torn
+    if size == HEADER.size:
+        return 0
+    with open(path, "rb") as f:
+        f.seek(size - RECORD.size)
+        return RECORD.unpack(f.read(RECORD.size))[1]
+
+
+class JournalReader:
+    """Memory-mapped reader; use as a context manager."""
+
+    def __init__(self, path):
+        _check_header(path)
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._count = (size - HEADER.size) // RECORD.size  # a torn last record is ignored
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._count else None
+
+    def __len__(self):
+        return self._count
+
+    def _raw(self, index):
+        return RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return _record(self._raw(index))
+
+    def _timestamp(self, index):
+        return struct.unpack_from("<d", self._map, HEADER.size + index * RECORD.size)[0]
+
+    def _bisect(self, timestamp):
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def span(self, since=None, until=None):
+        """Index range [first, last) of records with since <= timestamp < until."""
+        first = self._bisect(since) if since is not None else 0
+        last = self._bisect(until) if until is not None else self._count
+        return first, max(first, last)
+
+    def _iter_raw(self, since=None, until=None):
+        first, last = self.span(since, until)
+        if first == last:
+            return iter(())
+        start = HEADER.size + first * RECORD.size
+        return RECORD.iter_unpack(memoryview(self._map)[start:start + (last - first) * RECORD.size])
+
+    def records(self, since=None, until=None):
+        return (_record(raw) for raw in self._iter_raw(since, until))
+
+    def last(self, count):
+        return [self[i] for i in range(max(0, self._count - count), self._count)]
+
+    def aggregate(self, since=None, until=None):
+        """Counts per result, runs, and mean/max phase durations (s)."""
+        results = [0] * len(RESULTS)
+        phase_sum = [0.0] * len(PHASES)
+        phase_max = [0.0] * len(PHASES)
+        runs = set()
+        total = 0
+        first = last = None
+        for raw in self._iter_raw(since, until):
+            total += 1
+            if first is None:
+                first = raw[0]
+            last = raw[0]
+            runs.add(raw[1])
+            if raw[5] < len(results):
+                results[raw[5]] += 1
+            for i, seconds in enumerate(raw[6:]):
+                phase_sum[i] += seconds
+                if seconds > phase_max[i]:
+                    phase_max[i] = seconds
+        return {
+            "records": total,
+            "runs": len(runs),
+            "first": first,
+            "last": last,
+            "results": dict(zip(RESULTS, results)),
+            "phases_s": {
+                name: {"mean": round(phase_sum[i] / total, 4) if total else None,
+                       "max": round(phase_max[i], 4)}
+                for i, name in enumerate(PHASES)
+            },
+        }
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_csv(reader, out, since=None, until=None):
+    """Write records as CSV rows; returns the number written."""
+    writer = csv.writer(out)
+    writer.writerow(("time", "timestamp", "run", "cycle", "angle", *SENSORS, "result", *(f"{p}_s" for p in PHASES)))
+    count = 0
+    for r in reader.records(since, until):
+        writer.writerow((datetime.fromtimestamp(r.timestamp).isoformat(timespec="milliseconds"),
+                         f"{r.timestamp:.3f}", r.run, r.cycle, r.angle,
+                         *(int(r.sensors[name]) for name in SENSORS), r.result,
+                         *(f"{getattr(r, p):.4f}" for p in PHASES)))
+        count += 1
+    return count
+
+
+def _time_arg(text):
+    """ISO date/time or a plain Unix timestamp."""
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Key Loader run journal tools")
+    parser.add_argument("command", choices=("summary", "export"))
+    parser.add_argument("journal", help="journal file (runs.journal)")
+    parser.add_argument("-o", "--output", help="CSV file for export (default: stdout)")
+    parser.add_argument("--since", type=_time_arg, help="ISO time or Unix timestamp")
+    parser.add_argument("--until", type=_time_arg, help="ISO time or Unix timestamp")
+    args = parser.parse_args()
+
+    with JournalReader(args.journal) as reader:
+        if args.command == "summary":
+            import json
+            print(json.dumps(reader.aggregate(args.since, args.until), indent=2))
+        elif args.output:
+            with open(args.output, "w", newline="") as out:
+                count = export_csv(reader, out, args.since, args.until)
+            print(f"Exported {count} records to {args.output}", file=sys.stderr)
+        else:
+            export_csv(reader, sys.stdout, args.since, args.until)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# In file: lazy.py
+"""
+Components built on first use, for a fast cold start of app.py.
+
+Importing app.py used to build the HardwareController (13 pins, pulse
+engine, sensor callbacks), load and possibly rewrite config.json, open the
+run journal and start the Pico link before Flask could answer a request.
+A LazyComponent holds the factory instead. The object is built on its
+first attribute access, or by warm_up() on a background thread once the
+server is listening. Attribute reads, writes and [] are forwarded, so
+routes keep using hw.move_degrees(...) and config['key'] unchanged.
+
+A factory that raises is not cached: the error is recorded for /api/ready,
+ComponentError is raised to the caller and the next use tries again (e.g.
+after the driver or the Pico has been reconnected).
+"""
+
+import threading
+import time
+
+
+class ComponentError(RuntimeError):
+    """A component could not be built; the message names it."""
+
+
+class _State:
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.instance = None
+        self.seconds = None             # build time
+        self.built_at = None
+        self.error = None
+        self.lock = threading.Lock()
+
+
+class LazyComponent:
+    """Proxy that builds its object on first use."""
+
+    def __init__(self, name, factory):
+        object.__setattr__(self, "_lazy", _State(name, factory))
+
+    def instance(self):
+        """The object, built now if needed; raises ComponentError."""
+        state = self._lazy
+        if state.instance is not None:
+            return state.instance
+        with state.lock:
+            if state.instance is None:
+                started = time.perf_counter()
+                try:
+                    obj = state.factory()
+                except Exception as e:
+                    state.error = f"{type(e).__name__}: {e}"
+                    print(f"❌ {state.name.capitalize()} unavailable: {state.error}")
+                    raise ComponentError(f"{state.name} unavailable: {state.error}") from e
+                state.seconds = time.perf_counter() - started
+                state.built_at = time.time()
+                state.error = None
+                state.instance = obj
+                print(f"✅ {state.name.capitalize()} ready in {state.seconds * 1000:.0f} ms")
+        return state.instance
+
+    @property
+    def built(self):
+        return self._lazy.instance is not None
+
+    def readiness(self):
+        state = self._lazy
+        return {
+            "ready": state.instance is not None,
+            "seconds": round(state.seconds, 4) if state.seconds is not None else None,
+            "built_at": state.built_at,
+            "error": state.error,
+        }
+
+    # --- Forwarding ---
+    def __getattr__(self, attr):
+        return getattr(self.instance(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.instance(), attr, value)
+
+    def __getitem__(self, key):
+        return self.instance()[key]
+
+    def __contains__(self, key):
+        return key in self.instance()
+
+    def __repr__(self):
+        state = self._lazy
+        return f"<LazyComponent {state.name}: {state.instance!r}>" if state.instance is not None \
+            else f"<LazyComponent {state.name} (not built)>"
+
+
+def warm_up(components, name="warmup"):
+    """Build components in order on a background thread; returns the thread.
+
+    Failures are recorded on the component (see readiness()) and retried on
+    first use.
+    """
+    def run():
+        for component in components:
+            try:
+                component.instance()
+            except ComponentError:
+                pass
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,135 @@
+# In file: machine_state.py
+"""
+Typed machine state and motion ownership.
+
+MachineState is the status snapshot behind app_state (see status_hub.py).
+It has fixed __slots__ fields and a version number and is never changed
+in place: every update builds a new instance and swaps the reference, so
+readers just take the current reference without a lock.
+
+MotionLock hands out the axes. A route that wants to move something
+claims its axes with one atomic acquire() before submitting the job, and
+the job releases them when it ends, so two requests can no longer both
+pass a "not running" check and drive the same motor.
+"""
+
+import threading
+
+
+class MachineState:
+    """Immutable status snapshot. Use replace() to get an updated copy."""
+
+    __slots__ = (
+        "version",
+        "current_angle",
+        "is_running",
+        "is_homed",
+        "system_message",
+        "hall_status",
+        "inductive_status",
+        "slider_min",
+        "slider_max",
+        "job_id",
+        "job_status",
+    )
+
+    version: int
+    current_angle: float
+    is_running: bool
+    is_homed: bool
+    system_message: str
+    hall_status: bool
+    inductive_status: bool
+    slider_min: bool
+    slider_max: bool
+    job_id: str
+    job_status: str
+
+    def __init__(self, version=0, current_angle=0, is_running=False, is_homed=False,
+                 system_message="", hall_status=False, inductive_status=False,
+                 slider_min=False, slider_max=False, job_id=None, job_status=None):
+        setter = object.__setattr__
+        setter(self, "version", version)
+        setter(self, "current_angle", current_angle)
+        setter(self, "is_running", is_running)
+        setter(self, "is_homed", is_homed)
+        setter(self, "system_message", system_message)
+        setter(self, "hall_status", hall_status)
+        setter(self, "inductive_status", inductive_status)
+        setter(self, "slider_min", slider_min)
+        setter(self, "slider_max", slider_max)
+        setter(self, "job_id", job_id)
+        setter(self, "job_status", job_status)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MachineState is immutable; use replace()")
+
+    @classmethod
+    def fields(cls):
+        return cls.__slots__[1:]
+
+    def replace(self, version, **changes):
+        """Copy with changed fields and a new version. Unknown fields raise KeyError."""
+        unknown = set(changes).difference(self.fields())
+        if unknown:
+            raise KeyError(f"Unknown state field(s): {', '.join(sorted(unknown))}")
+        new = object.__new__(MachineState)
+        setter = object.__setattr__
+        for name in self.__slots__:
+            setter(new, name, changes.get(name, getattr(self, name)))
+        setter(new, "version", version)
+        return new
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.fields()}
+
+
+ALL_AXES = ("rotary", "slider")
+
+
+class MotionLock:
+    """All-or-nothing, non-blocking ownership of the motion axes.
+
+    on_change(busy) is called only when the machine goes from idle to busy
+    or back. It runs under the lock, so concurrent claims and releases
+    publish their transitions in order; it must not call back into the lock.
+    """
+
+    def __init__(self, axes=ALL_AXES, on_change=None):
+        self._owners = dict.fromkeys(axes)
+        self._lock = threading.Lock()
+        self.on_change = on_change
+
+    def acquire(self, owner, axes=ALL_AXES):
+        """Claim every axis in axes for owner; returns a claim token, or None if any is taken."""
+        with self._lock:
+            if any(self._owners[axis] is not None for axis in axes):
+                return None
+            was_busy = self._busy()
+            claim = (owner, tuple(axes))
+            for axis in axes:
+                self._owners[axis] = claim
+            if not was_busy and self._busy() and self.on_change is not None:
+                self.on_change(True)
+            return claim
+
+    def release(self, claim):
+        """Free the claim's axes; releasing a claim that no longer holds them is a no-op."""
+        with self._lock:
+            was_busy = self._busy()
+            for axis in claim[1]:
+                if self._owners[axis] is claim:
+                    self._owners[axis] = None
+            if was_busy and not self._busy() and self.on_change is not None:
+                self.on_change(False)
+
+    def _busy(self):
+        return any(owner is not None for owner in self._owners.values())
+
+    @property
+    def busy(self):
+        return self._busy()
+
+    def owners(self):
+        """{axis: owner name or None}"""
+        return {axis: claim[0] if claim else None for axis, claim in self._owners.items()}
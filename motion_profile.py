@@ -0,0 +1,203 @@
+# In file: motion_profile.py
+"""
+Motion profile planner for the rotary and slider steppers.
+
+A MotionProfile turns (steps, max speed, acceleration, deceleration, jerk)
+into a compact array('d') of half-period delays - the same per-edge delay
+the pulse engines expect - using true constant-acceleration (trapezoidal)
+timing or, when a jerk limit is given, jerk-limited S-curve timing.
+Profiles are planned once and reused; plan_move() caches them because a
+production cycle repeats the same indexed move thousands of times.
+"""
+
+import math
+from array import array
+from functools import lru_cache
+
+
+def _trapezoid_ramp(v0, vp, accel):
+    """Crossing time of each whole step while accelerating v0 -> vp at a constant rate."""
+    if vp <= v0 or accel <= 0:
+        return []
+    distance = (vp * vp - v0 * v0) / (2.0 * accel)
+    times = []
+    for s in range(1, int(distance) + 1):
+        times.append((math.sqrt(v0 * v0 + 2.0 * accel * s) - v0) / accel)
+    return times
+
+
+def _scurve_segments(v0, vp, accel, jerk):
+    """Duration of the jerk and constant-acceleration segments of an S-curve ramp."""
+    dv = vp - v0
+    if dv * jerk >= accel * accel:
+        t_jerk = accel / jerk
+        t_const = dv / accel - t_jerk
+    else:
+        # Acceleration never reaches its limit: triangular acceleration profile
+        t_jerk = math.sqrt(dv / jerk)
+        t_const = 0.0
+    return t_jerk, t_const
+
+
+def _scurve_distance(v0, vp, accel, jerk):
+    """Distance (steps) of an S-curve ramp; its acceleration profile is symmetric."""
+    if vp <= v0:
+        return 0.0
+    t_jerk, t_const = _scurve_segments(v0, vp, accel, jerk)
+    return 0.5 * (v0 + vp) * (2.0 * t_jerk + t_const)
+
+
+def _scurve_ramp(v0, vp, accel, jerk):
+    """Crossing time of each whole step while accelerating v0 -> vp under a jerk limit."""
+    if vp <= v0 or accel <= 0 or jerk <= 0:
+        return []
+    t_jerk, t_const = _scurve_segments(v0, vp, accel, jerk)
+    a_peak = jerk * t_jerk
+    t_end = 2.0 * t_jerk + t_const
+
+    # Integrate the piecewise-constant jerk in small time steps and record
+    # where position crosses each integer step (linear interpolation).
+    dt = min(t_end / 2000.0, 0.05 / vp)
+    times = []
+    t = pos = 0.0
+    v = v0
+    next_step = 1
+    while t < t_end:
+        if t < t_jerk:
+            a = jerk * (t + 0.5 * dt)
+        elif t < t_jerk + t_const:
+            a = a_peak
+        else:
+            a = max(0.0, a_peak - jerk * (t + 0.5 * dt - t_jerk - t_const))
+        new_v = v + a * dt
+        new_pos = pos + 0.5 * (v + new_v) * dt
+        while new_pos >= next_step:
+            frac = (next_step - pos) / (new_pos - pos)
+            times.append(t + frac * dt)
+            next_step += 1
+        t += dt
+        v, pos = new_v, new_pos
+    return times
+
+
+class MotionProfile:
+    """Precomputed pulse timing for one move.
+
+    Rates are in steps/s, accel/decel in steps/s^2 and jerk in steps/s^3.
+    The move starts and ends at start_rate (default: half of max_rate) and
+    cruises at max_rate, or at the highest reachable peak on short moves.
+    """
+
+    def __init__(self, steps, max_rate, accel, decel=None, jerk=None, start_rate=None):
+        self.steps = int(steps)
+        self.max_rate = float(max_rate)
+        self.accel = float(accel)
+        self.decel = float(decel if decel is not None else accel)
+        self.jerk = jerk
+        self.start_rate = float(start_rate if start_rate is not None else max_rate / 2.0)
+        self.delays = self._plan()
+
+    def _ramp_distance(self, vp, rate):
+        if self.jerk:
+            return _scurve_distance(self.start_rate, vp, rate, self.jerk)
+        return (vp * vp - self.start_rate * self.start_rate) / (2.0 * rate)
+
+    def _ramp(self, vp, rate):
+        if self.jerk:
+            return _scurve_ramp(self.start_rate, vp, rate, self.jerk)
+        return _trapezoid_ramp(self.start_rate, vp, rate)
+
+    def _peak_rate(self):
+        """Highest cruise rate whose accel + decel ramps fit in the move."""
+        v0, vmax = self.start_rate, self.max_rate
+        if vmax <= v0:
+            return v0
+        if self._ramp_distance(vmax, self.accel) + self._ramp_distance(vmax, self.decel) <= self.steps:
+            return vmax
+        if not self.jerk:
+            return math.sqrt(v0 * v0 + 2.0 * self.steps * self.accel * self.decel / (self.accel + self.decel))
+        lo, hi = v0, vmax
+        for _ in range(40):
+            mid = 0.5 * (lo + hi)
+            if self._ramp_distance(mid, self.accel) + self._ramp_distance(mid, self.decel) <= self.steps:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+    def _plan(self):
+        delays = array('d')
+        if self.steps <= 0:
+            return delays
+        vp = self._peak_rate()
+
+        up = self._ramp(vp, self.accel)
+        down = self._ramp(vp, self.decel)
+        # Never let the ramps eat more steps than the move has
+        while len(up) + len(down) > self.steps:
+            if len(up) >= len(down):
+                up.pop()
+            else:
+                down.pop()
+
+        # Delays are half periods: one delay for the HIGH edge, one for LOW
+        prev = 0.0
+        for t in up:
+            delays.append(0.5 * (t - prev))
+            prev = t
+        cruise = self.steps - len(up) - len(down)
+        delays.extend(array('d', [0.5 / vp]) * cruise)
+        prev = 0.0
+        decel = array('d')
+        for t in down:
+            decel.append(0.5 * (t - prev))
+            prev = t
+        decel.reverse()
+        delays.extend(decel)
+        return delays
+
+    @property
+    def duration(self):
+        """Total move time in seconds."""
+        return 2.0 * sum(self.delays)
+
+    def __len__(self):
+        return len(self.delays)
+
+
+@lru_cache(maxsize=64)
+def plan_move(steps, base_delay, accel_steps, decel_steps, s_curve=False):
+    """Plan a move from the config-page units (cached).
+
+    base_delay is the cruise half period from _speed_to_delay(); the ramps
+    start at twice that delay (as the old linear ramp did) and reach cruise
+    speed after accel_steps / decel_steps steps.
+    """
+    vmax = 0.5 / base_delay
+    v0 = vmax / 2.0
+    dv = vmax - v0
+    ramps = []
+    for ramp_steps in (max(1, accel_steps), max(1, decel_steps)):
+        if s_curve:
+            # Jerk phases take half of the speed change (j = 2a^2 / dv); pick
+            # the acceleration that makes the ramp ramp_steps long.
+            rate = 0.75 * (v0 + vmax) * dv / ramp_steps
+        else:
+            rate = (vmax * vmax - v0 * v0) / (2.0 * ramp_steps)
+        ramps.append(rate)
+    accel, decel = ramps
+    jerk = 2.0 * max(accel, decel) ** 2 / dv if s_curve else None
+    return MotionProfile(steps, vmax, accel, decel, jerk=jerk, start_rate=v0)
+
+
+@lru_cache(maxsize=64)
+def plan_stroke(steps, approach_delay, cruise_delay, ramp_steps):
+    """Slider stroke: start and end at the approach speed, cruise in between (cached).
+
+    Both ramps take ramp_steps steps, so the stroke hands over smoothly to a
+    constant-speed approach at approach_delay afterwards.
+    """
+    v0 = 0.5 / approach_delay
+    vmax = 0.5 / cruise_delay
+    rate = max(vmax * vmax - v0 * v0, 0.0) / (2.0 * max(1, ramp_steps))
+    return MotionProfile(steps, vmax, rate or 1.0, start_rate=v0)
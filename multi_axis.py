@@ -0,0 +1,101 @@
+# In file: multi_axis.py
+"""
+Coordinated multi-axis step generation.
+
+The rotary and slider motors used to be driven by separate blocking loops,
+so only one axis could move at a time. This module interleaves the pulses
+of several axes into one time-ordered StepStream that a pulse engine sends
+as a single job (engine.send_stream):
+
+- Axis.from_delays(): an axis that follows its own motion profile
+- Axis.linked(): Bresenham/DDA - an axis that spreads its steps evenly over
+  another axis's pulses, so both start and finish together
+
+Every segment of the stream is (time, pins_high, pins_low): the pins to set
+and clear at that instant, quantized to `resolution` seconds.
+"""
+
+import heapq
+from array import array
+
+
+class Axis:
+    """Pulse start times and HIGH widths (seconds) of one step pin."""
+
+    def __init__(self, pin, starts, widths):
+        self.pin = pin
+        self.starts = starts
+        self.widths = widths
+
+    @classmethod
+    def from_delays(cls, pin, delays, offset=0.0):
+        """Axis following a half-period delay train (a MotionProfile's delays)."""
+        starts = array('d')
+        t = offset
+        for delay in delays:
+            starts.append(t)
+            t += 2.0 * delay
+        return cls(pin, starts, array('d', delays))
+
+    @classmethod
+    def linked(cls, pin, master_delays, steps):
+        """Bresenham/DDA axis: steps pulses spread evenly over the master's pulses."""
+        master = len(master_delays)
+        steps = min(int(steps), master)
+        starts, widths = array('d'), array('d')
+        error = 0
+        t = 0.0
+        for delay in master_delays:
+            error += steps
+            if error >= master:
+                error -= master
+                starts.append(t)
+                widths.append(delay)
+            t += 2.0 * delay
+        return cls(pin, starts, widths)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def end(self):
+        if not self.starts:
+            return 0.0
+        return self.starts[-1] + 2.0 * self.widths[-1]
+
+
+class StepStream:
+    """Time-ordered pin edges for several axes."""
+
+    def __init__(self, segments, duration, counts):
+        self.segments = segments  # [(t, pins_high, pins_low), ...]
+        self.duration = duration
+        self.counts = counts      # {pin: pulses}
+
+    def __len__(self):
+        return len(self.segments)
+
+
+def merge_axes(axes, resolution=1e-6):
+    """Interleave the axes' pulses into one StepStream."""
+    def edges(axis):
+        for start, width in zip(axis.starts, axis.widths):
+            yield (start, 1, axis.pin)
+            yield (start + width, 0, axis.pin)
+
+    segments = []
+    current_t = None
+    high, low = [], []
+    for t, level, pin in heapq.merge(*(edges(axis) for axis in axes)):
+        t = round(t / resolution) * resolution
+        if t != current_t:
+            if current_t is not None:
+                segments.append((current_t, tuple(high), tuple(low)))
+            current_t, high, low = t, [], []
+        (high if level else low).append(pin)
+    if current_t is not None:
+        segments.append((current_t, tuple(high), tuple(low)))
+
+    duration = max((axis.end for axis in axes), default=0.0)
+    counts = {axis.pin: len(axis) for axis in axes}
+    return StepStream(segments, duration, counts)
@@ -0,0 +1,493 @@
+# In file: pico_link.py
+"""
+Serial link to the Raspberry Pico that runs the poles timer.
+
+send_pico_command() used to only print. PicoLink keeps one serial/USB-CDC
+connection open (reconnecting when it drops) and runs all I/O on its own
+thread, so the cycle loop only puts a command on a queue and carries on.
+
+Frame layout (little endian), same in both directions:
+
+    0xA5 | type (u8) | seq (u16) | length (u16) | payload | crc16 (u16)
+
+type is FRAME_COMMAND, FRAME_ACK or FRAME_NAK; an ACK/NAK carries the seq
+of the command it answers. crc16 is CRC-16/CCITT (init 0xFFFF) over
+everything before it. Commands that are not ACKed within ack_timeout are
+resent up to `retries` times; the round-trip time of every ACK is kept.
+
+A resent command has FLAG_RESEND set in its type byte. The ACK of the
+first send may have been the one that got lost, so the Pico must
+remember the seqs it executed recently: a flagged frame whose seq it has
+already executed is ACKed again but not run a second time (otherwise a
+lost ACK fires trigger_function twice). Unflagged frames always run.
+While the link is down, commands fail at once ("Pico not connected")
+instead of firing late when the device comes back.
+
+Transports:
+- SerialTransport: pyserial, for /dev/ttyACM0 and friends
+- FdTransport: a raw file descriptor (pty slave or socket)
+- PicoEmulator: answers frames like the Pico would, over a pty
+  (open_pty_pico) or an in-process socket pair (LoopbackPico)
+"""
+
+import binascii
+import os
+import queue
+import select
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+try:
+    import serial
+except ImportError:  # pyserial is only needed for a real device
+    serial = None
+
+MAGIC = 0xA5
+FRAME_COMMAND = 1
+FRAME_ACK = 2
+FRAME_NAK = 3
+FLAG_RESEND = 0x80  # or-ed into the type of a retransmitted command
+HEADER = struct.Struct("<BBHH")
+CRC = struct.Struct("<H")
+MAX_PAYLOAD = 1024
+DEFAULT_DEVICE = "/dev/ttyACM0"
+
+
+def encode_frame(kind, seq, payload=b""):
+    body = HEADER.pack(MAGIC, kind, seq & 0xFFFF, len(payload)) + payload
+    return body + CRC.pack(binascii.crc_hqx(body, 0xFFFF))
+
+
+class FrameDecoder:
+    """Incremental frame parser; resynchronises on the magic byte after garbage."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        """Add received bytes and return the complete frames as (kind, seq, payload)."""
+        self._buffer += data
+        frames = []
+        buf = self._buffer
+        while True:
+            start = buf.find(MAGIC)
+            if start < 0:
+                buf.clear()
+                break
+            if start:
+                del buf[:start]
+            if len(buf) < HEADER.size:
+                break
+            _, kind, seq, length = HEADER.unpack_from(buf)
+            if length > MAX_PAYLOAD:
+                self.errors += 1
+                del buf[:1]
+                continue
+            end = HEADER.size + length
+            if len(buf) < end + CRC.size:
+                break
+            (crc,) = CRC.unpack_from(buf, end)
+            if crc != binascii.crc_hqx(bytes(buf[:end]), 0xFFFF):
+                self.errors += 1
+                del buf[:1]
+                continue
+            frames.append((kind, seq, bytes(buf[HEADER.size:end])))
+            del buf[:end + CRC.size]
+        return frames
+
+
+# --- Transports: read(timeout) -> bytes (b"" on timeout), write(data), close() ---
+class FdTransport:
+    """Raw file descriptor (pty slave, socket) as a transport."""
+
+    def __init__(self, fd, owner=None):
+        self.fd = fd
+        self._owner = owner  # object to keep alive/close with the fd, e.g. a socket
+
+    @classmethod
+    def open(cls, path):
+        fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+        try:
+            import tty
+            tty.setraw(fd)
+        except Exception:
+            pass
+        return cls(fd)
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return b""
+        data = os.read(self.fd, 4096)
+        if not data:
+            raise OSError("connection closed")
+        return data
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    def close(self):
+        if self._owner is not None:
+            self._owner.close()
+        else:
+            os.close(self.fd)
+
+
+class SerialTransport:
+    """USB-CDC / UART device through pyserial."""
+
+    def __init__(self, port, baudrate=115200):
+        if serial is None:
+            raise RuntimeError("pyserial module is not installed")
+        self.port = serial.Serial(port, baudrate, timeout=0, write_timeout=1.0)
+
+    def read(self, timeout):
+        self.port.timeout = timeout
+        return self.port.read(max(1, self.port.in_waiting))
+
+    def write(self, data):
+        self.port.write(data)
+
+    def close(self):
+        self.port.close()
+
+
+class PicoCommand:
+    """One queued command and its outcome."""
+
+    def __init__(self, seq, command):
+        self.seq = seq
+        self.command = command
+        self.attempts = 0
+        self.queued_at = time.perf_counter()
+        self.sent_at = None
+        self.deadline = None
+        self.rtt = None        # seconds from the last send to the ACK
+        self.acked = False
+        self.error = None
+        self._done = threading.Event()
+
+    def finish(self, acked, error=None):
+        self.acked = acked
+        self.error = error
+        self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until ACKed or failed; returns True when ACKed."""
+        self._done.wait(timeout)
+        return self.acked
+
+
+class PicoLink:
+    """Queued, ACKed command link to the Pico.
+
+    connect is a callable that opens and returns a transport; it is called
+    again (every reconnect_delay seconds) whenever the link drops.
+    """
+
+    def __init__(self, connect, ack_timeout=0.2, retries=2, queue_size=64,
+                 reconnect_delay=1.0, name="pico"):
+        self.connect = connect
+        self.ack_timeout = ack_timeout
+        self.retries = retries
+        self.reconnect_delay = reconnect_delay
+        self.name = name
+        self.connected = False
+        self.counters = {"sent": 0, "acked": 0, "nak": 0, "resent": 0,
+                         "timeouts": 0, "dropped": 0, "offline": 0, "reconnects": 0, "frame_errors": 0}
+        self.rtts = deque(maxlen=256)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = {}  # seq -> PicoCommand waiting for an ACK
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self._transport = None
+        self._decoder = FrameDecoder()
+        self._warned = False
+        self.emulator = None  # Pico stand-in owned by this link, closed with it
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pico-link", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def send(self, command):
+        """Queue command without blocking and return its PicoCommand."""
+        with self._seq_lock:
+            self._seq = (self._seq + 1) & 0xFFFF
+            cmd = PicoCommand(self._seq, command)
+        try:
+            self._queue.put_nowait(cmd)
+        except queue.Full:
+            self.counters["dropped"] += 1
+            cmd.finish(False, "send queue full")
+        return cmd
+
+    def close(self):
+        self._closed.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self._disconnect()
+        if self.emulator is not None:
+            self.emulator.close()
+
+    # --- I/O thread ---
+    def _run(self):
+        while not self._closed.is_set():
+            if self._transport is None and not self._reconnect():
+                self._fail_queued("Pico not connected")
+                self._closed.wait(self.reconnect_delay)
+                continue
+            try:
+                self._write_queued()
+                self._read(self._poll_timeout())
+                self._check_timeouts()
+            except Exception as e:
+                print(f"⚠️ Pico link lost: {e}")
+                self._disconnect()
+
+    def _reconnect(self):
+        try:
+            self._transport = self.connect()
+        except Exception as e:
+            if not self._warned:
+                self._warned = True
+                print(f"⚠️ Pico not connected ({e}). Retrying every {self.reconnect_delay}s.")
+            return False
+        self.connected = True
+        self._warned = False
+        self.counters["reconnects"] += 1
+        self._decoder = FrameDecoder()
+        # Commands still waiting for an ACK are sent again on the new connection
+        try:
+            for cmd in list(self._pending.values()):
+                self.counters["resent"] += 1
+                self._write(cmd)
+        except Exception as e:
+            print(f"⚠️ Pico link lost: {e}")
+            self._disconnect()
+            return False
+        return True
+
+    def _fail_queued(self, error):
+        """Fail queued and unacknowledged commands; a trigger must not fire late."""
+        failed = list(self._pending.values())
+        self._pending.clear()
+        while True:
+            try:
+                failed.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for cmd in failed:
+            self.counters["offline"] += 1
+            cmd.finish(False, error)
+
+    def _disconnect(self):
+        self.connected = False
+        if self._transport is not None:
+            try:
+                self._transport.close()
+            except Exception:
+                pass
+            self._transport = None
+
+    def _write(self, cmd):
+        payload = cmd.command.encode() if isinstance(cmd.command, str) else bytes(cmd.command)
+        kind = FRAME_COMMAND | (FLAG_RESEND if cmd.attempts else 0)
+        cmd.attempts += 1
+        cmd.sent_at = time.perf_counter()
+        cmd.deadline = cmd.sent_at + self.ack_timeout
+        self._pending[cmd.seq] = cmd
+        self._transport.write(encode_frame(kind, cmd.seq, payload))
+
+    def _write_queued(self):
+        while True:
+            try:
+                cmd = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self.counters["sent"] += 1
+            self._write(cmd)
+
+    def _poll_timeout(self):
+        if not self._queue.empty():
+            return 0
+        timeout = 0.05
+        if self._pending:
+            next_deadline = min(cmd.deadline for cmd in self._pending.values())
+            timeout = min(timeout, max(0.0, next_deadline - time.perf_counter()))
+        return timeout
+
+    def _read(self, timeout):
+        data = self._transport.read(timeout)
+        if not data:
+            return
+        now = time.perf_counter()
+        for kind, seq, _ in self._decoder.feed(data):
+            cmd = self._pending.pop(seq, None)
+            if cmd is None:
+                continue  # late ACK for a command that was already resent and answered
+            if kind == FRAME_ACK:
+                cmd.rtt = now - cmd.sent_at
+                self.rtts.append(cmd.rtt)
+                self.counters["acked"] += 1
+                cmd.finish(True)
+            else:
+                self.counters["nak"] += 1
+                cmd.finish(False, "rejected by Pico")
+        self.counters["frame_errors"] = self._decoder.errors
+
+    def _check_timeouts(self):
+        now = time.perf_counter()
+        for cmd in [c for c in self._pending.values() if c.deadline <= now]:
+            if cmd.attempts <= self.retries:
+                self.counters["resent"] += 1
+                self._write(cmd)
+            else:
+                del self._pending[cmd.seq]
+                self.counters["timeouts"] += 1
+                print(f"⚠️ Pico did not acknowledge '{cmd.command}' (seq {cmd.seq})")
+                cmd.finish(False, "ACK timeout")
+
+    def stats(self):
+        """Counters and round-trip latency of recent commands (ms)."""
+        rtts = sorted(self.rtts)
+
+        def pct(p):
+            return round(rtts[min(len(rtts) - 1, int(p * len(rtts)))] * 1000, 3) if rtts else None
+
+        return {
+            "link": self.name,
+            "connected": self.connected,
+            "queued": self._queue.qsize(),
+            "pending": len(self._pending),
+            **self.counters,
+            "rtt_ms": {"last": round(self.rtts[-1] * 1000, 3) if rtts else None,
+                       "p50": pct(0.5), "p95": pct(0.95), "max": pct(1.0)},
+        }
+
+
+# --- Stand-in for the Pico ---
+class PicoEmulator:
+    """Answers command frames with ACKs, like the Pico firmware.
+
+    reply_delay adds a fixed processing time; drop_every drops the ACK of
+    every Nth command (to exercise resends). A resent command it already
+    executed is ACKed without being run again.
+    """
+
+    def __init__(self, fd, reply_delay=0.0, drop_every=0, owner=None):
+        self.fd = fd
+        self.reply_delay = reply_delay
+        self.drop_every = drop_every
+        self.received = []     # commands executed, in order
+        self.duplicates = 0    # resends of executed commands (ACKed, not run)
+        self.slave_fd = None
+        self._owner = owner
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pico-emulator", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        decoder = FrameDecoder()
+        executed = deque(maxlen=64)  # recent seqs, to recognise resends
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([self.fd], [], [], 0.05)
+                if not ready:
+                    continue
+                data = os.read(self.fd, 4096)
+            except OSError:
+                return
+            if not data:
+                return
+            for kind, seq, payload in decoder.feed(data):
+                if kind & ~FLAG_RESEND != FRAME_COMMAND:
+                    continue
+                if kind & FLAG_RESEND and seq in executed:
+                    self.duplicates += 1
+                else:
+                    executed.append(seq)
+                    self.received.append(payload.decode(errors="replace"))
+                    if self.drop_every and len(self.received) % self.drop_every == 0:
+                        continue
+                if self.reply_delay:
+                    time.sleep(self.reply_delay)
+                os.write(self.fd, encode_frame(FRAME_ACK, seq))
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        if self._owner is not None:
+            self._owner.close()
+        else:
+            os.close(self.fd)
+        if self.slave_fd is not None:
+            os.close(self.slave_fd)
+
+
+def open_pty_pico(**emulator_args):
+    """Emulated Pico on a pseudo-terminal; returns (emulator, device path)."""
+    import tty
+    master, slave = os.openpty()
+    tty.setraw(master)
+    path = os.ttyname(slave)  # the link opens it by path, like a real device
+    emulator = PicoEmulator(master, **emulator_args)
+    emulator.slave_fd = slave  # held open so the master does not see a hangup between connects
+    return emulator, path
+
+
+class LoopbackPico:
+    """In-process Pico stand-in: every connect() gets a fresh socket pair."""
+
+    def __init__(self, **emulator_args):
+        self.emulator_args = emulator_args
+        self.emulator = None
+
+    def connect(self):
+        if self.emulator is not None:
+            self.emulator.close()
+        ours, theirs = socket.socketpair()
+        self.emulator = PicoEmulator(theirs.fileno(), owner=theirs, **self.emulator_args)
+        return FdTransport(ours.fileno(), owner=ours)
+
+    def close(self):
+        if self.emulator is not None:
+            self.emulator.close()
+
+
+def create_pico_link(target=None, **link_args):
+    """Build and start a PicoLink.
+
+    target (or env KEY_LOADER_PICO) is a device path, "pty", "loopback" or
+    "auto". "auto" is /dev/ttyACM0; while it is missing the link keeps
+    retrying and reports itself disconnected. The emulators are only used
+    when asked for, so an unplugged Pico never looks healthy.
+    """
+    target = target or os.environ.get("KEY_LOADER_PICO", "auto")
+    if target == "auto":
+        target = DEFAULT_DEVICE
+
+    if target == "loopback":
+        loopback = LoopbackPico()
+        link = PicoLink(loopback.connect, name="loopback", **link_args)
+        link.emulator = loopback
+    elif target == "pty":
+        emulator, path = open_pty_pico()
+        link = PicoLink(lambda: FdTransport.open(path), name=f"pty:{path}", **link_args)
+        link.emulator = emulator
+    elif serial is not None:
+        link = PicoLink(lambda: SerialTransport(target), name=target, **link_args)
+    else:
+        link = PicoLink(lambda: FdTransport.open(target), name=target, **link_args)
+    return link.start()
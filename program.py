@@ -0,0 +1,249 @@
+# In file: program.py
+"""
+Batch programs: a list of motion ops run as one job.
+
+The fixed /api/start loop only knows "step by step_degrees, check, slider
+in/out, pause". A program describes any position table instead:
+
+    {"repeat": 1, "ops": [
+        {"op": "move", "degrees": 36},            # relative move
+        {"op": "move", "to": 90},                 # absolute angle (CW, or "direction": "shortest")
+        {"op": "dwell", "seconds": 0.2},
+        {"op": "wait_for", "sensor": "hall", "state": true, "timeout": 0.5},
+        {"op": "trigger", "command": "trigger_function", "when": {"inductive": true}},
+        {"op": "slider", "to": "in", "when": {"inductive": true}},
+        {"op": "slider", "to": "out", "speed": 80, "when": {"inductive": true}}
+    ]}
+
+compile_program() validates the ops once, unrolls the repeats and
+precomputes every rotary pulse train, so run_program() only sends buffers,
+waits and triggers. An op with "when" (any op except move) is skipped
+unless every listed sensor is in the given state at that moment.
+"""
+
+import math
+import time
+
+from config_store import Field
+
+OPS = ("move", "dwell", "slider", "trigger", "wait_for")
+SENSORS = ("hall", "inductive", "slider_min", "slider_max", "alarm")
+MAX_STEPS = 10000               # ops after repeats
+MAX_MOVE_DEGREES = 3600.0       # per move op (10 revolutions)
+MAX_PULSES = 2000000            # rotary pulses in the whole plan (precomputed delays: 16 MB)
+
+
+class ProgramError(ValueError):
+    """Invalid program; the message names the offending op."""
+
+
+class Step:
+    """One compiled op."""
+
+    def __init__(self, index, op, when, **args):
+        self.index = index      # position in the source op list
+        self.op = op
+        self.when = when        # {sensor: state} guard, or None
+        self.args = args
+
+    def enabled(self, hw):
+        if not self.when:
+            return True
+        return all(hw.sensors.is_active(name) == state for name, state in self.when.items())
+
+
+class Plan:
+    """Compiled, unrolled program."""
+
+    def __init__(self, steps, motion_s, dwell_s, absolute):
+        self.steps = steps
+        self.motion_s = motion_s    # planned rotary pulse time
+        self.dwell_s = dwell_s
+        self.absolute = absolute    # uses absolute "to" moves (needs a homed table)
+
+    def summary(self):
+        return {
+            "steps": len(self.steps),
+            "planned_motion_s": round(self.motion_s, 3),
+            "planned_dwell_s": round(self.dwell_s, 3),
+        }
+
+
+def _number(op, index, key, default=None, minimum=None, maximum=None):
+    value = op.get(key, default)
+    try:
+        value = float(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ProgramError(f"op {index}: '{key}' must be a number")
+    if not math.isfinite(value):
+        raise ProgramError(f"op {index}: '{key}' must be a finite number")
+    if minimum is not None and value < minimum:
+        raise ProgramError(f"op {index}: '{key}' must be at least {minimum}")
+    if maximum is not None and value > maximum:
+        raise ProgramError(f"op {index}: '{key}' must be at most {maximum}")
+    return value
+
+
+def _when(op, index):
+    when = op.get("when")
+    if when is None:
+        return None
+    if not isinstance(when, dict) or not all(name in SENSORS for name in when):
+        raise ProgramError(f"op {index}: 'when' must map sensors {SENSORS} to true/false")
+    return {name: _flag(when, name, True) for name in when}
+
+
+def _flag(values, key, default):
+    """A bool parsed like a bool config value, so "false" and "0" are false."""
+    return Field(key, bool, default).coerce(values.get(key, default))
+
+
+def compile_program(program, hw, config, slider_delay):
+    """Validate and unroll a program; raises ProgramError.
+
+    Positions are followed from hw's current position, so the table must
+    not move between compiling and running (the motion claim ensures it).
+    slider_delay converts a 0-100 slider speed to a half-period delay.
+    """
+    if isinstance(program, list):
+        program = {"ops": program}
+    if not isinstance(program, dict) or not isinstance(program.get("ops"), list):
+        raise ProgramError("program must be a list of ops or {\"ops\": [...], \"repeat\": N}")
+    ops = program["ops"]
+    try:
+        repeat = int(program.get("repeat", 1))
+    except (TypeError, ValueError):
+        raise ProgramError("'repeat' must be an integer")
+    if repeat < 1 or repeat * len(ops) > MAX_STEPS:
+        raise ProgramError(f"program must have between 1 and {MAX_STEPS} steps after repeats")
+
+    ppr = hw.PULSES_PER_REV
+    position = hw.position_steps
+    remainder = hw.step_remainder
+    steps, motion_s, dwell_s, absolute = [], 0.0, 0.0, False
+    pulses = 0
+
+    for _ in range(repeat):
+        for index, op in enumerate(ops):
+            if not isinstance(op, dict) or op.get("op") not in OPS:
+                raise ProgramError(f"op {index}: 'op' must be one of {OPS}")
+            kind = op["op"]
+            when = _when(op, index)
+
+            if kind == "move":
+                if when is not None:
+                    raise ProgramError(f"op {index}: moves cannot have 'when' (later positions would be unknown)")
+                if ("degrees" in op) == ("to" in op):
+                    raise ProgramError(f"op {index}: move needs exactly one of 'degrees' or 'to'")
+                if "to" in op:
+                    absolute = True
+                    current = (position + remainder) * 360.0 / ppr
+                    degrees = (_number(op, index, "to") - current) % 360.0
+                    if op.get("direction", "cw") == "shortest" and degrees > 180.0:
+                        degrees -= 360.0
+                else:
+                    degrees = _number(op, index, "degrees", minimum=-MAX_MOVE_DEGREES, maximum=MAX_MOVE_DEGREES)
+                exact = degrees / 360.0 * ppr + remainder
+                signed = int(round(exact))
+                remainder = exact - signed
+                pulses += abs(signed)
+                if pulses > MAX_PULSES:
+                    raise ProgramError(f"op {index}: program needs more than {MAX_PULSES} rotary pulses")
+                speed = _number(op, index, "speed", config['rotary_speed'], minimum=0)
+                profile = hw.plan_rotary(abs(signed), speed,
+                                         int(_number(op, index, "accel_steps", config['rotary_accel_steps'], minimum=1)),
+                                         int(_number(op, index, "decel_steps", config['rotary_decel_steps'], minimum=1)),
+                                         _flag(op, "s_curve", config['rotary_s_curve']))
+                position += signed
+                motion_s += profile.duration
+                steps.append(Step(index, kind, when, forward=signed >= 0, delays=profile.delays,
+                                  remainder=remainder, degrees=degrees))
+
+            elif kind == "dwell":
+                seconds = _number(op, index, "seconds", minimum=0)
+                dwell_s += seconds
+                steps.append(Step(index, kind, when, seconds=seconds))
+
+            elif kind == "slider":
+                if op.get("to") not in ("in", "out"):
+                    raise ProgramError(f"op {index}: slider 'to' must be 'in' or 'out'")
+                default = config['slider_in_speed'] if op["to"] == "in" else config['slider_out_speed']
+                speed = _number(op, index, "speed", default, minimum=0)
+                steps.append(Step(index, kind, when, to=op["to"], delay=slider_delay(speed)))
+
+            elif kind == "trigger":
+                steps.append(Step(index, kind, when, command=str(op.get("command", "trigger_function"))))
+
+            elif kind == "wait_for":
+                if op.get("sensor") not in SENSORS:
+                    raise ProgramError(f"op {index}: 'sensor' must be one of {SENSORS}")
+                if op.get("on_timeout", "fail") not in ("fail", "continue"):
+                    raise ProgramError(f"op {index}: 'on_timeout' must be 'fail' or 'continue'")
+                steps.append(Step(index, kind, when, sensor=op["sensor"], state=_flag(op, "state", True),
+                                  timeout=_number(op, index, "timeout", 1.0, minimum=0),
+                                  on_timeout=op.get("on_timeout", "fail")))
+
+    return Plan(steps, motion_s, dwell_s, absolute)
+
+
+def run_program(job, plan, hw, status, trigger):
+    """Execute a compiled Plan on the motion thread. Returns the job result."""
+    started = time.perf_counter()
+    phase = hw.telemetry.phase
+    ran = skipped = 0
+    total = len(plan.steps)
+
+    def fail(step, message):
+        status["system_message"] = f"ERROR: program op {step.index} ({step.op}): {message}"
+        return {"success": False, "failed_at": step.index, "ops_run": ran, "ops_skipped": skipped,
+                "message": status["system_message"], "elapsed_s": round(time.perf_counter() - started, 3)}
+
+    status["system_message"] = f"Running program ({total} steps)..."
+    for number, step in enumerate(plan.steps, 1):
+        job.checkpoint()
+        job.progress = {"step": number, "total": total, "op": step.index}
+        if not step.enabled(hw):
+            skipped += 1
+            continue
+        args = step.args
+
+        if step.op == "move":
+            with phase("move"):
+                moved = hw.move_planned(args["forward"], args["delays"], remainder=args["remainder"])
+            status["current_angle"] = round(hw.position_degrees % 360, 3)
+            if not moved:
+                return fail(step, "motor stalled")
+
+        elif step.op == "dwell":
+            with phase("pause"):
+                job.sleep(args["seconds"])
+
+        elif step.op == "slider":
+            move = hw.slider_move_to_min if args["to"] == "in" else hw.slider_move_to_max
+            with phase(f"slider_{args['to']}"):
+                reached = move(args["delay"])
+            if not reached:
+                return fail(step, f"slider did not reach {args['to'].upper()}")
+
+        elif step.op == "trigger":
+            trigger(args["command"])
+
+        elif step.op == "wait_for":
+            deadline = time.perf_counter() + args["timeout"]
+            while not hw.sensors.wait_for(args["sensor"], args["state"],
+                                          timeout=min(0.05, max(0.0, deadline - time.perf_counter()))):
+                job.checkpoint()
+                if time.perf_counter() >= deadline:
+                    break
+            else:
+                ran += 1
+                continue
+            if args["on_timeout"] == "fail":
+                return fail(step, f"{args['sensor']} did not become {'active' if args['state'] else 'inactive'}")
+
+        ran += 1
+
+    elapsed = time.perf_counter() - started
+    status["system_message"] = f"Program complete ({ran} ops, {skipped} skipped, {elapsed:.1f}s)."
+    return {"success": True, "ops_run": ran, "ops_skipped": skipped,
+            "elapsed_s": round(elapsed, 3), "plan": plan.summary()}
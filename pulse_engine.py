@@ -0,0 +1,385 @@
+# In file: pulse_engine.py
+"""
+Step pulse engines for the HardwareController.
+
+A pulse engine takes a whole pulse train (one half-period delay per step,
+the same "delay" the old _step_motor loop slept for on each edge) and emits
+it as a single job; send_stream() does the same for a multi-axis StepStream
+from multi_axis.py. Engines:
+
+- PigpioWaveEngine: builds DMA waveforms with pigpio's wave API, so pulse
+  timing no longer depends on Python or the Linux scheduler.
+- SleepPulseEngine: the original GPIO.output + time.sleep loop (fallback).
+- SimulatedPulseEngine: records edge timestamps so timing can be checked on
+  a plain Linux box without any GPIO hardware.
+"""
+
+import time
+from array import array
+from bisect import bisect_right
+
+from realtime import wait_until
+
+try:
+    import pigpio
+except ImportError:  # Not installed off the Pi or when pigpiod is not used
+    pigpio = None
+
+
+def cumulative_times(delays):
+    """Return the start time (seconds) of every pulse in a delay train."""
+    starts = array('d')
+    t = 0.0
+    for delay in delays:
+        starts.append(t)
+        t += 2.0 * delay
+    return starts
+
+
+def stream_counts_until(stream, t):
+    """Rising edges per pin in a StepStream up to time offset t."""
+    counts = dict.fromkeys(stream.counts, 0)
+    for seg_t, high, _ in stream.segments:
+        if seg_t > t:
+            break
+        for pin in high:
+            counts[pin] += 1
+    return counts
+
+
+class SleepPulseEngine:
+    """Bit-bang pulses with GPIO.output and time.sleep (original behaviour)."""
+
+    name = "sleep"
+    concurrent = True  # separate threads can drive separate pins at once
+    stop_per_pulse = True  # stop() is called once before every pulse
+
+    def __init__(self, gpio):
+        self.gpio = gpio
+        self.telemetry = None  # Telemetry: sample actual vs commanded pulse periods
+        self.spin = 0.0        # > 0: hybrid sleep/busy-wait to absolute deadlines (realtime mode)
+
+    def send(self, step_pin, delays, stop=None):
+        """Emit one pulse per delay. Returns the number of pulses sent.
+
+        If stop is given it is checked before every pulse and the train is
+        cut short as soon as it returns True.
+        """
+        if self.spin > 0:
+            return self._send_precise(step_pin, delays, stop)
+        output = self.gpio.output
+        high, low = self.gpio.HIGH, self.gpio.LOW
+        sleep = time.sleep
+        record = self.telemetry.record_interval if self.telemetry is not None else None
+        clock = time.perf_counter
+        last = period = None
+        sent = 0
+        for delay in delays:
+            if stop is not None and stop():
+                break
+            if record is not None:
+                now = clock()
+                if last is not None:
+                    record(period, now - last)
+                last, period = now, 2.0 * delay
+            output(step_pin, high)
+            sleep(delay)
+            output(step_pin, low)
+            sleep(delay)
+            sent += 1
+        return sent
+
+    def _send_precise(self, step_pin, delays, stop):
+        """send() against absolute edge deadlines, so late wake-ups don't add up."""
+        output = self.gpio.output
+        high, low = self.gpio.HIGH, self.gpio.LOW
+        spin = self.spin
+        record = self.telemetry.record_interval if self.telemetry is not None else None
+        clock = time.perf_counter
+        deadline = clock()
+        last = period = None
+        sent = 0
+        for delay in delays:
+            if stop is not None and stop():
+                break
+            wait_until(deadline, spin)
+            output(step_pin, high)
+            if record is not None:
+                now = clock()
+                if last is not None:
+                    record(period, now - last)
+                last, period = now, 2.0 * delay
+            wait_until(deadline + delay, spin)
+            output(step_pin, low)
+            deadline += 2.0 * delay
+            sent += 1
+        wait_until(deadline, spin)  # hold the last LOW for its full half period
+        return sent
+
+    def send_stream(self, stream, stop=None):
+        """Emit a multi-axis StepStream (see multi_axis.py). Returns pulses sent per pin.
+
+        stop is checked before every segment that raises a step pin.
+        """
+        output = self.gpio.output
+        high_level, low_level = self.gpio.HIGH, self.gpio.LOW
+        counts = dict.fromkeys(stream.counts, 0)
+        spin = self.spin
+        started = time.perf_counter()
+        for t, high, low in stream.segments:
+            if high and stop is not None and stop():
+                break
+            if spin > 0:
+                wait_until(started + t, spin)
+            else:
+                remaining = started + t - time.perf_counter()
+                if remaining > 0:
+                    time.sleep(remaining)
+            for pin in low:
+                output(pin, low_level)
+            for pin in high:
+                output(pin, high_level)
+                counts[pin] += 1
+        for pin in counts:
+            output(pin, low_level)
+        return counts
+
+    def close(self):
+        pass
+
+
+class SimulatedPulseEngine:
+    """Record step edges as (timestamp, pin, level) instead of timing them.
+
+    With realtime=False the timestamps follow a virtual clock that advances
+    by exactly the requested delays, which makes it cheap to check that a
+    planned train has the intended rate. With realtime=True the engine waits
+    for each edge deadline and records the actual perf_counter() time, so
+    the scheduling jitter of the host can be measured.
+    If a gpio object is given, the edges are also written to it (a
+    SimulatedGPIO then times its step pulses with the engine's clock).
+    """
+
+    name = "sim"
+    concurrent = False  # one shared virtual clock
+    stop_per_pulse = True
+
+    def __init__(self, gpio=None, realtime=False):
+        self.gpio = gpio
+        self.realtime = realtime
+        self.edges = []
+        self._clock = 0.0
+        self._now = 0.0
+        if gpio is not None and getattr(gpio, "simulated", False):
+            gpio.clock = lambda: self._now
+
+    def _edge(self, t, pin, level):
+        self._now = t
+        self.edges.append((t, pin, level))
+        if self.gpio is not None:
+            self.gpio.output(pin, self.gpio.HIGH if level else self.gpio.LOW)
+
+    def send(self, step_pin, delays, stop=None):
+        sent = 0
+        if self.realtime:
+            deadline = time.perf_counter()
+            for delay in delays:
+                if stop is not None and stop():
+                    break
+                for level in (1, 0):
+                    while time.perf_counter() < deadline:
+                        pass
+                    self._edge(time.perf_counter(), step_pin, level)
+                    deadline += delay
+                sent += 1
+            return sent
+
+        t = self._clock
+        for delay in delays:
+            if stop is not None and stop():
+                break
+            self._edge(t, step_pin, 1)
+            t += delay
+            self._edge(t, step_pin, 0)
+            t += delay
+            sent += 1
+        self._clock = t
+        return sent
+
+    def send_stream(self, stream, stop=None):
+        counts = dict.fromkeys(stream.counts, 0)
+        origin = time.perf_counter() if self.realtime else self._clock
+        end = origin
+        for t, high, low in stream.segments:
+            if high and stop is not None and stop():
+                break
+            end = origin + t
+            if self.realtime:
+                while time.perf_counter() < end:
+                    pass
+                end = time.perf_counter()
+            for pin in low:
+                self._edge(end, pin, 0)
+            for pin in high:
+                self._edge(end, pin, 1)
+                counts[pin] += 1
+        if not self.realtime:
+            self._clock = end
+        return counts
+
+    def rising_edges(self, pin):
+        """Timestamps of every rising edge recorded on pin."""
+        return [t for t, p, level in self.edges if p == pin and level]
+
+    def periods(self, pin):
+        """Measured step periods (seconds) between consecutive rising edges."""
+        rising = self.rising_edges(pin)
+        return [b - a for a, b in zip(rising, rising[1:])]
+
+    def clear(self):
+        self.edges.clear()
+
+    def close(self):
+        pass
+
+
+class PigpioWaveEngine:
+    """Send pulse trains as pigpio DMA waveforms.
+
+    Trains are split into chunks of chunk_steps pulses. Each chunk is built
+    while the previous one is transmitting and queued with
+    WAVE_MODE_ONE_SHOT_SYNC, so chunk boundaries have no gap. While a wave
+    runs, the stop condition is polled every poll_interval seconds; when it
+    trips the wave is stopped and the pulse count is estimated from the
+    elapsed time.
+    """
+
+    name = "pigpio"
+    concurrent = False  # pigpio transmits one wave at a time
+    stop_per_pulse = False  # stop() is polled every poll_interval while a wave runs
+
+    def __init__(self, host=None, port=None, chunk_steps=2000, poll_interval=0.0002):
+        if pigpio is None:
+            raise RuntimeError("pigpio module is not installed")
+        self.pi = pigpio.pi() if host is None else pigpio.pi(host, port)
+        if not self.pi.connected:
+            raise RuntimeError("pigpiod daemon is not running")
+        self.chunk_steps = chunk_steps
+        self.poll_interval = poll_interval
+
+    def send(self, step_pin, delays, stop=None):
+        total = len(delays)
+        if total == 0 or (stop is not None and stop()):
+            return 0
+
+        self.pi.set_mode(step_pin, pigpio.OUTPUT)
+        starts = cumulative_times(delays)
+        mask = 1 << step_pin
+
+        def chunks():
+            for lo in range(0, total, self.chunk_steps):
+                pulses = []
+                for delay in delays[lo:lo + self.chunk_steps]:
+                    us = max(1, int(round(delay * 1e6)))
+                    pulses.append(pigpio.pulse(mask, 0, us))
+                    pulses.append(pigpio.pulse(0, mask, us))
+                yield starts[lo], pulses
+
+        stopped_at = self._transmit(chunks(), stop)
+        return total if stopped_at is None else bisect_right(starts, stopped_at)
+
+    def send_stream(self, stream, stop=None):
+        segments = stream.segments
+        if not segments or (stop is not None and stop()):
+            return dict.fromkeys(stream.counts, 0)
+
+        for pin in stream.counts:
+            self.pi.set_mode(pin, pigpio.OUTPUT)
+
+        def chunks():
+            for lo in range(0, len(segments), self.chunk_steps):
+                pulses = []
+                if lo == 0 and segments[0][0] > 0:
+                    pulses.append(pigpio.pulse(0, 0, int(round(segments[0][0] * 1e6))))
+                for i in range(lo, min(lo + self.chunk_steps, len(segments))):
+                    t, high, low = segments[i]
+                    following = segments[i + 1][0] if i + 1 < len(segments) else t
+                    on = sum(1 << pin for pin in high)
+                    off = sum(1 << pin for pin in low)
+                    pulses.append(pigpio.pulse(on, off, max(1, int(round((following - t) * 1e6)))))
+                yield segments[lo][0], pulses
+
+        stopped_at = self._transmit(chunks(), stop)
+        if stopped_at is None:
+            return dict(stream.counts)
+        return stream_counts_until(stream, stopped_at)
+
+    def _transmit(self, chunks, stop):
+        """Send (start_offset, pulses) chunks back to back.
+
+        Returns None when everything was sent, or the estimated time offset
+        into the train at which the stop condition aborted it.
+        """
+        self.pi.wave_clear()
+        queued = []  # (wave_id, chunk start offset) in transmit order
+        chunk_started = time.perf_counter()
+
+        try:
+            for offset, pulses in chunks:
+                self.pi.wave_add_generic(pulses)
+                wid = self.pi.wave_create()
+                self.pi.wave_send_using_mode(wid, pigpio.WAVE_MODE_ONE_SHOT_SYNC)
+                queued.append((wid, offset))
+
+                # Keep at most two waves in pigpio's memory: wait for the
+                # previous chunk to hand over to the one just queued. A short
+                # chunk may finish between polls, so anything but the previous
+                # wave (the new one, or no wave at all) counts as the handover.
+                while len(queued) > 1:
+                    if self.pi.wave_tx_at() != queued[0][0]:
+                        self.pi.wave_delete(queued.pop(0)[0])
+                        chunk_started = time.perf_counter()
+                        continue
+                    if stop is not None and stop():
+                        return self._abort(queued[0][1], chunk_started)
+                    time.sleep(self.poll_interval)
+
+            while self.pi.wave_tx_busy():
+                if stop is not None and stop():
+                    return self._abort(queued[0][1], chunk_started)
+                time.sleep(self.poll_interval)
+            return None
+        finally:
+            for wid, _ in queued:
+                self.pi.wave_delete(wid)
+
+    def _abort(self, offset, chunk_started):
+        """Stop the running wave and estimate how far into the train it got."""
+        self.pi.wave_tx_stop()
+        return offset + (time.perf_counter() - chunk_started)
+
+    def close(self):
+        self.pi.wave_tx_stop()
+        self.pi.wave_clear()
+        self.pi.stop()
+
+
+def create_pulse_engine(kind, gpio):
+    """Build a pulse engine by name: "pigpio", "sleep", "sim" or "auto".
+
+    "auto" uses pigpio when the daemon is reachable and falls back to the
+    sleep loop otherwise.
+    """
+    if kind == "pigpio":
+        return PigpioWaveEngine()
+    if kind == "sleep":
+        return SleepPulseEngine(gpio)
+    if kind == "sim":
+        return SimulatedPulseEngine(gpio)
+    if kind == "auto":
+        try:
+            return PigpioWaveEngine()
+        except Exception as e:
+            print(f"⚠️ pigpio wave engine unavailable ({e}). Falling back to sleep timing.")
+            return SleepPulseEngine(gpio)
+    raise ValueError(f"Unknown pulse engine: {kind}")
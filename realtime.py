@@ -0,0 +1,175 @@
+# In file: realtime.py
+"""
+Opt-in realtime mode for the thread that sends step pulses.
+
+With the sleep pulse engine, pulse timing depends on when Linux wakes the
+motion thread up again. Flask request threads, the cyclic garbage
+collector and ordinary CFS preemption all make it late. RealtimeMode
+reduces that:
+
+- pins the pulsing thread to one core (an isolcpus= core if the kernel
+  has any, otherwise the last allowed core),
+- asks for SCHED_FIFO priority (needs root or CAP_SYS_NICE; without it a
+  warning is printed and the thread keeps normal scheduling),
+- disables the cyclic GC while a pulse train is being sent (refcounting
+  still frees memory; collections are deferred to the gaps between moves),
+  and freezes the objects that exist at startup so later collections
+  don't scan them,
+- switches the sleep engine to wait_until(): sleep until shortly before
+  each edge, then busy-wait for the rest,
+- shortens the interpreter's GIL switch interval, so a busy request
+  thread hands the GIL back to a woken motion thread sooner.
+
+Settings take effect on a thread the next time it sends pulses, so the
+config page can switch the mode without restarting the motion thread.
+"""
+
+import gc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+SPIN_SECONDS = 0.0002  # busy-wait this long before each deadline
+SWITCH_INTERVAL = 0.0005  # GIL switch interval in realtime mode (Python default: 0.005)
+
+
+def wait_until(deadline, spin=SPIN_SECONDS, clock=time.perf_counter, sleep=time.sleep):
+    """Hybrid timer: time.sleep() for most of the wait, busy-wait for the last spin seconds."""
+    remaining = deadline - clock()
+    if remaining > spin:
+        sleep(remaining - spin)
+    while clock() < deadline:
+        pass
+
+
+def isolated_cpus():
+    """CPUs reserved with the isolcpus= kernel parameter (empty set if none)."""
+    try:
+        with open("/sys/devices/system/cpu/isolated") as f:
+            text = f.read().strip()
+    except OSError:
+        return set()
+    cpus = set()
+    for part in filter(None, text.split(",")):
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def default_cpu():
+    """Core to pin the motion thread to: an isolated one if available, else the last allowed one."""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    allowed = os.sched_getaffinity(0)
+    isolated = isolated_cpus()
+    return max(isolated or allowed)
+
+
+class RealtimeMode:
+    """CPU pinning, SCHED_FIFO and GC control for pulse-sending threads."""
+
+    def __init__(self, enabled=False, cpu=None, priority=50, spin=SPIN_SECONDS):
+        self.enabled = enabled
+        self.cpu = cpu              # None = default_cpu()
+        self.priority = priority    # SCHED_FIFO priority 1-99
+        self.spin = spin
+        self.errors = []
+        self.deferred_collections = 0
+        self._generation = 0
+        self._applied = {}          # thread ident -> generation applied to it
+        self._all_cpus = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+        self._gc_holds = 0
+        self._gc_was_enabled = True
+        self._frozen = False
+        self._default_switch = sys.getswitchinterval()
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=None, cpu=None, priority=None, spin=None):
+        """Change settings; threads pick them up on their next move."""
+        with self._lock:
+            if enabled is not None:
+                self.enabled = bool(enabled)
+            if cpu is not None:
+                self.cpu = None if cpu < 0 else cpu
+            if priority is not None:
+                self.priority = priority
+            if spin is not None:
+                self.spin = spin
+            self._generation += 1
+            sys.setswitchinterval(SWITCH_INTERVAL if self.enabled else self._default_switch)
+            if self.enabled and not self._frozen and hasattr(gc, "freeze"):
+                gc.collect()
+                gc.freeze()  # objects created so far move to a permanent generation
+                self._frozen = True
+
+    # --- Thread scheduling ---
+    def _apply_thread(self):
+        """Pin/prioritise (or restore) the calling thread if the settings changed."""
+        ident = threading.get_ident()
+        if self._applied.get(ident) == self._generation:
+            return
+        self._applied[ident] = self._generation
+        name = threading.current_thread().name
+        if self.enabled:
+            if self._all_cpus is not None:
+                cpu = self.cpu if self.cpu is not None else default_cpu()
+                self._call(f"pin {name} to CPU {cpu}", os.sched_setaffinity, 0, {cpu})
+            if hasattr(os, "sched_setscheduler"):
+                self._call(f"SCHED_FIFO {self.priority} for {name}", os.sched_setscheduler,
+                           0, os.SCHED_FIFO, os.sched_param(self.priority))
+            print(f"⏱️ Realtime mode on for thread {name}")
+        else:
+            if self._all_cpus is not None:
+                self._call(f"unpin {name}", os.sched_setaffinity, 0, self._all_cpus)
+            if hasattr(os, "sched_setscheduler"):
+                self._call(f"SCHED_OTHER for {name}", os.sched_setscheduler,
+                           0, os.SCHED_OTHER, os.sched_param(0))
+
+    def _call(self, what, func, *args):
+        try:
+            func(*args)
+        except (OSError, ValueError) as e:
+            message = f"{what}: {e}"
+            if message not in self.errors:
+                self.errors.append(message)
+                print(f"⚠️ Realtime: could not {message}")
+
+    # --- GC control ---
+    @contextmanager
+    def move(self):
+        """Wrap one pulse train: applies the thread settings and holds off the GC."""
+        if not self.enabled and self._applied.get(threading.get_ident()) in (None, self._generation):
+            yield  # off, and nothing to restore on this thread
+            return
+        self._apply_thread()
+        if not self.enabled:
+            yield
+            return
+        with self._lock:
+            if self._gc_holds == 0:
+                self._gc_was_enabled = gc.isenabled()
+                gc.disable()
+            self._gc_holds += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._gc_holds -= 1
+                if self._gc_holds == 0 and self._gc_was_enabled:
+                    if gc.get_count()[0] > gc.get_threshold()[0]:
+                        self.deferred_collections += 1
+                    gc.enable()  # a deferred collection runs at the next allocation, between moves
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "cpu": self.cpu if self.cpu is not None else default_cpu(),
+            "priority": self.priority,
+            "spin_us": round(self.spin * 1e6, 1),
+            "switch_interval_ms": sys.getswitchinterval() * 1000,
+            "threads": len(self._applied),
+            "deferred_collections": self.deferred_collections,
+            "errors": list(self.errors),
+        }
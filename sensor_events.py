@@ -0,0 +1,180 @@
+# In file: sensor_events.py
+"""
+Edge-triggered sensor state for the HardwareController.
+
+Instead of calling GPIO.input() on every step pulse, each input pin gets a
+GPIO.add_event_detect() callback that updates an in-memory SensorChannel.
+Motion loops and /api/status then read the cached (debounced) state, the
+time of the last change and a latch that remembers an activation even if
+the sensor has already released again.
+
+An edge within `debounce` of the last accepted change is not taken on
+trust, and RPi.GPIO's bouncetime may swallow it entirely. Instead the pin
+is read again once the window has passed (one timer per channel), so a
+short hall pass or ALM pulse cannot leave the cached state wrong. With
+debounce 0 every edge is taken as it comes and nothing is re-read.
+Listeners run after the channel lock is released, so a slow listener
+delays only its own notification, not the next edge.
+"""
+
+import threading
+import time
+
+
+class SensorChannel:
+    """Cached state of one active-low input."""
+
+    def __init__(self, name, pin):
+        self.name = name
+        self.pin = pin
+        self.active = False
+        self.changed_at = 0.0      # perf_counter() of the last accepted change
+        self.activated_at = 0.0    # perf_counter() of the last activation
+        self.deactivated_at = 0.0  # perf_counter() of the last release
+        self.activations = 0
+        self.latched = False       # set on activation, cleared by arm()
+        self.interrupts = True     # False when edge detection is unavailable
+        self.resamples = 0         # re-reads after a debounce window
+        self._timer = None         # pending re-read
+
+    def arm(self):
+        """Clear the latch before waiting for the next activation."""
+        self.latched = False
+
+    def to_dict(self):
+        return {
+            "active": self.active,
+            "latched": self.latched,
+            "changed_at": self.changed_at,
+            "activations": self.activations,
+        }
+
+
+class SensorEvents:
+    """Keeps SensorChannels up to date from GPIO edge interrupts."""
+
+    def __init__(self, gpio, pins, debounce=0.002):
+        self.gpio = gpio
+        self.debounce = debounce
+        self.channels = {name: SensorChannel(name, pin) for name, pin in pins.items()}
+        self._by_pin = {channel.pin: channel for channel in self.channels.values()}
+        self.listeners = []  # called as listener(channel) after every accepted change
+        self._changed = threading.Condition()
+        self._lock = threading.RLock()  # edge callbacks vs. re-read timers
+
+    def start(self):
+        """Read the initial levels and register edge callbacks."""
+        bouncetime = max(1, int(self.debounce * 1000))
+        now = time.perf_counter()
+        for channel in self.channels.values():
+            channel.active = self.gpio.input(channel.pin) == self.gpio.LOW
+            channel.changed_at = now
+            try:
+                self.gpio.add_event_detect(channel.pin, self.gpio.BOTH,
+                                           callback=self._on_edge, bouncetime=bouncetime)
+            except RuntimeError as e:
+                # Some kernels refuse edge detection on a pin; read it directly instead
+                print(f"⚠️ Edge detection unavailable for {channel.name} (GPIO {channel.pin}): {e}. Polling instead.")
+                channel.interrupts = False
+
+    def _on_edge(self, pin):
+        channel = self._by_pin.get(pin)
+        if channel is None:
+            return
+        with self._lock:
+            now = time.perf_counter()
+            active = self.gpio.input(pin) == self.gpio.LOW
+            if active == channel.active:
+                return
+            if now - channel.changed_at < self.debounce:
+                self._resample_later(channel, channel.changed_at + self.debounce - now)
+                return
+            self._set(channel, active, now)
+        self._notify(channel)
+
+    def _resample_later(self, channel, delay):
+        """Re-read the pin after delay, unless a re-read is already pending (or debounce is 0)."""
+        if channel._timer is not None or self.debounce <= 0:
+            return
+        channel._timer = threading.Timer(max(delay, 0.0), self._resample, (channel,))
+        channel._timer.daemon = True
+        channel._timer.start()
+
+    def _resample(self, channel):
+        with self._lock:
+            channel._timer = None
+            channel.resamples += 1
+            active = self.gpio.input(channel.pin) == self.gpio.LOW
+            if active == channel.active:
+                return
+            self._set(channel, active, time.perf_counter())
+        self._notify(channel)
+
+    def _set(self, channel, active, now):
+        """Record a change (under _lock); the caller then runs _notify() without it."""
+        channel.active = active
+        channel.changed_at = now
+        if active:
+            channel.activated_at = now
+            channel.activations += 1
+            channel.latched = True
+        else:
+            channel.deactivated_at = now
+        if channel.interrupts:
+            # bouncetime drops edges inside the window, including a quick return
+            self._resample_later(channel, self.debounce)
+
+    def _notify(self, channel):
+        with self._changed:
+            self._changed.notify_all()
+        for listener in self.listeners:
+            listener(channel)
+
+    def refresh(self, name):
+        """Re-read a channel that has no interrupt and return its state."""
+        channel = self.channels[name]
+        if not channel.interrupts:
+            with self._lock:
+                active = self.gpio.input(channel.pin) == self.gpio.LOW
+                changed = active != channel.active
+                if changed:
+                    self._set(channel, active, time.perf_counter())
+            if changed:
+                self._notify(channel)
+        return channel.active
+
+    def is_active(self, name):
+        channel = self.channels[name]
+        if channel.interrupts:
+            return channel.active
+        return self.refresh(name)
+
+    def wait_for(self, name, active=True, timeout=None, poll=0.001):
+        """Block until the channel is in the given state; False on timeout.
+
+        Channels without interrupts are re-read every poll seconds.
+        """
+        channel = self.channels[name]
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._changed:
+            while self.is_active(name) != active:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return False
+                if not channel.interrupts:
+                    remaining = poll if remaining is None else min(poll, remaining)
+                self._changed.wait(remaining)
+        return True
+
+    def snapshot(self):
+        return {name: channel.to_dict() for name, channel in self.channels.items()}
+
+    def close(self):
+        for channel in self.channels.values():
+            if channel._timer is not None:
+                channel._timer.cancel()
+            if channel.interrupts:
+                try:
+                    self.gpio.remove_event_detect(channel.pin)
+                except RuntimeError:
+                    pass
@@ -40,11 +40,25 @@ document.addEventListener('DOMContentLoaded', () => {
         return data || {};
     }
 
+    // Motion routes return a job id straight away; poll the job until it ends
+    async function runJob(url, body) {
+        const data = await postJSON(url, body);
+        if (!data.job_id) return data;
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 250));
+            const res = await fetch(`/api/jobs/${data.job_id}`);
+            const job = await res.json();
+            if (!res.ok) throw new Error(job.message || res.statusText);
+            if (job.status === 'completed') return { message: job.message, ...(job.result || {}) };
+            if (job.status === 'failed' || job.status === 'cancelled') throw new Error(job.message || job.status);
+        }
+    }
+
     btnHome.addEventListener('click', async () => {
         msg.textContent = 'Homing rotary...';
         setBusy(true);
         try {
-            const data = await postJSON('/api/rotary/home');
+            const data = await runJob('/api/rotary/home');
             msg.textContent = data.message || 'Homed';
         } catch (e) {
             msg.textContent = 'Error: ' + e.message;
@@ -58,7 +72,7 @@ document.addEventListener('DOMContentLoaded', () => {
         msg.textContent = `Moving +${deg}°...`;
         setBusy(true);
         try {
-            const data = await postJSON('/api/rotary/move', { degrees: deg });
+            const data = await runJob('/api/rotary/move', { degrees: deg });
             msg.textContent = data.message || 'Moved';
         } catch (e) {
             msg.textContent = 'Error: ' + e.message;
@@ -72,7 +86,7 @@ document.addEventListener('DOMContentLoaded', () => {
         msg.textContent = `Moving -${deg}°...`;
         setBusy(true);
         try {
-            const data = await postJSON('/api/rotary/move', { degrees: -deg });
+            const data = await runJob('/api/rotary/move', { degrees: -deg });
             msg.textContent = data.message || 'Moved';
         } catch (e) {
             msg.textContent = 'Error: ' + e.message;
@@ -100,7 +114,7 @@ document.addEventListener('DOMContentLoaded', () => {
         msg.textContent = 'Starting slider test cycle...';
         setBusy(true);
         try {
-            const data = await postJSON('/api/slider/test_cycle');
+            const data = await runJob('/api/slider/test_cycle');
             if (data.success) {
                 sliderStatus.textContent = 'Test Complete';
                 sliderStatus.className = 'status-text complete';
@@ -118,15 +132,22 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // Status is pushed over Server-Sent Events; fields arrive only when they change
+    const status = {};
+
+    function renderStatus(fields) {
+        Object.assign(status, fields);
+        hall.classList.toggle('active', !!status.hall_status);
+        inductive.classList.toggle('active', !!status.inductive_status);
+        smin.classList.toggle('active', !!status.slider_min);
+        smax.classList.toggle('active', !!status.slider_max);
+        setBusy(!!status.is_running);
+    }
+
     async function refreshStatus() {
         try {
             const res = await fetch('/api/status');
-            const data = await res.json();
-            hall.classList.toggle('active', !!data.hall_status);
-            inductive.classList.toggle('active', !!data.inductive_status);
-            smin.classList.toggle('active', !!data.slider_min);
-            smax.classList.toggle('active', !!data.slider_max);
-            setBusy(!!data.is_running);
+            renderStatus(await res.json());
         } catch (e) {
             msg.textContent = 'Status error: ' + e.message;
         }
@@ -177,7 +198,13 @@ document.addEventListener('DOMContentLoaded', () => {
 
     refreshStatus();
     loadConfig();
-    setInterval(refreshStatus, 1000);
+    if (window.EventSource) {
+        const source = new EventSource('/api/status/stream');
+        source.addEventListener('snapshot', e => renderStatus(JSON.parse(e.data)));
+        source.onmessage = e => renderStatus(JSON.parse(e.data));
+    } else {
+        setInterval(refreshStatus, 1000);
+    }
 });
 
 
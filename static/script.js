@@ -3,6 +3,8 @@
 document.addEventListener('DOMContentLoaded', function () {
     const startButton = document.getElementById('start-button');
     const homeButton = document.getElementById('home-button'); // Added
+    const pauseButton = document.getElementById('pause-button');
+    const cancelButton = document.getElementById('cancel-button');
     const angleDisplay = document.getElementById('current-angle');
     const messageDisplay = document.getElementById('system-message');
     const homedDisplay = document.getElementById('homed-status'); // Added
@@ -20,38 +22,74 @@ document.addEventListener('DOMContentLoaded', function () {
         const cyclesInput = document.getElementById('cycles');
         const cycles = cyclesInput ? parseInt(cyclesInput.value, 10) || 1 : 1;
         try {
-            await fetch('/api/start', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ cycles }) });
+            const res = await fetch('/api/start', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ cycles }) });
+            const data = await res.json();
+            if (!res.ok) messageDisplay.textContent = data.error || res.statusText;
         } catch (e) {
             // no-op; errors reflected via /api/status polling
         }
     });
 
+    // --- ADDED: Pause/resume and cancel the running job ---
+    let currentJobId = null;
+    let jobPaused = false;
+
+    pauseButton.addEventListener('click', () => {
+        if (currentJobId) fetch(`/api/jobs/${currentJobId}/${jobPaused ? 'resume' : 'pause'}`, { method: 'POST' });
+    });
+
+    cancelButton.addEventListener('click', () => {
+        if (currentJobId) fetch(`/api/jobs/${currentJobId}/cancel`, { method: 'POST' });
+    });
+
+    // --- MODIFIED: Status is pushed over Server-Sent Events (changed fields only) ---
+    const data = {};
+
+    function render() {
+        angleDisplay.textContent = data.current_angle + '°';
+        messageDisplay.textContent = data.system_message;
+
+        // --- MODIFIED: Update homing status display ---
+        if (data.is_homed) {
+            homedDisplay.textContent = 'Homed';
+            homedDisplay.className = 'status-value homed-yes';
+        } else {
+            homedDisplay.textContent = 'Not Homed';
+            homedDisplay.className = 'status-value homed-no';
+        }
+
+        hallIndicator.classList.toggle('active', data.hall_status);
+        inductiveIndicator.classList.toggle('active', data.inductive_status);
+
+        // --- MODIFIED: Disable/Enable buttons logically ---
+        const isBusy = data.is_running;
+        homeButton.disabled = isBusy;
+        // Start button is disabled if busy OR if not homed
+        startButton.disabled = isBusy || !data.is_homed;
+
+        currentJobId = isBusy ? data.job_id : null;
+        jobPaused = data.job_status === 'paused';
+        pauseButton.textContent = jobPaused ? 'Resume' : 'Pause';
+        pauseButton.disabled = !isBusy;
+        cancelButton.disabled = !isBusy;
+    }
+
+    function apply(fields) {
+        Object.assign(data, fields);
+        render();
+    }
+
     function updateStatus() {
         fetch('/api/status')
             .then(response => response.json())
-            .then(data => {
-                angleDisplay.textContent = data.current_angle + '°';
-                messageDisplay.textContent = data.system_message;
-
-                // --- MODIFIED: Update homing status display ---
-                if (data.is_homed) {
-                    homedDisplay.textContent = 'Homed';
-                    homedDisplay.className = 'status-value homed-yes';
-                } else {
-                    homedDisplay.textContent = 'Not Homed';
-                    homedDisplay.className = 'status-value homed-no';
-                }
-
-                hallIndicator.classList.toggle('active', data.hall_status);
-                inductiveIndicator.classList.toggle('active', data.inductive_status);
-
-                // --- MODIFIED: Disable/Enable buttons logically ---
-                const isBusy = data.is_running;
-                homeButton.disabled = isBusy;
-                // Start button is disabled if busy OR if not homed
-                startButton.disabled = isBusy || !data.is_homed;
-            });
+            .then(apply);
     }
 
-    setInterval(updateStatus, 1000);
+    if (window.EventSource) {
+        const source = new EventSource('/api/status/stream');
+        source.addEventListener('snapshot', e => apply(JSON.parse(e.data)));
+        source.onmessage = e => apply(JSON.parse(e.data));
+    } else {
+        setInterval(updateStatus, 1000);
+    }
 });
\ No newline at end of file
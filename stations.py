@@ -0,0 +1,169 @@
+# In file: stations.py
+"""
+Station definitions: several key-loader tables driven from one controller.
+
+A station is one rotary table and slider with its own pin map, pulses per
+revolution, config file, run journal and Pico link. stations.json lists
+them:
+
+    {"stations": [
+        {"name": "left", "config": "config_left.json", "journal": "runs_left.journal",
+         "pico": "/dev/ttyACM0"},
+        {"name": "right", "pulses_per_rev": 6400, "config": "config_right.json",
+         "journal": "runs_right.journal", "pico": "/dev/ttyACM1",
+         "pins": {"step": 17, "dir": 27, ...}}
+    ]}
+
+Pins not given keep the default BCM map (gpio_backend.DEFAULT_PINS); the
+legacy home_switch/end_switch inputs may be null. supervisor.py runs each
+station in its own process and tells it which station it is through the
+KEY_LOADER_STATION environment variable (the definition as JSON). Without
+it, app.py serves the single default station, as before.
+"""
+
+import json
+import os
+import re
+
+from gpio_backend import DEFAULT_PINS
+
+STATION_ENV = "KEY_LOADER_STATION"
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+RESERVED_NAMES = ("stations",)  # /api/stations is the supervisor's own route
+OPTIONAL_PINS = ("home_switch", "end_switch")
+
+
+class StationError(ValueError):
+    """Invalid station definition; the message names the station."""
+
+
+class Station:
+    """One table: pins, motor resolution and its own files and Pico link."""
+
+    def __init__(self, name="default", pins=None, pulses_per_rev=None, config="config.json",
+                 journal="runs.journal", pico=None, gpio=None, pulse_engine="auto", port=None):
+        self.name = name
+        self.pins = dict(pins or {})        # overrides of DEFAULT_PINS, by role
+        self.pulses_per_rev = pulses_per_rev  # None = controller default (3200)
+        self.config = config
+        self.journal = journal
+        self.pico = pico                    # device path, "loopback", "pty"; None = KEY_LOADER_PICO / auto
+        self.gpio = gpio                    # "rpi", "sim"; None = KEY_LOADER_GPIO / auto
+        self.pulse_engine = pulse_engine
+        self.port = port                    # worker HTTP port (assigned by the supervisor if None)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Validate one definition; raises StationError."""
+        if not isinstance(data, dict):
+            raise StationError("station definition must be an object")
+        name = data.get("name", "default")
+        if not isinstance(name, str) or not NAME_PATTERN.match(name) or name in RESERVED_NAMES:
+            raise StationError(f"invalid station name {name!r} (letters, digits, '-', '_')")
+        unknown = set(data) - {"name", "pins", "pulses_per_rev", "config", "journal",
+                               "pico", "gpio", "pulse_engine", "port"}
+        if unknown:
+            raise StationError(f"{name}: unknown keys {sorted(unknown)}")
+
+        pins = data.get("pins") or {}
+        if not isinstance(pins, dict):
+            raise StationError(f"{name}: 'pins' must be an object of role: BCM pin")
+        for role, pin in pins.items():
+            if role not in DEFAULT_PINS:
+                raise StationError(f"{name}: unknown pin role '{role}' (one of {', '.join(DEFAULT_PINS)})")
+            if pin is None and role in OPTIONAL_PINS:
+                continue
+            if not isinstance(pin, int) or isinstance(pin, bool) or not 0 <= pin <= 27:
+                raise StationError(f"{name}: pin '{role}' must be a BCM number 0-27")
+
+        pulses_per_rev = data.get("pulses_per_rev")
+        if pulses_per_rev is not None and (not isinstance(pulses_per_rev, int) or pulses_per_rev < 200):
+            raise StationError(f"{name}: 'pulses_per_rev' must be an integer >= 200")
+        port = data.get("port")
+        if port is not None and (not isinstance(port, int) or not 1 <= port <= 65535):
+            raise StationError(f"{name}: 'port' must be a TCP port number")
+
+        station = cls(name, pins, pulses_per_rev,
+                      data.get("config", f"config_{name}.json"),
+                      data.get("journal", f"runs_{name}.journal"),
+                      data.get("pico"), data.get("gpio"), data.get("pulse_engine", "auto"), port)
+        used = {}
+        for role, pin in station.pin_map().items():
+            if pin in used:
+                raise StationError(f"{name}: BCM {pin} is used for both '{used[pin]}' and '{role}'")
+            used[pin] = role
+        return station
+
+    def pin_map(self):
+        """Effective {role: BCM pin}, unwired optional pins left out."""
+        return {role: pin for role, pin in dict(DEFAULT_PINS, **self.pins).items() if pin is not None}
+
+    def to_dict(self):
+        return {"name": self.name, "pins": self.pins, "pulses_per_rev": self.pulses_per_rev,
+                "config": self.config, "journal": self.journal, "pico": self.pico,
+                "gpio": self.gpio, "pulse_engine": self.pulse_engine, "port": self.port}
+
+
+def load_stations(path):
+    """Read and validate stations.json; returns a list of Station.
+
+    Besides each definition, checks what the stations would fight over on
+    one host: names, ports, files, Pico devices and GPIO pins.
+    """
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (ValueError, IOError) as e:
+        raise StationError(f"could not load {path}: {e}")
+    entries = data.get("stations") if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        raise StationError(f"{path}: expected {{\"stations\": [...]}} with at least one station")
+    stations = [Station.from_dict(entry) for entry in entries]
+
+    def unique(what, key, skip=()):
+        seen = {}
+        for station in stations:
+            value = key(station)
+            if value in skip:
+                continue
+            if value in seen:
+                raise StationError(f"stations '{seen[value]}' and '{station.name}' share {what} {value!r}")
+            seen[value] = station.name
+
+    unique("the name", lambda s: s.name)
+    unique("the port", lambda s: s.port, skip=(None,))
+    unique("the config file", lambda s: os.path.abspath(s.config))
+    unique("the journal", lambda s: os.path.abspath(s.journal))
+    if len(stations) > 1:
+        # "auto" picks /dev/ttyACM0 for every station; emulators are per process
+        unique("the Pico", lambda s: s.pico or "auto", skip=("loopback", "pty"))
+
+    owners = {}
+    for station in stations:
+        if (station.gpio or os.environ.get("KEY_LOADER_GPIO")) == "sim":
+            continue  # every simulated station has its own machine
+        for role, pin in station.pin_map().items():
+            if pin in owners:
+                raise StationError(f"stations '{owners[pin][0]}' ({owners[pin][1]}) and "
+                                   f"'{station.name}' ({role}) both use BCM {pin}")
+            owners[pin] = (station.name, role)
+
+    # pigpio waves belong to the daemon, not to a client: two stations would clear each other's
+    wave_stations = [s for s in stations if s.pulse_engine in ("auto", "pigpio")]
+    for station in wave_stations[1:]:
+        if station.pulse_engine == "pigpio":
+            raise StationError(f"{station.name}: only one station can use the pigpio wave engine")
+        station.pulse_engine = "sleep"
+        print(f"⚠️ Station {station.name}: pigpio waves are used by {wave_stations[0].name}; using sleep timing.")
+    return stations
+
+
+def current_station():
+    """The station this process serves: KEY_LOADER_STATION, or the single default station."""
+    text = os.environ.get(STATION_ENV)
+    if not text:
+        return Station()
+    try:
+        return Station.from_dict(json.loads(text))
+    except ValueError as e:  # includes StationError and bad JSON
+        raise StationError(f"{STATION_ENV}: {e}")
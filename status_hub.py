@@ -0,0 +1,102 @@
+# In file: status_hub.py
+"""
+Shared status snapshot with change-only push to subscribers.
+
+All writers update one StatusHub; every update bumps a version number and
+records which fields changed. /api/status returns the cached snapshot and
+/api/status/stream (Server-Sent Events) sends each client only the fields
+that changed since the version it last saw.
+
+The state itself is an immutable MachineState (machine_state.py). Writers
+serialise on a lock and swap in a new instance; readers only load the
+current reference, so status reads never wait for a writer.
+"""
+
+import json
+import threading
+from collections import deque
+
+from machine_state import MachineState
+
+
+class StatusHub:
+    """Versioned machine status. Supports hub["field"] reads and writes."""
+
+    def __init__(self, initial=None, history=256):
+        if not isinstance(initial, MachineState):
+            initial = MachineState(**(initial or {}))
+        self._state = initial
+        self._cond = threading.Condition()
+        self._history = deque(maxlen=history)  # (version, {field: value})
+
+    @property
+    def version(self):
+        return self._state.version
+
+    @property
+    def state(self):
+        """Current MachineState (lock-free; never modified after publication)."""
+        return self._state
+
+    # --- Mapping-style access so existing app_state code keeps working ---
+    def __getitem__(self, key):
+        if key not in MachineState.fields():
+            raise KeyError(key)
+        return getattr(self._state, key)
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __contains__(self, key):
+        return key in MachineState.fields()
+
+    def get(self, key, default=None):
+        return getattr(self._state, key, default) if key in self else default
+
+    def update(self, fields):
+        """Apply fields and wake subscribers if anything actually changed."""
+        with self._cond:
+            state = self._state
+            changed = {k: v for k, v in fields.items() if k not in self or getattr(state, k) != v}
+            if not changed:
+                return state.version
+            self._state = state.replace(state.version + 1, **changed)
+            self._history.append((self._state.version, changed))
+            self._cond.notify_all()
+            return self._state.version
+
+    def snapshot(self):
+        """Current state as a dict and its version, read without locking."""
+        state = self._state
+        return state.to_dict(), state.version
+
+    def changes_since(self, version, timeout=None):
+        """Wait for a newer version; return (changed_fields, new_version).
+
+        Returns ({}, version) on timeout. If the history no longer reaches
+        back to version, the whole snapshot is returned.
+        """
+        with self._cond:
+            if self.version <= version:
+                self._cond.wait_for(lambda: self.version > version, timeout)
+            if self.version <= version:
+                return {}, version
+            if not self._history or self._history[0][0] > version + 1:
+                return self._state.to_dict(), self.version
+            changed = {}
+            for v, fields in self._history:
+                if v > version:
+                    changed.update(fields)
+            return changed, self.version
+
+    def stream(self, keepalive=15.0):
+        """Server-Sent Events generator: full snapshot first, then deltas."""
+        state, version = self.snapshot()
+        yield f"id: {version}\nevent: snapshot\ndata: {json.dumps(state)}\n\n"
+        while True:
+            changed, new_version = self.changes_since(version, timeout=keepalive)
+            if not changed:
+                yield ": keepalive\n\n"
+                continue
+            version = new_version
+            yield f"id: {version}\ndata: {json.dumps(changed)}\n\n"
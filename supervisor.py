@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# In file: supervisor.py
+"""
+Multi-station supervisor: one service driving several key-loader tables.
+
+app.py drives exactly one table. The supervisor reads station definitions
+(stations.json, see stations.py) and starts one worker process per
+station. Each worker runs an unchanged app.py for its station on a local
+port: its own HardwareController, motion thread, config, journal and Pico
+link. The stations' pulse loops therefore never share an interpreter, a
+GIL or a crash.
+
+Workers are started with the "spawn" method, so a worker does not inherit
+the supervisor's threads or sockets. A worker that dies is restarted with
+a backoff. On SIGTERM or Ctrl-C each worker gets SIGTERM, and app.py
+switches its drivers off and releases its GPIO.
+
+HTTP (port 5000 by default):
+    /api/<station>/<path>        proxied to that station's /api/<path>
+                                 (status stream included)
+    GET  /api/stations           every station's process and status, with totals
+    POST /api/stations/<name>/restart[?force=1]
+
+Usage:
+    python supervisor.py [stations.json] [--port 5000] [--base-port 5100]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, Response, jsonify, request
+
+from stations import STATION_ENV, StationError, load_stations
+
+LOCALHOST = "127.0.0.1"
+RESTART_BACKOFF = (1, 2, 5, 10, 30)  # seconds before the 1st, 2nd, ... restart in a row
+STABLE_SECONDS = 60                  # a worker up this long resets the backoff
+STATUS_TIMEOUT = 1.0
+PROXY_TIMEOUT = 10.0
+# Hop-by-hop and recomputed headers are not copied from a station's response
+SKIP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "server", "date"}
+
+
+def run_station(definition, host, port):
+    """Worker process: serve one station's app.py."""
+    os.environ[STATION_ENV] = json.dumps(definition)
+    signal.signal(signal.SIGTERM, _exit_on_signal)  # so app.serve() runs its cleanup
+    import app
+    app.serve(host, port)
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(0)
+
+
+class StationWorker:
+    """One station's worker process."""
+
+    def __init__(self, station, host=LOCALHOST):
+        self.station = station
+        self.host = host                # interface the worker listens on
+        self.process = None
+        self.started_at = None
+        self.restarts = 0
+        self.failures = 0               # restarts in a row without a stable run
+        self.last_exit = None
+        self.restart_at = None          # when the monitor restarts a dead worker
+
+    @property
+    def url(self):
+        return f"http://{LOCALHOST}:{self.station.port}"
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(target=run_station, name=f"station-{self.station.name}",
+                                       args=(self.station.to_dict(), self.host, self.station.port))
+        self.process.start()
+        self.started_at = time.time()
+        self.restart_at = None
+        print(f"🏭 Station {self.station.name}: pid {self.process.pid}, port {self.station.port}")
+
+    def stop(self, timeout=10):
+        """SIGTERM (drivers off, GPIO released), then SIGKILL if it hangs."""
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                print(f"⚠️ Station {self.station.name} did not stop; killing it")
+                self.process.kill()
+                self.process.join()
+        self.last_exit = self.process.exitcode
+
+    def check(self, now):
+        """Restart a dead worker once its backoff has passed (monitor thread)."""
+        if self.alive():
+            if self.failures and now - self.started_at > STABLE_SECONDS:
+                self.failures = 0
+            return
+        if self.restart_at is None:
+            self.last_exit = self.process.exitcode
+            delay = RESTART_BACKOFF[min(self.failures, len(RESTART_BACKOFF) - 1)]
+            self.restart_at = now + delay
+            print(f"❌ Station {self.station.name} exited ({self.last_exit}); restarting in {delay}s")
+        elif now >= self.restart_at:
+            self.failures += 1
+            self.restarts += 1
+            self.start()
+
+    def info(self):
+        return {
+            "name": self.station.name,
+            "port": self.station.port,
+            "pid": self.process.pid if self.process else None,
+            "alive": self.alive(),
+            "uptime_s": round(time.time() - self.started_at, 1) if self.alive() else None,
+            "restarts": self.restarts,
+            "last_exit": self.last_exit,
+            "pulses_per_rev": self.station.pulses_per_rev,
+            "config": self.station.config,
+            "journal": self.station.journal,
+        }
+
+
+class Supervisor:
+    """Starts, watches and stops the station workers."""
+
+    def __init__(self, stations, worker_host=LOCALHOST, base_port=5100):
+        used = {s.port for s in stations if s.port is not None}
+        port = base_port
+        for station in stations:
+            if station.port is None:
+                while port in used:
+                    port += 1
+                station.port = port
+                used.add(port)
+        self.workers = {s.name: StationWorker(s, worker_host) for s in stations}
+        self._pool = ThreadPoolExecutor(max_workers=max(4, len(stations)), thread_name_prefix="station-status")
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()  # monitor restarts vs. API restarts
+        self._monitor = threading.Thread(target=self._watch, name="station-monitor", daemon=True)
+
+    def start(self):
+        for worker in self.workers.values():
+            worker.start()
+        self._monitor.start()
+
+    def _watch(self):
+        while not self._stopping.wait(1.0):
+            with self._lock:
+                now = time.time()
+                for worker in self.workers.values():
+                    worker.check(now)
+
+    def stop(self):
+        self._stopping.set()
+        for worker in self.workers.values():
+            if worker.alive():
+                worker.process.terminate()  # all at once; each disables its own drivers
+        for worker in self.workers.values():
+            worker.stop()
+        self._pool.shutdown(wait=False)
+
+    def restart(self, name):
+        worker = self.workers[name]
+        with self._lock:
+            worker.stop()
+            worker.failures = 0
+            worker.restarts += 1
+            worker.start()
+
+    def _station_status(self, worker):
+        info = worker.info()
+        info["status"] = None
+        if not info["alive"]:
+            return info
+        try:
+            with urllib.request.urlopen(f"{worker.url}/api/status", timeout=STATUS_TIMEOUT) as response:
+                info["status"] = json.load(response)
+        except (OSError, ValueError) as e:
+            info["error"] = f"no status: {e}"
+        return info
+
+    def status(self):
+        """Every station's process info and /api/status (fetched in parallel), with totals."""
+        stations = list(self._pool.map(self._station_status, self.workers.values()))
+        states = [s["status"] for s in stations if s["status"]]
+        return {
+            "stations": stations,
+            "summary": {
+                "stations": len(stations),
+                "alive": sum(s["alive"] for s in stations),
+                "responding": len(states),
+                "homed": sum(bool(s.get("is_homed")) for s in states),
+                "running": sum(bool(s.get("is_running")) for s in states),
+                "jobs": {s["name"]: s["status"].get("job_status") for s in stations if s["status"]},
+            },
+        }
+
+
+app = Flask(__name__)
+supervisor = None  # set by main()
+
+
+@app.route('/api/stations')
+def api_stations():
+    return jsonify(supervisor.status())
+
+
+@app.route('/api/stations/<name>/restart', methods=['POST'])
+def api_restart_station(name):
+    if name not in supervisor.workers:
+        return jsonify({"success": False, "message": f"Unknown station: {name}"}), 404
+    info = supervisor._station_status(supervisor.workers[name])
+    if (info["status"] or {}).get("is_running") and request.args.get("force") != "1":
+        return jsonify({"success": False, "message": f"Station {name} is running a job (use ?force=1)"}), 409
+    supervisor.restart(name)
+    return jsonify({"success": True, **supervisor.workers[name].info()})
+
+
+@app.route('/api/<name>/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE'])
+def api_proxy(name, path):
+    worker = supervisor.workers.get(name)
+    if worker is None:
+        return jsonify({"error": f"Unknown station: {name}"}), 404
+    if not worker.alive():
+        return jsonify({"error": f"Station {name} is not running (restart pending)"}), 503
+
+    url = f"{worker.url}/api/{path}"
+    if request.query_string:
+        url += "?" + request.query_string.decode()
+    headers = {k: v for k, v in request.headers.items() if k.lower() in ("content-type", "accept", "last-event-id")}
+    upstream = urllib.request.Request(url, data=request.get_data() or None, headers=headers, method=request.method)
+    streaming = "text/event-stream" in request.headers.get("Accept", "") or path == "status/stream"
+    try:
+        response = urllib.request.urlopen(upstream, timeout=None if streaming else PROXY_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        response = e  # the station's own 4xx/5xx answer, passed through
+    except OSError as e:
+        return jsonify({"error": f"Station {name} unreachable: {getattr(e, 'reason', e)}"}), 503
+
+    copied = [(k, v) for k, v in response.headers.items() if k.lower() not in SKIP_HEADERS]
+    if response.headers.get_content_type() == "text/event-stream":
+        def relay():
+            with response:
+                for line in response:  # SSE is line based; relay each line as it arrives
+                    yield line
+        return Response(relay(), status=response.getcode(), headers=copied)
+    with response:
+        body = response.read()
+    return Response(body, status=response.getcode(), headers=copied)
+
+
+def main():
+    global supervisor
+    parser = argparse.ArgumentParser(description="Run several key-loader stations from one controller")
+    parser.add_argument("stations", nargs="?", default="stations.json", help="station definitions")
+    parser.add_argument("--host", default="0.0.0.0", help="supervisor listen address")
+    parser.add_argument("--port", type=int, default=5000, help="supervisor HTTP port")
+    parser.add_argument("--base-port", type=int, default=5100, help="first port for stations without one")
+    parser.add_argument("--worker-host", default=LOCALHOST,
+                        help="station listen address (0.0.0.0 to open each station's page directly)")
+    args = parser.parse_args()
+
+    try:
+        stations = load_stations(args.stations)
+    except StationError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+
+    supervisor = Supervisor(stations, args.worker_host, args.base_port)
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    supervisor.start()
+    try:
+        app.run(host=args.host, port=args.port, threaded=True)
+    finally:
+        print("Stopping stations...")
+        supervisor.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+# In file: telemetry.py
+"""
+Low-overhead motion telemetry.
+
+Every pulse train sent by the HardwareController is recorded as a move
+(commanded vs actual duration, achieved pulse rate); the sleep pulse
+engine also samples the actual interval between pulses against the
+commanded one. The cycle records how long each phase took (move, settle,
+slider_in, slider_out, pause). Driver enables count how much fixed
+settle time was waited and how much was skipped because the driver was
+already on (see driver_enable.py).
+
+Samples go into fixed-size ring buffers, so memory stays constant however
+long the machine runs; lifetime counts and sums are kept alongside.
+/api/metrics serves them in Prometheus text format or as a JSON summary.
+"""
+
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+
+class RingBuffer:
+    """Fixed-size buffer of floats; old samples are overwritten."""
+
+    def __init__(self, size):
+        self._data = array('d', [0.0]) * size
+        self._index = 0
+        self._filled = 0
+
+    def append(self, value):
+        self._data[self._index] = value
+        self._index = (self._index + 1) % len(self._data)
+        if self._filled < len(self._data):
+            self._filled += 1
+
+    def values(self):
+        """Samples currently held, oldest first."""
+        if self._filled < len(self._data):
+            return self._data[:self._filled].tolist()
+        return (self._data[self._index:] + self._data[:self._index]).tolist()
+
+    def __len__(self):
+        return self._filled
+
+
+class Summary:
+    """Lifetime count/sum plus a ring of recent samples for quantiles."""
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, size=1024):
+        self.recent = RingBuffer(size)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.recent.append(value)
+            self.count += 1
+            self.sum += value
+
+    def quantiles(self, ordered=None):
+        if ordered is None:
+            with self._lock:
+                ordered = sorted(self.recent.values())
+        if not ordered:
+            return {}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in self.QUANTILES}
+
+    def to_dict(self, scale=1.0, digits=3):
+        with self._lock:
+            ordered = sorted(self.recent.values())
+            count, total = self.count, self.sum
+        return {
+            "count": count,
+            "mean": round(total / count * scale, digits) if count else None,
+            **{f"p{int(q * 100)}": round(v * scale, digits) for q, v in self.quantiles(ordered).items()},
+            "max": round(ordered[-1] * scale, digits) if ordered else None,
+        }
+
+
+class Telemetry:
+    """Move, pulse interval and cycle phase metrics."""
+
+    def __init__(self, move_samples=1024, interval_samples=8192, phase_samples=1024):
+        self._move_samples = move_samples
+        self._phase_samples = phase_samples
+        self.moves = {}      # axis -> {"overshoot": Summary, "rate_ratio": Summary}
+        self.pulses = {}     # axis -> lifetime pulses sent
+        self.cut_short = {}  # axis -> trains ended early by their stop condition
+        self.interval_error = Summary(interval_samples)  # actual - commanded pulse period (s)
+        self.phases = {}     # phase -> Summary of durations (s)
+        self.drivers = {}    # axis -> enable counters (see record_driver_enable)
+        self._lock = threading.Lock()
+
+    def _move_summaries(self, axis):
+        summaries = self.moves.get(axis)
+        if summaries is None:
+            with self._lock:
+                summaries = self.moves.setdefault(axis, {
+                    "overshoot": Summary(self._move_samples),
+                    "rate_ratio": Summary(self._move_samples),
+                })
+                self.pulses.setdefault(axis, 0)
+                self.cut_short.setdefault(axis, 0)
+        return summaries
+
+    # --- Recording (motion thread) ---
+    def record_move(self, axis, pulses, commanded_s, actual_s, cut_short=False):
+        """One pulse train: pulses sent, planned and measured duration.
+
+        commanded_s may be None when the planned duration of a partial train
+        is unknown; only the counters are updated then.
+        """
+        summaries = self._move_summaries(axis)
+        self.pulses[axis] += pulses
+        if cut_short:
+            self.cut_short[axis] += 1
+        if pulses == 0 or actual_s <= 0 or commanded_s is None:
+            return
+        summaries["overshoot"].observe(actual_s - commanded_s)
+        summaries["rate_ratio"].observe(commanded_s / actual_s)  # achieved / commanded rate
+
+    def record_interval(self, commanded_s, actual_s):
+        self.interval_error.observe(actual_s - commanded_s)
+
+    def record_phase(self, phase, seconds):
+        summary = self.phases.get(phase)
+        if summary is None:
+            with self._lock:
+                summary = self.phases.setdefault(phase, Summary(self._phase_samples))
+        summary.observe(seconds)
+
+    def _driver(self, axis):
+        counters = self.drivers.get(axis)
+        if counters is None:
+            with self._lock:
+                counters = self.drivers.setdefault(axis, {
+                    "enable_calls": 0, "switched_on": 0, "idle_disables": 0,
+                    "settle_waited_s": 0.0, "settle_saved_s": 0.0,
+                })
+        return counters
+
+    def record_driver_enable(self, axis, switched_on, waited_s, saved_s):
+        """One ensure-enabled call: settle time waited, and saved once per enable (see DriverEnable.settle_saving)."""
+        counters = self._driver(axis)
+        counters["enable_calls"] += 1
+        counters["switched_on"] += int(switched_on)
+        counters["settle_waited_s"] += waited_s
+        counters["settle_saved_s"] += saved_s
+
+    def record_driver_idle_off(self, axis):
+        self._driver(axis)["idle_disables"] += 1
+
+    @contextmanager
+    def phase(self, name):
+        """Time the body of a with-block as one sample of a cycle phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - started)
+
+    # --- Export ---
+    def summary(self):
+        """JSON summary; times in milliseconds."""
+        return {
+            "moves": {
+                axis: {
+                    "pulses": self.pulses[axis],
+                    "cut_short": self.cut_short[axis],
+                    "overshoot_ms": s["overshoot"].to_dict(scale=1000),
+                    "rate_ratio": s["rate_ratio"].to_dict(),
+                }
+                for axis, s in list(self.moves.items())
+            },
+            "pulse_interval_error_us": self.interval_error.to_dict(scale=1e6, digits=1),
+            "phases_ms": {name: s.to_dict(scale=1000) for name, s in list(self.phases.items())},
+            "drivers": {
+                axis: {k: round(v, 3) if isinstance(v, float) else v for k, v in counters.items()}
+                for axis, counters in list(self.drivers.items())
+            },
+        }
+
+    def prometheus(self, prefix="keyloader"):
+        """Prometheus text exposition format."""
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f"# HELP {prefix}_{name} {text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        def summary(name, s, labels=""):
+            sep = "," if labels else ""
+            for q, v in s.quantiles().items():
+                lines.append(f'{prefix}_{name}{{{labels}{sep}quantile="{q}"}} {v:.9g}')
+            braces = f"{{{labels}}}" if labels else ""
+            lines.append(f"{prefix}_{name}_sum{braces} {s.sum:.9g}")
+            lines.append(f"{prefix}_{name}_count{braces} {s.count}")
+
+        moves = list(self.moves.items())
+        header("pulses_total", "counter", "Step pulses sent, by axis.")
+        for axis, _ in moves:
+            lines.append(f'{prefix}_pulses_total{{axis="{axis}"}} {self.pulses[axis]}')
+        header("moves_cut_short_total", "counter", "Pulse trains stopped early by a sensor or alarm.")
+        for axis, _ in moves:
+            lines.append(f'{prefix}_moves_cut_short_total{{axis="{axis}"}} {self.cut_short[axis]}')
+        header("move_overshoot_seconds", "summary", "Actual minus commanded duration of a pulse train.")
+        for axis, s in moves:
+            summary("move_overshoot_seconds", s["overshoot"], f'axis="{axis}"')
+        header("move_rate_ratio", "summary", "Achieved / commanded pulse rate of a pulse train.")
+        for axis, s in moves:
+            summary("move_rate_ratio", s["rate_ratio"], f'axis="{axis}"')
+        header("pulse_interval_error_seconds", "summary", "Actual minus commanded step period (sleep engine).")
+        summary("pulse_interval_error_seconds", self.interval_error)
+        header("phase_seconds", "summary", "Duration of each cycle phase.")
+        for name, s in list(self.phases.items()):
+            summary("phase_seconds", s, f'phase="{name}"')
+        drivers = list(self.drivers.items())
+        for key, name, text in (
+            ("switched_on", "driver_switched_on_total", "Driver enable line switched on."),
+            ("idle_disables", "driver_idle_disables_total", "Drivers switched off by the idle timeout."),
+            ("settle_waited_s", "driver_settle_waited_seconds_total",
+             "Seconds waited for a driver to settle after enabling."),
+            ("settle_saved_s", "driver_settle_saved_seconds_total",
+             "Settle seconds skipped because the driver was already enabled."),
+        ):
+            header(name, "counter", text)
+            for axis, counters in drivers:
+                lines.append(f'{prefix}_{name}{{axis="{axis}"}} {counters[key]:.9g}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,45 @@
+# In file: tests/conftest.py
+"""Run the tests from any directory against the simulated machine."""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("KEY_LOADER_GPIO", "sim")
+os.environ.setdefault("KEY_LOADER_PICO", "loopback")
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    """app.py for a simulated station whose config and journal live in a temp folder."""
+    folder = tempfile.mkdtemp()
+    os.environ["KEY_LOADER_STATION"] = json.dumps({
+        "name": "test", "config": os.path.join(folder, "config.json"),
+        "journal": os.path.join(folder, "runs.journal"), "gpio": "sim", "pico": "loopback"})
+    import app
+    return app
+
+
+@pytest.fixture
+def make_controller():
+    """Build HardwareControllers on a SimulatedMachine(**machine_args) with a virtual-clock engine."""
+    from gpio_backend import SimulatedGPIO, SimulatedMachine
+    from hardware_controller import HardwareController
+    from pulse_engine import SimulatedPulseEngine
+
+    def make(**machine_args):
+        gpio = SimulatedGPIO(SimulatedMachine(**machine_args))
+        return HardwareController(pulse_engine=SimulatedPulseEngine(gpio=gpio), gpio=gpio)
+    return make
+
+
+def wait_done(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.done:
+        assert time.time() < deadline, f"job {job.kind} still {job.status}"
+        time.sleep(0.01)
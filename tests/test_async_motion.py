@@ -0,0 +1,125 @@
+# In file: tests/test_async_motion.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from gpio_backend import SimulatedGPIO, SimulatedMachine
+from hardware_controller import HardwareController
+from pulse_engine import SleepPulseEngine
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def later(seconds, action):
+    timer = threading.Timer(seconds, action)
+    timer.start()
+    return timer
+
+
+def place_key(hw, angle=90.0):
+    """Put a key under the inductive sensor from another thread, like a GPIO callback."""
+    hw.gpio.machine.set_keys([angle])
+    hw.gpio.refresh()
+
+
+@pytest.fixture
+def sleep_controller():
+    """A controller whose moves take real time, so they can be cancelled part-way."""
+    gpio = SimulatedGPIO(SimulatedMachine(start_angle=90.0))
+    hw = HardwareController(pulse_engine=SleepPulseEngine(gpio), gpio=gpio)
+    yield hw
+    hw.aio.close()
+
+
+def test_move_completes(make_controller):
+    hw = make_controller()
+    assert run(hw.move_degrees_async(36, speed=100)) is True
+    assert hw.position_steps == 320 and hw.gpio.machine.rotary_steps == 320
+
+
+def test_cancelling_stops_the_train_and_counts_the_pulses_sent(sleep_controller):
+    hw = sleep_controller
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(hw.move_degrees_async(360, speed=50), 0.2)
+        return hw.position_steps
+
+    sent = run(main())
+    assert 0 < sent < hw.PULSES_PER_REV
+    assert hw.gpio.machine.rotary_steps == sent
+    time.sleep(0.05)
+    assert hw.position_steps == sent  # the train really stopped
+
+
+def test_worker_is_free_after_a_cancel(sleep_controller):
+    hw = sleep_controller
+
+    async def main():
+        move = asyncio.create_task(hw.move_degrees_async(360, speed=50))
+        await asyncio.sleep(0.1)
+        move.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await move
+        before = hw.position_steps
+        assert await asyncio.wait_for(hw.move_degrees_async(1.8, speed=100, accel_steps=0, decel_steps=0), 2)
+        return hw.position_steps - before
+
+    assert run(main()) == 16
+
+
+def test_slider_stroke_rejects_a_bad_direction(make_controller):
+    with pytest.raises(ValueError):
+        run(make_controller().aio.slider_stroke("up", 0.0005))
+
+
+def test_wait_for_returns_at_once_when_already_in_state(make_controller):
+    hw = make_controller(start_angle=90.0, key_angles=(90.0,))
+    assert run(hw.wait_for("inductive", "active", timeout=0)) is True
+    assert run(hw.wait_for("hall", "inactive", timeout=0)) is True
+
+
+def test_wait_for_is_resolved_from_the_edge_callback(make_controller):
+    hw = make_controller(start_angle=90.0)
+    later(0.05, lambda: place_key(hw))
+    assert run(hw.wait_for("inductive", "active", timeout=2)) is True
+    assert hw.aio.pending() == 0
+
+
+def test_wait_for_change_and_timeout(make_controller):
+    hw = make_controller(start_angle=90.0)
+    assert run(hw.wait_for("inductive", "change", timeout=0.05)) is False
+    assert hw.aio.pending() == 0
+    later(0.05, lambda: place_key(hw))
+    assert run(hw.wait_for("inductive", "change", timeout=2)) is True
+
+
+def test_many_waits_share_one_loop(make_controller):
+    hw = make_controller(start_angle=90.0)
+
+    async def main():
+        waits = [asyncio.create_task(hw.wait_for("inductive", "active", timeout=2)) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        assert hw.aio.pending() == 20
+        later(0.02, lambda: place_key(hw))
+        return await asyncio.gather(*waits)
+
+    assert run(main()) == [True] * 20
+
+
+def test_wait_for_polls_inputs_without_interrupts(make_controller):
+    hw = make_controller(start_angle=90.0)
+    channel = hw.sensors.channels["inductive"]
+    channel.interrupts = False
+    hw.gpio.remove_event_detect(channel.pin)  # no callback: only a re-read sees the key
+    later(0.05, lambda: place_key(hw))
+    assert run(hw.wait_for("inductive", "active", timeout=2)) is True
+
+
+def test_wait_for_rejects_an_unknown_edge(make_controller):
+    with pytest.raises(ValueError):
+        run(make_controller().wait_for("hall", "rising"))
@@ -0,0 +1,14 @@
+# In file: tests/test_calibrate_api.py
+import pytest
+
+
+@pytest.mark.parametrize("value, applied", [
+    (False, False), ("false", False), ("0", False), ("no", False),
+    (True, True), ("true", True), ("1", True), (None, True),
+])
+def test_apply_is_parsed_like_a_bool_setting(app_module, monkeypatch, value, applied):
+    submitted = []
+    monkeypatch.setattr(app_module, "submit_motion_job", lambda *args, **kwargs: submitted.append(args))
+    body = {"axes": ["slider"]} if value is None else {"axes": ["slider"], "apply": value}
+    app_module.app.test_client().post("/api/calibrate", json=body)
+    assert submitted[0][-1] is applied
@@ -0,0 +1,98 @@
+# In file: tests/test_config_store.py
+import json
+import time
+
+import pytest
+
+from config_store import ConfigError, ConfigStore, Field
+
+
+@pytest.fixture
+def store(tmp_path):
+    config = ConfigStore(str(tmp_path / "config.json"), debounce=0.05)
+    yield config
+    config.close()
+
+
+def test_coerce_converts_and_clamps():
+    assert Field("speed", int, 50, 0, 100).coerce("120") == 100
+    assert Field("speed", int, 50, 0, 100).coerce(12.7) == 12
+    assert Field("pause", float, 1.0, 0.0).coerce("-3") == 0.0
+    for text, value in (("true", True), ("On", True), ("false", False), ("0", False), (1, True)):
+        assert Field("flag", bool, False).coerce(text) is value
+
+
+@pytest.mark.parametrize("value", ["nan", float("nan"), float("inf"), "-inf", 10 ** 400, "fast", None])
+def test_coerce_rejects_non_finite_and_junk(value):
+    with pytest.raises(ConfigError):
+        Field("pause_seconds", float, 1.0, 0.0, 3600.0).coerce(value)
+    with pytest.raises(ConfigError):
+        Field("rotary_speed", int, 50, 0, 100).coerce(value)
+
+
+def test_time_settings_have_a_maximum(store):
+    store.update({"pause_seconds": 1e308, "settle_seconds": 1e308, "driver_idle_timeout": 1e308})
+    assert store["pause_seconds"] == 3600.0 and store["settle_seconds"] == 60.0
+    assert store["driver_idle_timeout"] == 86400.0
+
+
+def test_invalid_value_rejects_the_whole_batch(store):
+    version = store.version
+    with pytest.raises(ConfigError, match="rotary_speed"):
+        store.update({"pause_seconds": 2.0, "rotary_speed": "fast"})
+    assert store["pause_seconds"] == 1.0 and store.version == version
+
+
+def test_update_reports_only_real_changes_and_ignores_unknown_keys(store):
+    assert store.update({"pause_seconds": 2.0, "rotary_speed": 50, "colour": "red"}) == {"pause_seconds"}
+    assert store.update({"pause_seconds": 2.0}) == set()
+    assert "colour" not in store
+
+
+def test_listeners_get_their_keys_only_and_failures_are_contained(store):
+    calls = []
+    store.subscribe(lambda config, changed: calls.append(("speed", changed)), ["rotary_speed"])
+    store.subscribe(lambda config, changed: 1 / 0)
+    store.subscribe(lambda config, changed: calls.append(("any", changed)))
+    store.update({"pause_seconds": 2.0})
+    store.update({"rotary_speed": 70})
+    assert calls == [("any", {"pause_seconds"}), ("speed", {"rotary_speed"}), ("any", {"rotary_speed"})]
+
+
+def test_burst_of_updates_is_written_once(store):
+    for speed in range(10, 20):
+        store.update({"rotary_speed": speed})
+    deadline = time.time() + 2
+    while store.writes == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert store.writes == 1
+    with open(store.path) as f:
+        assert json.load(f)["rotary_speed"] == 19
+
+
+def test_load_keeps_valid_values_and_defaults_the_rest(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"rotary_speed": 80, "pause_seconds": "NaN", "step_degrees": 999, "old_key": 1}))
+    store = ConfigStore(str(path)).load()
+    try:
+        assert store["rotary_speed"] == 80 and store["pause_seconds"] == 1.0 and store["step_degrees"] == 360.0
+    finally:
+        store.close()
+    saved = json.loads(path.read_text())  # rewritten with the repaired values
+    assert saved["pause_seconds"] == 1.0 and "old_key" not in saved
+
+
+def test_corrupt_file_falls_back_to_defaults(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("{not json")
+    store = ConfigStore(str(path)).load()
+    store.close()
+    assert json.loads(path.read_text())["rotary_speed"] == 50
+    assert not (tmp_path / "config.json.tmp").exists()
+
+
+def test_api_rejects_nan(app_module):
+    response = app_module.app.test_client().post(
+        "/api/config", data='{"pause_seconds": NaN}', content_type="application/json")
+    assert response.status_code == 400 and "finite" in response.json["message"]
@@ -0,0 +1,94 @@
+# In file: tests/test_cycle_scheduler.py
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import wait_done
+from cycle_scheduler import CycleScheduler
+from pulse_engine import SimulatedPulseEngine
+
+
+@pytest.fixture
+def station(app_module, monkeypatch):
+    """The app with a virtual-clock pulse engine and keys at 36, 72 and 108°, homed."""
+    hw = app_module.hw
+    monkeypatch.setattr(hw, "pulse_engine", SimulatedPulseEngine(gpio=hw.gpio))
+    hw.gpio.machine.set_keys([36.0, 72.0, 108.0])
+    hw.gpio.refresh()
+    client = app_module.app.test_client()
+    wait_done(app_module.runner.get(client.post("/api/home").json["job_id"]))
+    client.post("/api/config", json={"pause_seconds": 0.1, "settle_seconds": 0.0,
+                                     "sensor_stable_seconds": 0.0, "scan_mode": False})
+    return app_module, client
+
+
+def test_enable_saving_is_zero_while_the_driver_stays_on(station):
+    app_module, client = station
+    job = app_module.runner.get(client.post("/api/start", json={"cycles": 3}).json["job_id"])
+    wait_done(job, timeout=30)
+    assert job.result["success"], job.result
+    assert app_module.hw.rotary_driver.remaining() == 0
+    assert job.result["timing"]["saved_s"]["enable"] == 0
+
+
+class SettleJob:
+    def __init__(self):
+        self.slept = []
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+def settle_scheduler(quiet, key):
+    now = time.perf_counter()
+    channels = {name: SimpleNamespace(changed_at=now - quiet) for name in ("hall", "inductive")}
+    hw = SimpleNamespace(sensors=SimpleNamespace(channels=channels), read_inductive_sensor=lambda: key,
+                         telemetry=None, position_steps=0, PULSES_PER_REV=3200)
+    config = {"settle_seconds": 0.2, "sensor_stable_seconds": 0.05}
+    return CycleScheduler(hw, config, status={}, trigger=None)
+
+
+@pytest.mark.parametrize("quiet, key, wait", [
+    (0.1, False, 0.0),    # empty and stable: skipped
+    (0.01, False, 0.19),  # empty but a sensor just changed
+    (0.1, True, 0.1),     # key: settle counted from the last change
+    (0.5, True, 0.0),
+])
+def test_settle_counts_from_the_last_sensor_change(quiet, key, wait):
+    scheduler, job = settle_scheduler(quiet, key), SettleJob()
+    assert scheduler._settle(job, pipelined=True) == pytest.approx(wait, abs=0.005)
+    assert scheduler.saved["settle"] == pytest.approx(0.2 - wait, abs=0.005)
+
+
+def test_settle_is_fixed_without_pipelining():
+    scheduler, job = settle_scheduler(1.0, False), SettleJob()
+    assert scheduler._settle(job, pipelined=False) == 0.2 and job.slept == [0.2]
+
+
+def run_cycles(app_module, client, cycles):
+    job = app_module.runner.get(client.post("/api/start", json={"cycles": cycles}).json["job_id"])
+    wait_done(job, timeout=30)
+    return job.result
+
+
+def test_stall_is_recovered_and_the_run_goes_on(station):
+    app_module, client = station
+    app_module.hw.gpio.machine.inject_stall(after_steps=100)
+    result = run_cycles(app_module, client, 3)
+    assert result["success"], result
+    assert len(result["stall_recoveries"]) == 1 and result["stall_recoveries"][0]["cycle"] == 1
+
+
+def test_failure_without_a_stall_is_not_recovered(station, monkeypatch):
+    app_module, client = station
+    hw = app_module.hw
+    hw.last_stall = {"target_steps": 0}  # stale record of an earlier run
+
+    def broken(*args, **kwargs):
+        raise OSError("GPIO write failed")
+    monkeypatch.setattr(hw.pulse_engine, "send", broken)
+    result = run_cycles(app_module, client, 3)
+    assert not result["success"] and result["failed_at"] == 1
+    assert result["stall_recoveries"] == []
+    assert app_module.app_state["system_message"] == "ERROR: Rotary move failed!"
@@ -0,0 +1,82 @@
+# In file: tests/test_driver_enable.py
+import pytest
+
+import driver_enable
+from driver_enable import DriverEnable, ensure_enabled
+from telemetry import Telemetry
+
+
+class FakeGPIO:
+    LOW, HIGH = 0, 1
+
+    def __init__(self):
+        self.levels = {}
+
+    def output(self, pin, level):
+        self.levels[pin] = level
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(driver_enable.time, "perf_counter", clock)
+    monkeypatch.setattr(driver_enable.time, "sleep", clock.sleep)
+    return clock
+
+
+def rotary_counters(telemetry):
+    return telemetry.drivers["rotary"]
+
+
+def test_switching_on_waits_the_full_settle_and_saves_nothing(clock):
+    telemetry = Telemetry()
+    driver = DriverEnable("rotary", FakeGPIO(), 5, settle=0.1, telemetry=telemetry)
+    assert ensure_enabled(driver) == pytest.approx(0.1)
+    counters = rotary_counters(telemetry)
+    assert counters["switched_on"] == 1 and counters["settle_saved_s"] == 0.0
+
+
+def test_settled_driver_is_not_credited_on_every_move(clock):
+    telemetry = Telemetry()
+    driver = DriverEnable("rotary", FakeGPIO(), 5, settle=0.1, telemetry=telemetry)
+    ensure_enabled(driver)
+    clock.now += 60.0
+    for _ in range(5):
+        assert ensure_enabled(driver) == 0.0
+    assert rotary_counters(telemetry)["settle_saved_s"] == 0.0
+
+
+def test_enable_long_before_credits_nothing(clock):
+    telemetry = Telemetry()
+    driver = DriverEnable("rotary", FakeGPIO(), 5, settle=0.1, telemetry=telemetry)
+    driver.set(True)
+    clock.now += 10.0
+    assert ensure_enabled(driver) == 0.0
+    assert rotary_counters(telemetry)["settle_saved_s"] == 0.0
+
+
+def test_recent_enable_is_credited_once_per_enable_event(clock):
+    telemetry = Telemetry()
+    driver = DriverEnable("rotary", FakeGPIO(), 5, settle=0.1, telemetry=telemetry)
+    driver.set(True)
+    clock.now += 0.04
+    ensure_enabled(driver)
+    ensure_enabled(driver)
+    assert rotary_counters(telemetry)["settle_saved_s"] == pytest.approx(0.06)
+
+    driver.set(False)
+    driver.set(True)
+    clock.now += 0.09
+    ensure_enabled(driver)
+    assert rotary_counters(telemetry)["settle_saved_s"] == pytest.approx(0.07)
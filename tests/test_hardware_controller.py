@@ -0,0 +1,24 @@
+# In file: tests/test_hardware_controller.py
+
+def test_short_seek_keeps_the_fast_edge(make_controller):
+    hw = make_controller(start_angle=200.0)
+    assert hw.home_table()
+    assert hw.last_homing["reapproach"] is False
+    assert hw.last_homing["seek_steps"] <= hw.HOMING_SHORT_SEEK_STEPS
+    assert hw.read_hall_sensor()
+
+
+def test_long_seek_re_approaches_without_measuring_the_width(make_controller):
+    hw = make_controller(start_angle=100.0)
+    assert hw.home_table()
+    assert hw.last_homing["reapproach"] is True
+    assert "hall_width_steps" not in hw.last_homing
+    assert hw.read_hall_sensor()
+
+
+def test_hall_width_is_measured_on_request(make_controller):
+    hw = make_controller(start_angle=100.0, hall_width_steps=30)
+    hw.HOMING_MEASURE_WIDTH = True
+    assert hw.home_table()
+    assert abs(hw.last_homing["hall_width_steps"] - 30) <= 1
+    assert hw.read_hall_sensor()
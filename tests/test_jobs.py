@@ -0,0 +1,83 @@
+# In file: tests/test_jobs.py
+import threading
+import time
+
+import pytest
+
+from conftest import wait_done
+from jobs import JobRunner
+from machine_state import MotionLock
+
+
+def test_on_done_runs_for_a_job_cancelled_while_queued():
+    runner = JobRunner()
+    gate = threading.Event()
+    ended = []
+    first = runner.submit("first", lambda job: gate.wait(5), on_done=ended.append)
+    queued = runner.submit("queued", lambda job: pytest.fail("cancelled job ran"), on_done=ended.append)
+    queued.cancel()
+    gate.set()
+    wait_done(first)
+    wait_done(queued)
+    assert queued.status == "cancelled"
+    assert ended == [first, queued]
+
+
+def test_on_done_runs_when_the_job_fails():
+    runner = JobRunner()
+    ended = []
+    job = runner.submit("boom", lambda job: 1 / 0, on_done=ended.append)
+    wait_done(job)
+    assert job.status == "failed" and ended == [job]
+
+
+def test_motion_lock_all_or_nothing():
+    changes = []
+    lock = MotionLock(on_change=changes.append)
+    slider = lock.acquire("slider_test", ("slider",))
+    assert lock.acquire("cycle") is None  # both axes, one taken
+    rotary = lock.acquire("rotary_move", ("rotary",))
+    assert lock.owners() == {"rotary": "rotary_move", "slider": "slider_test"}
+    lock.release(slider)
+    lock.release(slider)  # releasing twice is harmless
+    assert lock.owners() == {"rotary": "rotary_move", "slider": None}
+    lock.release(rotary)
+    assert not lock.busy and changes == [True, False]
+    lock.release(rotary)  # double release once idle: no second False
+    assert changes == [True, False]
+
+
+def test_motion_lock_publishes_transitions_in_order():
+    published = []
+    lock = MotionLock(on_change=lambda busy: (busy or time.sleep(0.001), published.append(busy)))  # slow False
+
+    def worker(axis):
+        for _ in range(200):
+            claim = lock.acquire(axis, (axis,))
+            if claim is not None:
+                lock.release(claim)
+
+    threads = [threading.Thread(target=worker, args=(axis,)) for axis in ("rotary", "slider")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert published and published[-1] is False
+    assert all(a != b for a, b in zip(published, published[1:]))  # strictly alternating
+
+
+def test_cancelled_queued_motion_job_releases_its_axes(app_module):
+    app = app_module
+    gate = threading.Event()
+    first = app.submit_motion_job("slider_test", lambda job: gate.wait(5), axes=("slider",))
+    queued = app.submit_motion_job("rotary_move", lambda job: None, axes=("rotary",))
+    assert app.motion.owners() == {"rotary": "rotary_move", "slider": "slider_test"}
+    queued.cancel()
+    gate.set()
+    wait_done(first)
+    wait_done(queued)
+    assert app.motion.owners() == {"rotary": None, "slider": None}
+    assert not app.app_state["is_running"]
+    claim = app.motion.acquire("rotary_move", ("rotary",))
+    assert claim is not None
+    app.motion.release(claim)
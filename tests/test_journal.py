@@ -0,0 +1,60 @@
+# In file: tests/test_journal.py
+import io
+import os
+
+from journal import HEADER, RECORD, RESULTS, JournalReader, RunJournal, export_csv, sensor_bits
+
+PHASES = {"move": 0.5, "settle": 0.125, "slider_in": 0.25, "slider_out": 0.25, "pause": 1.0}
+
+
+def write(path, runs):
+    journal = RunJournal(str(path), flush_interval=0.01)
+    numbers = []
+    for results in runs:
+        run = journal.new_run()
+        numbers.append(run)
+        for cycle, result in enumerate(results, 1):
+            journal.record(run, cycle, cycle * 36.0, sensor_bits({"hall": True, "inductive": result == "key"}),
+                           result, PHASES)
+    journal.close()
+    return numbers
+
+
+def test_records_round_trip(tmp_path):
+    path = tmp_path / "runs.journal"
+    write(path, [list(RESULTS)])
+    with JournalReader(str(path)) as reader:
+        assert len(reader) == len(RESULTS)
+        records = list(reader.records())
+        assert [r.result for r in records] == list(RESULTS)
+        first = records[1]
+        assert (first.run, first.cycle, first.angle) == (1, 2, 72.0)
+        assert first.sensors["hall"] and first.sensors["inductive"] and not first.sensors["alarm"]
+        assert (first.move, first.settle, first.pause) == (0.5, 0.125, 1.0)
+        summary = reader.aggregate()
+        assert summary["records"] == len(RESULTS) and summary["runs"] == 1
+        assert summary["results"]["key"] == 1 and summary["phases_s"]["pause"] == {"mean": 1.0, "max": 1.0}
+        assert reader.span(since=records[3].timestamp) == (3, len(RESULTS))
+        out = io.StringIO()
+        assert export_csv(reader, out) == len(RESULTS)
+        assert out.getvalue().splitlines()[0].startswith("time,timestamp,run,cycle,angle")
+
+
+def test_run_numbers_continue_across_restarts(tmp_path):
+    path = tmp_path / "runs.journal"
+    assert write(path, [["key"], ["empty", "key"]]) == [1, 2]
+    assert write(path, [["key"]]) == [3]  # a new process, job ids restart but runs do not
+    with JournalReader(str(path)) as reader:
+        assert [r.run for r in reader.records()] == [1, 2, 2, 3]
+        assert reader.aggregate()["runs"] == 3
+
+
+def test_torn_record_is_cut_off_on_open(tmp_path):
+    path = tmp_path / "runs.journal"
+    write(path, [["key", "empty"]])
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 17)  # crash in the middle of a batch
+    assert write(path, [["stall"]]) == [2]
+    assert os.path.getsize(path) == HEADER.size + 3 * RECORD.size
+    with JournalReader(str(path)) as reader:
+        assert [(r.run, r.result) for r in reader.records()] == [(1, "key"), (1, "empty"), (2, "stall")]
@@ -0,0 +1,123 @@
+# In file: tests/test_lazy.py
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from lazy import ComponentError, LazyComponent, warm_up
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Thing:
+    def __init__(self):
+        self.speed = 1
+        self.values = {"pause_seconds": 2.0}
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __contains__(self, key):
+        return key in self.values
+
+
+def test_built_on_first_use_and_forwards_access():
+    built = []
+    thing = LazyComponent("thing", lambda: built.append(1) or Thing())
+    assert not thing.built and built == [] and "not built" in repr(thing)
+    assert thing.speed == 1 and thing["pause_seconds"] == 2.0 and "pause_seconds" in thing
+    thing.speed = 5
+    assert thing.instance().speed == 5 and built == [1]
+    assert thing.readiness()["ready"] is True and thing.readiness()["seconds"] is not None
+
+
+def test_concurrent_first_use_builds_once():
+    built = []
+
+    def slow():
+        time.sleep(0.05)
+        built.append(1)
+        return Thing()
+
+    thing = LazyComponent("thing", slow)
+    threads = [threading.Thread(target=thing.instance) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert built == [1]
+
+
+def test_failed_build_is_recorded_and_retried():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("driver unplugged")
+        return Thing()
+
+    thing = LazyComponent("hardware", flaky)
+    with pytest.raises(ComponentError, match="hardware unavailable: OSError: driver unplugged"):
+        thing.speed
+    assert thing.readiness() == {"ready": False, "seconds": None, "built_at": None,
+                                 "error": "OSError: driver unplugged"}
+    assert thing.speed == 1 and thing.readiness()["error"] is None
+
+
+def test_warm_up_builds_in_order_and_survives_failures():
+    order = []
+
+    def failing():
+        order.append("pico")
+        raise RuntimeError("no port")
+
+    first = LazyComponent("config", lambda: order.append("config") or Thing())
+    broken = LazyComponent("pico", failing)
+    last = LazyComponent("journal", lambda: order.append("journal") or Thing())
+    warm_up([first, broken, last]).join(5)
+    assert order == ["config", "pico", "journal"]
+    assert first.built and last.built and not broken.built
+    assert broken.readiness()["error"] == "RuntimeError: no port"
+
+
+def test_importing_app_touches_no_hardware(tmp_path):
+    env = dict(os.environ, KEY_LOADER_GPIO="rpi", KEY_LOADER_STATION=json.dumps({
+        "name": "cold", "config": str(tmp_path / "config.json"), "journal": str(tmp_path / "runs.journal")}))
+    script = ("import sys, app; "
+              "print(sorted(n for n, c in app.COMPONENTS.items() if c.built), "
+              "'hardware_controller' in sys.modules, 'pico_link' in sys.modules)")
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[] False False"
+    assert not (tmp_path / "config.json").exists()
+
+
+def test_ready_reports_each_component(app_module):
+    client = app_module.app.test_client()
+    for component in app_module.COMPONENTS.values():
+        component.instance()
+    response = client.get("/api/ready")
+    assert response.status_code == 200
+    assert set(response.get_json()["components"]) == {"config", "hardware", "journal", "pico"}
+
+
+def test_unavailable_component_answers_503(app_module, monkeypatch):
+    def unplugged():
+        raise OSError("no such device")
+
+    state = app_module.pico._lazy
+    monkeypatch.setattr(state, "instance", None)
+    monkeypatch.setattr(state, "factory", unplugged)
+    monkeypatch.setattr(state, "error", None)
+    client = app_module.app.test_client()
+    response = client.get("/api/pico")
+    assert response.status_code == 503 and "pico unavailable" in response.get_json()["error"]
+    ready = client.get("/api/ready")
+    assert ready.status_code == 503
+    assert ready.get_json()["components"]["pico"]["error"] == "OSError: no such device"
@@ -0,0 +1,56 @@
+# In file: tests/test_motion_profile.py
+import pytest
+
+from motion_profile import plan_move, plan_stroke
+
+
+@pytest.mark.parametrize("s_curve", [False, True])
+@pytest.mark.parametrize("steps", [1, 7, 150, 320, 5000])
+def test_plan_move_has_one_delay_per_step(steps, s_curve):
+    assert len(plan_move(steps, 0.0005, 100, 100, s_curve).delays) == steps
+
+
+def test_plan_move_of_zero_steps_is_empty():
+    assert len(plan_move(0, 0.0005, 100, 100)) == 0
+
+
+@pytest.mark.parametrize("s_curve", [False, True])
+@pytest.mark.parametrize("steps", [320, 120, 9])  # cruising, short (triangular), tiny
+def test_equal_ramps_are_symmetric(steps, s_curve):
+    delays = list(plan_move(steps, 0.0005, 100, 100, s_curve).delays)
+    assert delays == pytest.approx(delays[::-1], rel=1e-6)
+
+
+@pytest.mark.parametrize("s_curve", [False, True])
+def test_ramps_start_at_twice_the_cruise_delay(s_curve):
+    profile = plan_move(1000, 0.0005, 100, 50, s_curve)
+    delays = profile.delays
+    assert max(delays) <= 0.001 and delays[0] > 0.0009 and delays[-1] > 0.0009
+    assert min(delays) == pytest.approx(0.0005)
+    ramping = [i for i, delay in enumerate(delays) if delay > 0.0005 * (1 + 1e-9)]
+    up = [i for i in ramping if i < 500]
+    down = [i for i in ramping if i >= 500]
+    if s_curve:  # the jerk of the steeper ramp is shared, so the gentler one may end early
+        assert len(up) <= 100 and len(down) <= 50
+    else:
+        assert (len(up), len(down)) == (100, 50)
+    assert profile.duration == pytest.approx(2 * sum(delays))
+
+
+def test_short_move_never_exceeds_cruise_speed():
+    delays = plan_move(40, 0.0005, 100, 100).delays
+    assert min(delays) > 0.0005
+
+
+def test_stroke_starts_and_ends_at_the_approach_speed():
+    delays = plan_stroke(800, 0.001, 0.0002, 100).delays
+    assert len(delays) == 800
+    assert delays[0] == pytest.approx(0.001, rel=0.1) and delays[-1] == pytest.approx(0.001, rel=0.1)
+    assert min(delays) == pytest.approx(0.0002)
+
+
+def test_move_degrees_carries_the_fractional_step(make_controller):
+    hw = make_controller(start_angle=0.0)
+    for _ in range(9):
+        assert hw.move_degrees(0.05, accel_steps=10, decel_steps=10)  # 0.444 steps each
+    assert hw.position_steps == 4 and hw.gpio.machine.rotary_position == 4
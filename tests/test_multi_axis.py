@@ -0,0 +1,59 @@
+# In file: tests/test_multi_axis.py
+from array import array
+
+import pytest
+
+from multi_axis import Axis, merge_axes
+
+
+def test_from_delays_places_pulses_one_period_apart():
+    axis = Axis.from_delays(5, [0.001, 0.002, 0.001], offset=0.5)
+    assert list(axis.starts) == pytest.approx([0.5, 0.502, 0.506])
+    assert axis.end == pytest.approx(0.508)
+
+
+@pytest.mark.parametrize("master, steps", [(100, 37), (100, 100), (7, 3), (50, 0), (10, 25)])
+def test_linked_spreads_steps_evenly_over_the_master(master, steps):
+    delays = array('d', [0.001]) * master
+    axis = Axis.linked(9, delays, steps)
+    assert len(axis) == min(steps, master)
+    master_starts = Axis.from_delays(8, delays).starts
+    indices = [list(master_starts).index(t) for t in axis.starts]
+    for count in range(1, master + 1):  # Bresenham: never more than one step off the ideal line
+        done = sum(1 for i in indices if i < count)
+        assert abs(done - count * len(axis) / master) < 1
+
+
+def test_linked_finishes_with_the_master():
+    delays = array('d', [0.001]) * 40
+    assert Axis.linked(9, delays, 13).end == pytest.approx(Axis.from_delays(8, delays).end)
+
+
+def test_merge_interleaves_edges_in_time_order():
+    rotary = Axis.from_delays(8, [0.001] * 4)
+    slider = Axis.from_delays(9, [0.0015] * 2)
+    stream = merge_axes([rotary, slider])
+    times = [t for t, _, _ in stream.segments]
+    assert times == sorted(times) and len(set(times)) == len(times)
+    assert stream.counts == {8: 4, 9: 2}
+    assert stream.duration == pytest.approx(0.008)
+    highs = {pin: sum(pin in high for _, high, _ in stream.segments) for pin in (8, 9)}
+    lows = {pin: sum(pin in low for _, _, low in stream.segments) for pin in (8, 9)}
+    assert highs == lows == {8: 4, 9: 2}
+    assert stream.segments[0] == (0.0, (8, 9), ())  # both start together
+
+
+def test_merge_quantizes_to_the_resolution():
+    a = Axis(8, array('d', [0.0]), array('d', [0.0010004]))
+    b = Axis(9, array('d', [0.0]), array('d', [0.0009996]))
+    stream = merge_axes([a, b], resolution=1e-6)
+    assert stream.segments[-1] == (pytest.approx(0.001), (), (9, 8))
+
+
+def test_move_coordinated_moves_both_axes(make_controller):
+    hw = make_controller(start_angle=0.0)
+    hw.gpio.machine.slider_position = 0
+    hw.slider_position = 0
+    assert hw.move_coordinated(36.0, 200, slider_out=True)
+    assert hw.gpio.machine.rotary_position == 320 and hw.position_steps == 320
+    assert hw.gpio.machine.slider_position == 200 and hw.slider_position == 200
@@ -0,0 +1,50 @@
+# In file: tests/test_pico_link.py
+import pico_link
+from pico_link import (FLAG_RESEND, FRAME_ACK, FRAME_COMMAND, FrameDecoder, LoopbackPico, PicoCommand,
+                       PicoLink, create_pico_link, encode_frame)
+
+
+def test_frames_round_trip_and_resync_after_garbage():
+    decoder = FrameDecoder()
+    data = b"\x00\xa5junk" + encode_frame(FRAME_COMMAND | FLAG_RESEND, 7, b"trigger") + encode_frame(FRAME_ACK, 8)
+    frames = decoder.feed(data[:9]) + decoder.feed(data[9:])
+    assert frames == [(FRAME_COMMAND | FLAG_RESEND, 7, b"trigger"), (FRAME_ACK, 8, b"")]
+
+
+def test_lost_ack_is_resent_but_runs_once():
+    loopback = LoopbackPico(drop_every=1)  # the ACK of every first send is lost
+    link = PicoLink(loopback.connect, ack_timeout=0.05, retries=2).start()
+    link.emulator = loopback
+    try:
+        assert link.send("trigger_function").wait(2)
+        assert loopback.emulator.received == ["trigger_function"]
+        assert loopback.emulator.duplicates == 1 and link.counters["resent"] == 1
+    finally:
+        link.close()
+
+
+def test_auto_without_a_device_stays_disconnected(monkeypatch, tmp_path):
+    monkeypatch.setattr(pico_link, "DEFAULT_DEVICE", str(tmp_path / "ttyACM0"))
+    link = create_pico_link("auto", reconnect_delay=0.05)
+    try:
+        assert link.emulator is None and link.name == str(tmp_path / "ttyACM0")
+        cmd = link.send("trigger_function")
+        assert not cmd.wait(2) and cmd.error == "Pico not connected"
+        assert not link.connected and link.counters["offline"] == 1
+    finally:
+        link.close()
+
+
+class BrokenTransport:
+    def write(self, data):
+        raise OSError("device gone")
+
+    def close(self):
+        pass
+
+
+def test_resend_failure_on_reconnect_does_not_raise():
+    link = PicoLink(BrokenTransport)
+    link._pending[1] = PicoCommand(1, "trigger_function")
+    assert link._reconnect() is False
+    assert link._transport is None and not link.connected
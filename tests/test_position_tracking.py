@@ -0,0 +1,36 @@
+# In file: tests/test_position_tracking.py
+import pytest
+
+
+@pytest.fixture
+def homed(make_controller):
+    hw = make_controller(start_angle=200.0)
+    assert hw.home_table()
+    return hw, hw.gpio.machine.rotary_position  # machine step of position 0
+
+
+def test_position_follows_every_pulse_in_both_directions(homed):
+    hw, zero = homed
+    for degrees in (36.0, 36.0, -72.0, 90.0, -450.0):
+        assert hw.move_degrees(degrees, accel_steps=20, decel_steps=20)
+    assert hw.position_steps == round((90.0 - 450.0) / 360.0 * 3200)
+    assert hw.position_degrees == pytest.approx(-360.0)
+    assert (hw.gpio.machine.rotary_position - zero) % 3200 == hw.position_steps % 3200
+
+
+@pytest.mark.parametrize("slip", [0, 7, -7])
+def test_align_to_hall_measures_and_corrects_drift(homed, slip):
+    hw, zero = homed
+    assert hw.move_degrees(36.0, accel_steps=20, decel_steps=20)
+    hw.gpio.machine.slip(slip)  # steps lost or gained without pulses
+    assert hw.align_to_hall(expected_steps=320)
+    assert hw.last_drift["drift_steps"] == -slip
+    assert hw.position_steps == 320
+    assert (hw.gpio.machine.rotary_position - zero) % 3200 == 320
+    assert hw.read_hall_sensor()
+
+
+def test_align_to_hall_fails_far_from_a_magnet(homed):
+    hw, _ = homed
+    assert hw.move_degrees(18.0, accel_steps=20, decel_steps=20)  # halfway between magnets
+    assert not hw.align_to_hall(expected_steps=320, window=40)
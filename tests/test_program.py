@@ -0,0 +1,105 @@
+# In file: tests/test_program.py
+import pytest
+
+from config_store import SCHEMA
+from hardware_controller import HardwareController
+from program import MAX_MOVE_DEGREES, MAX_PULSES, ProgramError, compile_program, run_program
+
+CONFIG = {field.name: field.default for field in SCHEMA}
+
+
+@pytest.fixture(scope="module")
+def hw():
+    controller = HardwareController("sim", gpio="sim")
+    yield controller
+    controller.cleanup()
+
+
+def compile_ops(hw, ops, **program):
+    return compile_program(dict(program, ops=ops), hw, CONFIG, lambda speed: 0.001)
+
+
+def test_compiles_and_follows_the_position(hw):
+    plan = compile_ops(hw, [{"op": "move", "degrees": 36}, {"op": "dwell", "seconds": 0.5},
+                            {"op": "move", "degrees": -36}], repeat=2)
+    moves = [step for step in plan.steps if step.op == "move"]
+    assert len(plan.steps) == 6 and len(moves) == 4
+    assert [len(step.args["delays"]) for step in moves] == [320] * 4
+    assert [step.args["forward"] for step in moves] == [True, False, True, False]
+    assert plan.dwell_s == 1.0 and not plan.absolute
+
+
+@pytest.mark.parametrize("ops, message", [
+    ([{"op": "jump"}], "'op' must be one of"),
+    ([{"op": "move"}], "exactly one of"),
+    ([{"op": "move", "degrees": 10, "to": 20}], "exactly one of"),
+    ([{"op": "move", "degrees": "ten"}], "must be a number"),
+    ([{"op": "move", "degrees": float("nan")}], "finite"),
+    ([{"op": "move", "degrees": float("inf")}], "finite"),
+    ([{"op": "move", "degrees": 10 ** 400}], "must be a number"),
+    ([{"op": "move", "degrees": MAX_MOVE_DEGREES + 1}], "at most"),
+    ([{"op": "move", "degrees": 36, "when": {"hall": True}}], "cannot have 'when'"),
+    ([{"op": "dwell", "seconds": -1}], "at least 0"),
+    ([{"op": "slider", "to": "up"}], "'in' or 'out'"),
+    ([{"op": "wait_for", "sensor": "door"}], "'sensor' must be one of"),
+    ([{"op": "trigger", "when": {"door": True}}], "'when' must map"),
+])
+def test_rejects_invalid_ops(hw, ops, message):
+    with pytest.raises(ProgramError, match=message):
+        compile_ops(hw, ops)
+
+
+@pytest.mark.parametrize("text, value", [("false", False), ("0", False), ("no", False),
+                                         ("true", True), ("1", True), (False, False)])
+def test_flags_are_parsed_like_bool_settings(hw, text, value):
+    plan = compile_ops(hw, [
+        {"op": "wait_for", "sensor": "hall", "state": text},
+        {"op": "trigger", "when": {"inductive": text}},
+        {"op": "move", "degrees": 36, "s_curve": text},
+    ])
+    wait, trigger, move = plan.steps
+    assert wait.args["state"] is value and trigger.when == {"inductive": value}
+    assert list(move.args["delays"]) == list(hw.plan_rotary(320, CONFIG['rotary_speed'], CONFIG['rotary_accel_steps'],
+                                                            CONFIG['rotary_decel_steps'], value).delays)
+
+
+def test_rejects_bad_repeat_and_total_pulses(hw):
+    with pytest.raises(ProgramError, match="between 1 and"):
+        compile_ops(hw, [{"op": "dwell", "seconds": 0}], repeat=0)
+    with pytest.raises(ProgramError, match="'repeat' must be an integer"):
+        compile_ops(hw, [], repeat="x")
+    revolutions = MAX_PULSES // hw.PULSES_PER_REV // 10 + 1  # moves of 10 revolutions each
+    with pytest.raises(ProgramError, match="rotary pulses"):
+        compile_ops(hw, [{"op": "move", "degrees": MAX_MOVE_DEGREES}], repeat=revolutions)
+
+
+@pytest.mark.parametrize("body", [
+    [{"op": "move", "degrees": float("nan")}],
+    [{"op": "move", "degrees": 1e308}],
+    {"ops": "nope"},
+])
+def test_rejected_program_releases_the_axes(app_module, body):
+    client = app_module.app.test_client()
+    response = client.post("/api/program", json=body)
+    assert response.status_code == 400
+    assert app_module.motion.owners() == {"rotary": None, "slider": None}
+
+
+def test_unavailable_hardware_releases_the_axes(app_module, monkeypatch):
+    def driver_off():
+        raise OSError("driver off")
+    state = app_module.hw._lazy  # not built yet, and its build fails
+    monkeypatch.setattr(state, "instance", None)
+    monkeypatch.setattr(state, "factory", driver_off)
+    response = app_module.app.test_client().post("/api/program", json=[{"op": "dwell", "seconds": 0}])
+    assert response.status_code == 503
+    assert app_module.motion.owners() == {"rotary": None, "slider": None}
+
+
+def test_run_carries_the_planned_remainder(make_controller):
+    hw = make_controller(start_angle=0.0)
+    plan = compile_ops(hw, [{"op": "move", "degrees": 0.05}], repeat=9)  # 0.444 steps each
+    job = type("Job", (), {"checkpoint": lambda self: None, "sleep": lambda self, s: None, "progress": None})()
+    result = run_program(job, plan, hw, {}, trigger=lambda command: None)
+    assert result["success"] and hw.position_steps == 4
+    assert hw.step_remainder == pytest.approx(9 * 0.05 / 360 * 3200 - 4)
@@ -0,0 +1,58 @@
+# In file: tests/test_pulse_engine.py
+import threading
+import types
+
+import pulse_engine
+from pulse_engine import PigpioWaveEngine
+
+NO_TX_WAVE = 9999
+
+
+class InstantPi:
+    """pigpio.pi stand-in whose waves finish before the first poll."""
+
+    def __init__(self):
+        self.ids = 0
+        self.waves = set()
+        self.sent = []
+
+    def wave_clear(self):
+        self.waves.clear()
+
+    def wave_add_generic(self, pulses):
+        pass
+
+    def wave_create(self):
+        self.ids += 1
+        self.waves.add(self.ids)
+        return self.ids
+
+    def wave_send_using_mode(self, wid, mode):
+        self.sent.append(wid)
+
+    def wave_tx_at(self):
+        return NO_TX_WAVE
+
+    def wave_tx_busy(self):
+        return 0
+
+    def wave_delete(self, wid):
+        self.waves.discard(wid)
+
+    def wave_tx_stop(self):
+        pass
+
+
+def test_transmit_hands_over_when_a_chunk_ends_between_polls(monkeypatch):
+    monkeypatch.setattr(pulse_engine, "pigpio", types.SimpleNamespace(WAVE_MODE_ONE_SHOT_SYNC=3))
+    engine = PigpioWaveEngine.__new__(PigpioWaveEngine)
+    engine.pi = InstantPi()
+    engine.poll_interval = 0.0002
+    result = []
+    worker = threading.Thread(target=lambda: result.append(engine._transmit(
+        iter([(0.0, ["a"]), (1.0, ["b"]), (2.0, ["c"])]), stop=None)), daemon=True)
+    worker.start()
+    worker.join(2)
+    assert not worker.is_alive(), "handover loop did not notice the finished chunks"
+    assert result == [None]
+    assert engine.pi.sent == [1, 2, 3] and not engine.pi.waves
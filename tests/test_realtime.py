@@ -0,0 +1,125 @@
+# In file: tests/test_realtime.py
+import gc
+import os
+import sys
+import threading
+
+import pytest
+
+import realtime
+from realtime import RealtimeMode, isolated_cpus, wait_until
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def clock(self):
+        self.now += 0.00001  # every read costs 10 us
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_wait_until_sleeps_then_spins():
+    fake = FakeClock()
+    wait_until(0.01, spin=0.002, clock=fake.clock, sleep=fake.sleep)
+    assert fake.slept == [pytest.approx(0.008, abs=1e-4)] and fake.now >= 0.01
+
+
+def test_wait_until_only_spins_when_close():
+    fake = FakeClock()
+    wait_until(0.001, spin=0.002, clock=fake.clock, sleep=fake.sleep)
+    assert fake.slept == [] and fake.now >= 0.001
+
+
+def test_isolated_cpus_parses_ranges(monkeypatch, tmp_path):
+    path = tmp_path / "isolated"
+    path.write_text("2-3,6\n")
+    real_open = open
+    monkeypatch.setattr(realtime, "open", lambda name, *a: real_open(path, *a), raising=False)
+    assert isolated_cpus() == {2, 3, 6}
+    path.write_text("\n")
+    assert isolated_cpus() == set()
+
+
+@pytest.fixture
+def scheduler_calls(monkeypatch):
+    """Record pinning / scheduler calls instead of changing the test process."""
+    calls = []
+    monkeypatch.setattr(os, "sched_setaffinity", lambda pid, cpus: calls.append(("affinity", set(cpus))),
+                        raising=False)
+
+    def setscheduler(pid, policy, param):
+        calls.append(("scheduler", policy))
+        raise PermissionError("not permitted")
+    monkeypatch.setattr(os, "sched_setscheduler", setscheduler, raising=False)
+    yield calls
+    sys.setswitchinterval(0.005)
+
+
+def test_move_does_nothing_while_off(scheduler_calls):
+    mode = RealtimeMode()
+    with mode.move():
+        assert gc.isenabled()
+    assert scheduler_calls == [] and mode.status()["threads"] == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="Linux scheduling API")
+def test_move_pins_the_thread_and_holds_off_the_gc(scheduler_calls):
+    mode = RealtimeMode()
+    mode.configure(enabled=True, cpu=0, priority=60)
+    assert sys.getswitchinterval() == pytest.approx(realtime.SWITCH_INTERVAL)
+    with mode.move():
+        assert not gc.isenabled()
+        with mode.move():  # nested holds
+            pass
+        assert not gc.isenabled()
+    assert gc.isenabled()
+    assert ("affinity", {0}) in scheduler_calls
+    assert any("SCHED_FIFO 60" in error for error in mode.errors)  # no CAP_SYS_NICE: warned, not raised
+
+    scheduler_calls.clear()
+    with mode.move():  # settings already applied to this thread
+        pass
+    assert scheduler_calls == []
+
+    mode.configure(enabled=False)
+    with mode.move():  # restored once on the next move
+        assert gc.isenabled()
+    assert scheduler_calls[0][0] == "affinity" and len(scheduler_calls[0][1]) >= 1
+    assert sys.getswitchinterval() == pytest.approx(mode._default_switch)
+
+
+def test_settings_reach_each_thread_once(scheduler_calls):
+    mode = RealtimeMode()
+    mode.configure(enabled=True, cpu=0)
+
+    both_moved = threading.Barrier(2)
+
+    def move():
+        with mode.move():
+            pass
+        both_moved.wait(5)  # keep both threads alive: a finished thread's ident is reused
+    threads = [threading.Thread(target=move) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert mode.status()["threads"] == 2
+    mode.configure(enabled=False)
+
+
+def test_controller_switches_the_sleep_engine_to_the_hybrid_timer(scheduler_calls):
+    from gpio_backend import SimulatedGPIO, SimulatedMachine
+    from hardware_controller import HardwareController
+    from pulse_engine import SleepPulseEngine
+    gpio = SimulatedGPIO(SimulatedMachine())
+    hw = HardwareController(pulse_engine=SleepPulseEngine(gpio), gpio=gpio)
+    hw.set_realtime(True, cpu=0)
+    assert hw.pulse_engine.spin == hw.realtime.spin > 0
+    hw.set_realtime(False)
+    assert hw.pulse_engine.spin == 0.0
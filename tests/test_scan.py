@@ -0,0 +1,76 @@
+# In file: tests/test_scan.py
+import itertools
+import random
+
+import pytest
+
+from cycle_scheduler import occupied_slots, visit_order
+
+
+def brute_force_travel(current, targets, slots):
+    """Least travel over every visit order, each leg taking the shorter way round."""
+    best = None
+    for order in itertools.permutations(targets):
+        position, travel = current, 0
+        for slot in order:
+            forward = (slot - position) % slots
+            travel += min(forward, slots - forward)
+            position = slot
+        best = travel if best is None else min(best, travel)
+    return best or 0
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_visit_order_matches_brute_force(seed):
+    rng = random.Random(seed)
+    slots = rng.choice([4, 10, 12, 36])
+    current = rng.randrange(slots)
+    targets = rng.sample(range(slots), rng.randint(0, min(slots, 6)))
+    order = visit_order(current, targets, slots)
+
+    assert sorted(slot for slot, _ in order) == sorted(targets)
+    position = current
+    for slot, moves in order:
+        assert (position + moves) % slots == slot
+        position = slot
+    assert sum(abs(moves) for _, moves in order) == brute_force_travel(current, targets, slots)
+
+
+def test_visit_order_starts_with_the_current_slot():
+    assert visit_order(3, [3, 4], 10) == [(3, 0), (4, 1)]
+    assert visit_order(0, [], 10) == []
+
+
+def test_occupied_slots_matches_intervals_within_tolerance():
+    # 10 slots of 320 steps: reach is 80 steps either side of a slot
+    assert occupied_slots([(300, 340)], 10, 3200) == [1]
+    assert occupied_slots([(1050, 1150)], 10, 3200) == []
+    assert occupied_slots([(1100, 1200)], 10, 3200) == [4]
+
+
+def test_occupied_slots_wraps_round_the_revolution():
+    assert occupied_slots([(3180, 3220)], 10, 3200) == [0]
+    assert occupied_slots([(6400 + 10, 6400 + 20)], 10, 3200) == [0]
+    assert occupied_slots([(-30, 30)], 10, 3200) == [0]
+
+
+def test_scan_revolution_finds_the_keys(make_controller):
+    hw = make_controller(start_angle=2.0, key_angles=(36.0, 144.0, 252.0))
+    assert hw.home_table()
+    start = hw.position_steps
+    intervals = hw.scan_revolution(delay=0.0001, ramp_steps=0)
+
+    assert hw.position_steps == start + hw.PULSES_PER_REV
+    assert len(intervals) == 3
+    for (first, last), angle in zip(intervals, (36.0, 144.0, 252.0)):
+        centre = start + angle / 360.0 * hw.PULSES_PER_REV
+        assert first < centre < last
+    assert occupied_slots(intervals, 10, hw.PULSES_PER_REV) == [1, 4, 7]
+
+
+def test_scan_revolution_reports_a_stall(make_controller):
+    hw = make_controller(start_angle=2.0, key_angles=(36.0,))
+    assert hw.home_table()
+    hw.gpio.machine.inject_stall(after_steps=500)
+    assert hw.scan_revolution(delay=0.0001, ramp_steps=0) is None
+    assert hw.last_stall is not None
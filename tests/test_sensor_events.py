@@ -0,0 +1,99 @@
+# In file: tests/test_sensor_events.py
+import threading
+import time
+
+from sensor_events import SensorEvents
+
+
+class FakeGPIO:
+    LOW, HIGH, BOTH = 0, 1, 33
+
+    def __init__(self):
+        self.levels = {}
+        self.callbacks = {}
+
+    def input(self, pin):
+        return self.levels.get(pin, self.HIGH)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.callbacks[pin] = callback
+
+    def remove_event_detect(self, pin):
+        self.callbacks.pop(pin, None)
+
+    def set(self, pin, active, edge=True):
+        """Drive an active-low input; edge=False models an edge lost to bouncetime."""
+        self.levels[pin] = self.LOW if active else self.HIGH
+        if edge:
+            self.callbacks[pin](pin)
+
+
+def make_events(debounce=0.02):
+    gpio = FakeGPIO()
+    events = SensorEvents(gpio, {"hall": 5}, debounce=debounce)
+    events.start()
+    time.sleep(debounce)  # start() opens a debounce window of its own
+    return gpio, events
+
+
+def settle(events, seconds=0.1):
+    deadline = time.time() + seconds
+    while events.channels["hall"]._timer is not None and time.time() < deadline:
+        time.sleep(0.005)
+
+
+def test_change_inside_the_debounce_window_is_picked_up_afterwards():
+    gpio, events = make_events()
+    gpio.set(5, True)
+    assert events.is_active("hall") and events.channels["hall"].latched
+    gpio.set(5, False)              # short pass: within the window, not accepted yet
+    assert events.is_active("hall")
+    settle(events)
+    assert not events.is_active("hall")
+    events.close()
+
+
+def test_edge_swallowed_by_bouncetime_is_reconciled():
+    gpio, events = make_events()
+    gpio.set(5, True)
+    gpio.set(5, False, edge=False)  # the release edge never reaches the callback
+    settle(events)
+    assert not events.is_active("hall") and events.channels["hall"].activations == 1
+    events.close()
+
+
+def test_bounce_that_ends_in_the_same_state_is_ignored():
+    gpio, events = make_events()
+    gpio.set(5, True)
+    gpio.set(5, False)
+    gpio.set(5, True)
+    settle(events)
+    channel = events.channels["hall"]
+    assert channel.active and channel.activations == 1
+    events.close()
+
+
+def test_no_reread_timer_without_debounce():
+    gpio, events = make_events(debounce=0)
+    for active in (True, False, True, False):
+        gpio.set(5, active)
+        assert events.is_active("hall") == active
+        assert events.channels["hall"]._timer is None
+    assert events.channels["hall"].activations == 2
+    events.close()
+
+
+def test_listeners_run_without_the_channel_lock():
+    gpio, events = make_events()
+    finished = []
+
+    def listener(channel):
+        edge = threading.Thread(target=events._on_edge, args=(channel.pin,))  # the next GPIO callback
+        edge.start()
+        edge.join(0.5)
+        finished.append(not edge.is_alive())
+
+    events.listeners.append(listener)
+    gpio.set(5, True)
+    assert finished == [True]
+    events.close()
@@ -0,0 +1,69 @@
+# In file: tests/test_simulation.py
+import sys
+
+import pytest
+
+from gpio_backend import SimulatedGPIO, SimulatedMachine, load_gpio
+from pulse_engine import SimulatedPulseEngine
+
+
+@pytest.mark.parametrize("backend", [None, "auto", "rpi"])
+def test_auto_never_falls_back_to_the_simulator(monkeypatch, backend):
+    monkeypatch.setitem(sys.modules, "RPi", None)  # import RPi.GPIO -> ImportError
+    monkeypatch.setenv("KEY_LOADER_GPIO", "auto")
+    with pytest.raises(ImportError):
+        load_gpio(backend)
+
+
+def test_sim_is_chosen_explicitly(monkeypatch):
+    monkeypatch.setenv("KEY_LOADER_GPIO", "sim")
+    assert isinstance(load_gpio(), SimulatedGPIO)
+    with pytest.raises(ValueError):
+        load_gpio("simulated")
+
+
+def test_engine_follows_a_virtual_clock():
+    engine = SimulatedPulseEngine()
+    delays = [0.001, 0.002, 0.0005]
+    assert engine.send(17, delays) == 3
+    assert engine.rising_edges(17) == pytest.approx([0.0, 0.002, 0.006])
+    assert engine.periods(17) == pytest.approx([0.002, 0.004])
+    assert engine._clock == pytest.approx(2 * sum(delays))
+
+
+def test_engine_stops_when_asked():
+    engine = SimulatedPulseEngine()
+    assert engine.send(17, [0.001] * 10, stop=lambda: len(engine.edges) >= 8) == 4
+
+
+def test_machine_counts_steps_only_while_enabled():
+    machine = SimulatedMachine(start_angle=0.0)
+    machine.step("rotary", True, enabled=False)
+    assert machine.rotary_position == 0
+    for _ in range(5):
+        machine.step("rotary", False, enabled=True)
+    assert machine.rotary_position == 3200 - 5 and machine.rotary_steps == 5
+
+
+def test_machine_sensors_follow_the_table():
+    machine = SimulatedMachine(magnet_angles=[0.0], hall_width_steps=30, key_angles=[90.0], start_angle=0.0)
+    assert machine.input_levels()["hall"] and not machine.input_levels()["inductive"]
+    machine.slip(800)
+    assert not machine.input_levels()["hall"] and machine.input_levels()["inductive"]
+    assert machine.rotary_angle == 90.0
+
+
+def test_move_degrees_moves_the_machine(make_controller):
+    hw = make_controller(start_angle=0.0)
+    assert hw.move_degrees(36.0, speed=50, accel_steps=50, decel_steps=50)
+    assert hw.gpio.machine.rotary_position == 320
+    assert hw.position_steps == 320
+    assert len(hw.pulse_engine.rising_edges(hw.STEP_PIN)) == 320
+
+
+def test_rate_limit_stalls_the_rotary_driver(make_controller):
+    hw = make_controller(start_angle=0.0)
+    hw.gpio.machine.set_limits(rotary_rate=30)  # speed 100 cruises at 50 pulses/s
+    assert not hw.move_degrees(36.0, speed=100, accel_steps=10, decel_steps=10)
+    assert hw.gpio.machine.alarm
+    assert hw.gpio.machine.rotary_position < 320
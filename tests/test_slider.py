@@ -0,0 +1,60 @@
+# In file: tests/test_slider.py
+import pytest
+
+DELAY = 0.001  # search / approach half period
+
+
+@pytest.fixture
+def slider(make_controller):
+    """Controller whose slider has learned its 800-pulse travel (ends at MAX)."""
+    hw = make_controller(slider_travel=800)
+    assert hw.slider_move_to_min(DELAY)
+    assert hw.slider_move_to_max(DELAY)
+    assert hw.slider_travel == 800
+    return hw
+
+
+def stroke_time(hw, move):
+    started = hw.pulse_engine._clock
+    assert move(DELAY)
+    return hw.pulse_engine._clock - started
+
+
+def test_known_travel_cruises_then_approaches_slowly(slider):
+    hw = slider
+    seconds = stroke_time(hw, hw.slider_move_to_min)
+    stroke = hw.last_slider_stroke
+    assert stroke["mode"] == "adaptive" and stroke["pulses"] == 800 and stroke["expected"] == 800
+    assert seconds < 0.6 * 800 * 2 * DELAY
+    assert hw.gpio.machine.slider_position == 0 and hw.slider_position == 0
+
+
+def test_search_only_without_adaptive(slider):
+    hw = slider
+    hw.SLIDER_ADAPTIVE = False
+    seconds = stroke_time(hw, hw.slider_move_to_min)
+    assert hw.last_slider_stroke["mode"] == "search"
+    assert seconds == pytest.approx(800 * 2 * DELAY)
+
+
+def test_longer_travel_falls_back_to_the_search_and_relearns(slider):
+    hw = slider
+    hw.gpio.machine.slider_travel = 900  # MAX switch moved out by 100 pulses
+    assert hw.slider_move_to_min(DELAY)
+    assert hw.slider_move_to_max(DELAY)
+    assert hw.last_slider_stroke["mode"] == "late" and hw.slider_travel == 900
+
+
+def test_shorter_travel_stops_early_and_relearns(slider):
+    hw = slider
+    assert hw.slider_move_to_min(DELAY)
+    hw.gpio.machine.slider_travel = 600
+    hw.gpio.refresh()
+    assert hw.slider_move_to_max(DELAY)
+    assert hw.last_slider_stroke["mode"] == "early" and hw.slider_travel == 600
+
+
+def test_stroke_without_a_switch_fails(slider):
+    hw = slider
+    assert not hw.slider_move_to_min(DELAY, max_pulses=100)
+    assert hw.last_slider_stroke["reached"] is False and hw.slider_position == 700
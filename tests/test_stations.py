@@ -0,0 +1,81 @@
+# In file: tests/test_stations.py
+import json
+
+import pytest
+
+from stations import STATION_ENV, Station, StationError, current_station, load_stations
+
+
+def write_stations(tmp_path, entries):
+    path = tmp_path / "stations.json"
+    path.write_text(json.dumps({"stations": entries}))
+    return str(path)
+
+
+def test_defaults_name_the_station_files():
+    station = Station.from_dict({"name": "left"})
+    assert station.config == "config_left.json" and station.journal == "runs_left.journal"
+    assert station.pin_map()["step"] == 20
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"name": "a b"}, "invalid station name"),
+    ({"name": "stations"}, "invalid station name"),
+    ({"name": "left", "colour": "red"}, "unknown keys"),
+    ({"name": "left", "pins": {"laser": 4}}, "unknown pin role"),
+    ({"name": "left", "pins": {"step": 40}}, "BCM number 0-27"),
+    ({"name": "left", "pins": {"step": True}}, "BCM number 0-27"),
+    ({"name": "left", "pins": {"step": 21}}, "used for both"),
+    ({"name": "left", "pulses_per_rev": 100}, "pulses_per_rev"),
+    ({"name": "left", "port": 70000}, "TCP port"),
+])
+def test_invalid_definitions_are_rejected(data, message):
+    with pytest.raises(StationError, match=message):
+        Station.from_dict(data)
+
+
+def test_optional_switches_may_be_unwired():
+    station = Station.from_dict({"name": "left", "pins": {"home_switch": None}})
+    assert "home_switch" not in station.pin_map()
+
+
+def test_load_rejects_shared_files_and_pins(tmp_path):
+    with pytest.raises(StationError, match="share the config file"):
+        load_stations(write_stations(tmp_path, [
+            {"name": "a", "config": "c.json", "gpio": "sim", "pico": "loopback"},
+            {"name": "b", "config": "c.json", "gpio": "sim", "pico": "loopback"},
+        ]))
+    with pytest.raises(StationError, match="both use BCM 20"):
+        load_stations(write_stations(tmp_path, [
+            {"name": "a", "gpio": "rpi", "pico": "loopback"},
+            {"name": "b", "gpio": "rpi", "pico": "loopback"},
+        ]))
+
+
+def test_load_gives_pigpio_waves_to_the_first_station_only(tmp_path):
+    stations = load_stations(write_stations(tmp_path, [
+        {"name": "a", "gpio": "sim", "pico": "loopback"},
+        {"name": "b", "gpio": "sim", "pico": "loopback"},
+    ]))
+    assert [s.pulse_engine for s in stations] == ["auto", "sleep"]
+    with pytest.raises(StationError, match="only one station"):
+        load_stations(write_stations(tmp_path, [
+            {"name": "a", "gpio": "sim", "pico": "loopback"},
+            {"name": "b", "gpio": "sim", "pico": "loopback", "pulse_engine": "pigpio"},
+        ]))
+
+
+def test_load_reports_unreadable_files(tmp_path):
+    with pytest.raises(StationError, match="could not load"):
+        load_stations(str(tmp_path / "missing.json"))
+
+
+def test_current_station_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv(STATION_ENV, json.dumps({"name": "right", "pulses_per_rev": 6400}))
+    station = current_station()
+    assert station.name == "right" and station.pulses_per_rev == 6400
+    monkeypatch.setenv(STATION_ENV, "{not json")
+    with pytest.raises(StationError, match=STATION_ENV):
+        current_station()
+    monkeypatch.delenv(STATION_ENV)
+    assert current_station().name == "default"
@@ -0,0 +1,58 @@
+# In file: tests/test_status_hub.py
+import json
+import threading
+
+import pytest
+
+from status_hub import StatusHub
+
+
+def test_update_bumps_the_version_only_on_change():
+    hub = StatusHub({"system_message": "Ready"})
+    assert hub.update({"system_message": "Ready"}) == 0
+    assert hub.update({"system_message": "Homing", "is_homed": False}) == 1
+    hub["current_angle"] = 36.0
+    assert hub.version == 2 and hub["current_angle"] == 36.0
+    with pytest.raises(KeyError):
+        hub["no_such_field"] = 1
+
+
+def test_changes_since_merges_the_deltas():
+    hub = StatusHub()
+    hub["current_angle"] = 36.0
+    hub["is_running"] = True
+    hub["current_angle"] = 72.0
+    assert hub.changes_since(1, timeout=0) == ({"is_running": True, "current_angle": 72.0}, 3)
+    assert hub.changes_since(3, timeout=0) == ({}, 3)
+
+
+def test_changes_since_falls_back_to_the_snapshot():
+    hub = StatusHub(history=2)
+    for angle in range(1, 6):
+        hub["current_angle"] = angle
+    changed, version = hub.changes_since(0, timeout=0)
+    assert version == 5 and changed == hub.snapshot()[0]
+
+
+def test_changes_since_wakes_on_an_update():
+    hub = StatusHub()
+    threading.Timer(0.02, hub.update, ({"is_homed": True},)).start()
+    assert hub.changes_since(0, timeout=2) == ({"is_homed": True}, 1)
+
+
+def test_stream_sends_a_snapshot_then_deltas():
+    hub = StatusHub({"system_message": "Ready"})
+    stream = hub.stream(keepalive=0.01)
+    first = next(stream)
+    assert first.startswith("id: 0\nevent: snapshot\n")
+    assert json.loads(first.split("data: ", 1)[1])["system_message"] == "Ready"
+    assert next(stream) == ": keepalive\n\n"
+    hub["slider_min"] = True
+    assert next(stream) == 'id: 1\ndata: {"slider_min": true}\n\n'
+
+
+def test_status_route_serves_the_cached_snapshot(app_module):
+    app_module.app_state["system_message"] = "cached"
+    status = app_module.app.test_client().get("/api/status").json
+    assert status["system_message"] == "cached" and status["station"] == "test"
+    assert "axes" in status
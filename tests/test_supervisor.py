@@ -0,0 +1,152 @@
+# In file: tests/test_supervisor.py
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import supervisor
+from stations import Station
+from supervisor import RESTART_BACKOFF, STABLE_SECONDS, StationWorker, Supervisor
+
+
+class FakeProcess:
+    def __init__(self, alive=True, exitcode=None):
+        self.pid = 4242
+        self.exitcode = exitcode
+        self._alive = alive
+
+    def is_alive(self):
+        return self._alive
+
+    def terminate(self):
+        self._alive, self.exitcode = False, -15
+
+    def join(self, timeout=None):
+        pass
+
+    def kill(self):
+        self._alive = False
+
+
+class StationHandler(BaseHTTPRequestHandler):
+    """Stands in for a station's app.py: echoes what the proxy sent."""
+    running = False
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Station", "left")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/status":
+            self._reply(200, {"is_homed": True, "is_running": self.running, "job_status": "idle"})
+        elif self.path.startswith("/api/missing"):
+            self._reply(404, {"error": "no such route"})
+        else:
+            self._reply(200, {"method": "GET", "path": self.path})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply(200, {"method": "POST", "path": self.path, "body": json.loads(body),
+                          "content_type": self.headers.get("Content-Type")})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def station_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StationHandler)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    StationHandler.running = False
+
+
+@pytest.fixture
+def client(station_server, monkeypatch):
+    sup = Supervisor([Station("left", port=station_server.server_port, gpio="sim", pico="loopback")])
+    sup.workers["left"].process = FakeProcess()
+    sup.workers["left"].started_at = 0.0
+    monkeypatch.setattr(supervisor, "supervisor", sup)
+    yield supervisor.app.test_client()
+    sup._pool.shutdown(wait=False)
+
+
+def test_proxy_forwards_path_query_and_headers(client):
+    response = client.get("/api/left/config?section=motion")
+    assert response.status_code == 200
+    assert response.get_json() == {"method": "GET", "path": "/api/config?section=motion"}
+    assert response.headers["X-Station"] == "left"
+
+
+def test_proxy_forwards_post_bodies(client):
+    response = client.post("/api/left/move", json={"angle": 36})
+    data = response.get_json()
+    assert data["path"] == "/api/move" and data["body"] == {"angle": 36}
+    assert data["content_type"] == "application/json"
+
+
+def test_proxy_passes_station_errors_through(client):
+    response = client.get("/api/left/missing")
+    assert response.status_code == 404 and response.get_json() == {"error": "no such route"}
+
+
+def test_proxy_rejects_unknown_and_dead_stations(client):
+    assert client.get("/api/right/status").status_code == 404
+    supervisor.supervisor.workers["left"].process = FakeProcess(alive=False, exitcode=1)
+    assert client.get("/api/left/status").status_code == 503
+
+
+def test_stations_summary_counts_responding_stations(client):
+    data = client.get("/api/stations").get_json()
+    assert data["summary"]["responding"] == 1 and data["summary"]["homed"] == 1
+    assert data["summary"]["jobs"] == {"left": "idle"}
+
+
+def test_restart_refuses_a_running_station_unless_forced(client, monkeypatch):
+    started = []
+    monkeypatch.setattr(StationWorker, "start", lambda self: started.append(self.station.name))
+    StationHandler.running = True
+    assert client.post("/api/stations/left/restart").status_code == 409
+    assert client.post("/api/stations/left/restart?force=1").status_code == 200
+    assert started == ["left"]
+
+
+def test_dead_worker_is_restarted_with_growing_backoff(monkeypatch):
+    def start(self):
+        self.process = FakeProcess()
+        self.started_at = 0.0
+        self.restart_at = None
+
+    monkeypatch.setattr(StationWorker, "start", start)
+    worker = StationWorker(Station("left", port=5100))
+    worker.start()
+    now = 0.0
+    for delay in RESTART_BACKOFF + RESTART_BACKOFF[-1:]:
+        worker.process = FakeProcess(alive=False, exitcode=1)
+        worker.check(now)
+        assert worker.restart_at == now + delay
+        worker.check(now + delay - 0.5)
+        assert not worker.alive()
+        now += delay
+        worker.check(now)
+        assert worker.alive()
+    assert worker.restarts == len(RESTART_BACKOFF) + 1 and worker.last_exit == 1
+
+
+def test_stable_worker_resets_the_backoff():
+    worker = StationWorker(Station("left", port=5100))
+    worker.process = FakeProcess()
+    worker.started_at = 0.0
+    worker.failures = 3
+    worker.check(STABLE_SECONDS / 2)
+    assert worker.failures == 3
+    worker.check(STABLE_SECONDS + 1)
+    assert worker.failures == 0
@@ -0,0 +1,61 @@
+# In file: tests/test_telemetry.py
+import re
+
+import pytest
+
+from telemetry import RingBuffer, Summary, Telemetry
+
+
+def test_ring_buffer_keeps_the_newest_samples_in_order():
+    ring = RingBuffer(3)
+    for value in range(1, 6):
+        ring.append(value)
+    assert ring.values() == [3.0, 4.0, 5.0] and len(ring) == 3
+
+
+def test_summary_counts_for_life_but_quantiles_only_recent():
+    summary = Summary(size=10)
+    for value in range(100):
+        summary.observe(float(value))
+    assert summary.count == 100 and summary.sum == sum(range(100))
+    assert summary.quantiles() == {0.5: 95.0, 0.9: 99.0, 0.99: 99.0}
+    assert summary.to_dict()["max"] == 99.0
+
+
+def test_move_records_overshoot_and_rate_ratio():
+    telemetry = Telemetry()
+    telemetry.record_move("rotary", 100, 0.5, 0.6)
+    telemetry.record_move("rotary", 20, None, 0.1, cut_short=True)  # partial train: counters only
+    move = telemetry.summary()["moves"]["rotary"]
+    assert move["pulses"] == 120 and move["cut_short"] == 1
+    assert move["overshoot_ms"]["count"] == 1 and move["overshoot_ms"]["mean"] == pytest.approx(100.0)
+    assert move["rate_ratio"]["mean"] == pytest.approx(0.833, abs=0.001)
+
+
+def test_phase_context_manager_records_a_sample():
+    telemetry = Telemetry()
+    with telemetry.phase("settle"):
+        pass
+    assert telemetry.summary()["phases_ms"]["settle"]["count"] == 1
+
+
+def test_prometheus_text_format():
+    telemetry = Telemetry()
+    telemetry.record_move("slider", 50, 0.1, 0.1)
+    telemetry.record_phase("pause", 1.0)
+    telemetry.record_driver_enable("rotary", True, 0.1, 0.0)
+    text = telemetry.prometheus()
+    assert text.endswith("\n")
+    assert 'keyloader_pulses_total{axis="slider"} 50' in text
+    assert 'keyloader_phase_seconds_count{phase="pause"} 1' in text
+    assert 'keyloader_driver_settle_waited_seconds_total{axis="rotary"} 0.1' in text
+    sample = re.compile(r'^keyloader_\w+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? \S+$')
+    for line in text.splitlines():
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or sample.match(line), line
+
+
+def test_metrics_route(app_module):
+    client = app_module.app.test_client()
+    response = client.get("/api/metrics")
+    assert response.mimetype == "text/plain" and b"# TYPE keyloader_pulses_total counter" in response.data
+    assert "realtime" in client.get("/api/metrics?format=json").json